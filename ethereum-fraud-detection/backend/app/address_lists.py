@@ -0,0 +1,202 @@
+import os
+import math
+import time
+import logging
+import threading
+import numpy as np
+from app.tx_records import to_raw_bytes
+from app.sketches import _MASK_64, _mix64, _mix64_scalar
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_BYTES = 20
+
+
+def _hash_pair(keys: np.ndarray):
+    """Two 64-bit hashes per 20-byte address for double hashing"""
+    raw = np.frombuffer(keys.tobytes(), dtype=np.uint8).reshape(-1, ADDRESS_BYTES)
+    lo = np.ascontiguousarray(raw[:, 4:12]).view('<u8').ravel()
+    hi = np.ascontiguousarray(raw[:, 12:20]).view('<u8').ravel()
+    return _mix64(lo ^ _mix64(hi)), _mix64(hi) | np.uint64(1)
+
+
+def _to_keys(addresses) -> np.ndarray:
+    """Sorted unique S20 array of the valid 20-byte addresses"""
+    raw = []
+    for address in addresses:
+        try:
+            key = to_raw_bytes(address)
+        except ValueError:
+            continue
+        if len(key) == ADDRESS_BYTES:
+            raw.append(key)
+    return np.unique(np.array(raw, dtype=f'S{ADDRESS_BYTES}'))
+
+
+class BloomFilter:
+    """Bit-array Bloom filter over 20-byte addresses (k probes by double hashing)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.num_bits = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+        self._view = memoryview(self.bits)
+
+    def _positions(self, keys: np.ndarray):
+        h1, h2 = _hash_pair(keys)
+        probes = np.arange(self.num_hashes, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            return (h1[:, None] + probes[None, :] * h2[:, None]) % np.uint64(self.num_bits)
+
+    def add_many(self, keys: np.ndarray):
+        positions = self._positions(keys).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                         (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+
+    def contains(self, key: bytes) -> bool:
+        """Single 20-byte key probe"""
+        lo = int.from_bytes(key[4:12], 'little')
+        hi = int.from_bytes(key[12:20], 'little')
+        h1 = _mix64_scalar(lo ^ _mix64_scalar(hi))
+        h2 = _mix64_scalar(hi) | 1
+        bits = self._view
+        num_bits = self.num_bits
+        for i in range(self.num_hashes):
+            position = ((h1 + i * h2) & _MASK_64) % num_bits
+            if not (bits[position >> 3] >> (position & 7)) & 1:
+                return False
+        return True
+
+    def contains_many(self, keys: np.ndarray) -> np.ndarray:
+        positions = self._positions(keys)
+        bits = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+
+class AddressList:
+    """Address set: Bloom filter fast path backed by an exact sorted array"""
+
+    def __init__(self, name: str, addresses=(), error_rate: float = 0.001, source: str = None):
+        self.name = name
+        self.source = source
+        keys = _to_keys(addresses)
+        self.keys = keys
+        self.bloom = BloomFilter(len(keys), error_rate)
+        if len(keys):
+            self.bloom.add_many(keys)
+        self.loaded_at = time.time()
+        self.lookups = 0
+        self.bloom_positives = 0
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_file(cls, name: str, path: str, error_rate: float = 0.001):
+        """One address per line; blank lines, '#' comments and extra CSV columns are ignored"""
+        with open(path, 'r') as f:
+            addresses = [
+                line.split(',', 1)[0].strip()
+                for line in f
+                if line.strip() and not line.lstrip().startswith('#')
+            ]
+        return cls(name, addresses, error_rate, source=path)
+
+    def contains(self, address, count: bool = True) -> bool:
+        """Membership test; count=False probes without touching the lookup counters"""
+        if count:
+            self.lookups += 1
+        if not address or not len(self.keys):
+            return False
+        try:
+            key = to_raw_bytes(address)
+        except ValueError:
+            return False
+        if len(key) != ADDRESS_BYTES or not self.bloom.contains(key):
+            return False
+        if count:
+            self.bloom_positives += 1
+        # Compare as fixed-width arrays: S20 scalars drop trailing NUL bytes
+        probe = np.array(key, dtype=self.keys.dtype)
+        idx = int(np.searchsorted(self.keys, probe))
+        if idx < len(self.keys) and self.keys[idx:idx + 1] == probe:
+            if count:
+                self.hits += 1
+            return True
+        return False
+
+    def metrics(self) -> dict:
+        return {
+            'source': self.source,
+            'size': len(self.keys),
+            'loaded_at': self.loaded_at,
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'bloom_false_positives': self.bloom_positives - self.hits
+        }
+
+
+class AddressListRegistry:
+    """
+    Known-bad (blocklist) and known-good (allowlist) addresses.
+
+    A transfer touching a blocklisted address is SUSPICIOUS; otherwise a
+    transfer from an allowlisted sender is LEGITIMATE. Lists are rebuilt off
+    to the side and swapped in, so reloads never block lookups.
+    """
+
+    def __init__(self, blocklist_path: str = None, allowlist_path: str = None, error_rate: float = 0.001):
+        self.paths = {'blocklist': blocklist_path, 'allowlist': allowlist_path}
+        self.error_rate = error_rate
+        self.lists = {name: AddressList(name) for name in self.paths}
+        self._mtimes = {}
+        self._reload_lock = threading.Lock()
+        self.reloads = 0
+
+    def reload(self, force: bool = True) -> bool:
+        """(Re)load every configured list; with force=False only lists whose file changed"""
+        changed = False
+        with self._reload_lock:
+            for name, path in self.paths.items():
+                if not path or not os.path.isfile(path):
+                    continue
+                mtime = os.path.getmtime(path)
+                if not force and self._mtimes.get(name) == mtime:
+                    continue
+                try:
+                    started = time.perf_counter()
+                    self.lists[name] = AddressList.from_file(name, path, self.error_rate)
+                    self._mtimes[name] = mtime
+                    changed = True
+                    logger.info(f"📋 Loaded {name}: {len(self.lists[name])} addresses "
+                                f"in {time.perf_counter() - started:.2f}s")
+                except Exception as e:
+                    logger.error(f"❌ Error loading {name} from {path}: {str(e)}")
+            if changed:
+                self.reloads += 1
+        return changed
+
+    def reload_if_changed(self) -> bool:
+        return self.reload(force=False)
+
+    def check(self, from_address, to_address):
+        """'SUSPICIOUS' / 'LEGITIMATE' for listed transfers, None otherwise"""
+        blocklist = self.lists['blocklist']
+        if blocklist.contains(from_address) or blocklist.contains(to_address):
+            return "SUSPICIOUS"
+        if self.lists['allowlist'].contains(from_address):
+            return "LEGITIMATE"
+        return None
+
+    def is_blocklisted(self, from_address, to_address) -> bool:
+        """Uncounted probe (e.g. for queue priority); scoring goes through check()"""
+        blocklist = self.lists['blocklist']
+        return blocklist.contains(from_address, count=False) or blocklist.contains(to_address, count=False)
+
+    def metrics(self) -> dict:
+        return {
+            'reloads': self.reloads,
+            **{name: address_list.metrics() for name, address_list in self.lists.items()}
+        }
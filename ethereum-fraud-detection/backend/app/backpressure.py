@@ -0,0 +1,148 @@
+import time
+import heapq
+import random
+import itertools
+from collections import deque
+
+SHED_MODES = ('drop_oldest', 'sample')
+
+
+class OverloadPolicy:
+    """
+    Bounded two-stage intake between the pending filter and the scorer.
+
+    1. Announced hashes wait in a FIFO of at most `max_hashes`. When it is
+       full, 'drop_oldest' discards the oldest hashes; 'sample' keeps filling
+       but, above `sample_watermark` of capacity, admits new hashes with a
+       probability that falls as the queue fills (never below `sample_floor`).
+    2. Fetched transactions wait in a priority heap of at most `max_txs`
+       (priority supplied by the caller, e.g. watchlist hit then value); when
+       full the lowest-priority transaction is shed.
+
+    Anything older than `max_age_sec` (since its hash was announced) is
+    skipped rather than scored, so alerts are never broadcast late. Every
+    shed transaction is counted by reason.
+    """
+
+    def __init__(self, max_hashes: int = 5000, max_txs: int = 1000, max_age_sec: float = 30.0,
+                 mode: str = 'drop_oldest', sample_watermark: float = 0.5, sample_floor: float = 0.05,
+                 seed: int = None):
+        if mode not in SHED_MODES:
+            raise ValueError(f"Unknown shed mode: {mode}")
+        self.max_hashes = max_hashes
+        self.max_txs = max_txs
+        self.max_age_sec = max_age_sec
+        self.mode = mode
+        self.sample_watermark = sample_watermark
+        self.sample_floor = sample_floor
+        self._hashes = deque()
+        self._txs = []      # min-heap of (priority, seq, announced_at, tx)
+        self._seq = itertools.count()
+        self._rng = random.Random(seed)
+        self.offered = 0
+        self.scored = 0
+        self.shed = {'overflow': 0, 'sampled_out': 0, 'low_priority': 0, 'stale': 0}
+        self.max_lag_sec = 0.0
+
+    def _admit_probability(self) -> float:
+        load = len(self._hashes) / self.max_hashes
+        if load <= self.sample_watermark:
+            return 1.0
+        return max(self.sample_floor, (1.0 - load) / (1.0 - self.sample_watermark))
+
+    def offer_hashes(self, tx_hashes, now: float = None):
+        now = now if now is not None else time.monotonic()
+        for tx_hash in tx_hashes:
+            self.offered += 1
+            if self.mode == 'sample':
+                if len(self._hashes) >= self.max_hashes:
+                    self.shed['overflow'] += 1
+                    continue
+                if self._rng.random() >= self._admit_probability():
+                    self.shed['sampled_out'] += 1
+                    continue
+            self._hashes.append((tx_hash, now))
+            if len(self._hashes) > self.max_hashes:
+                self._hashes.popleft()
+                self.shed['overflow'] += 1
+
+    def _fresh(self, announced_at: float, now: float) -> bool:
+        if now - announced_at > self.max_age_sec:
+            self.shed['stale'] += 1
+            return False
+        return True
+
+    def next_hashes(self, count: int, now: float = None) -> list:
+        """Up to `count` (hash, announced_at) to fetch, oldest first, stale ones dropped"""
+        now = now if now is not None else time.monotonic()
+        batch = []
+        while self._hashes and len(batch) < count:
+            tx_hash, announced_at = self._hashes.popleft()
+            if self._fresh(announced_at, now):
+                batch.append((tx_hash, announced_at))
+        return batch
+
+    def has_room(self) -> bool:
+        return len(self._txs) < self.max_txs
+
+    def offer_txs(self, items):
+        """items: (priority, announced_at, tx); priority compares with < (higher wins)"""
+        for priority, announced_at, tx in items:
+            entry = (priority, next(self._seq), announced_at, tx)
+            if len(self._txs) < self.max_txs:
+                heapq.heappush(self._txs, entry)
+            elif entry[0] > self._txs[0][0]:
+                heapq.heapreplace(self._txs, entry)
+                self.shed['low_priority'] += 1
+            else:
+                self.shed['low_priority'] += 1
+
+    def next_batch(self, count: int, now: float = None) -> list:
+        """Highest-priority fresh transactions to score"""
+        now = now if now is not None else time.monotonic()
+        if not self._txs:
+            return []
+        best = heapq.nlargest(count, self._txs)
+        chosen = {id(entry) for entry in best}
+        self._txs = [entry for entry in self._txs if id(entry) not in chosen]
+        heapq.heapify(self._txs)
+        batch = []
+        for _, _, announced_at, tx in best:
+            if self._fresh(announced_at, now):
+                batch.append(tx)
+                self.max_lag_sec = max(self.max_lag_sec, now - announced_at)
+        self.scored += len(batch)
+        return batch
+
+    def drop_stale(self, now: float = None):
+        """Shed buffered transactions that can no longer be scored in time"""
+        now = now if now is not None else time.monotonic()
+        kept = [entry for entry in self._txs if self._fresh(entry[2], now)]
+        if len(kept) != len(self._txs):
+            self._txs = kept
+            heapq.heapify(self._txs)
+
+    def oldest_announced(self):
+        """Announcement time of the oldest hash or transaction still waiting (None when empty)"""
+        times = [entry[2] for entry in self._txs]
+        if self._hashes:
+            times.append(self._hashes[0][1])
+        return min(times) if times else None
+
+    def lag_sec(self, now: float = None) -> float:
+        """Age of the oldest queued hash"""
+        now = now if now is not None else time.monotonic()
+        return now - self._hashes[0][1] if self._hashes else 0.0
+
+    def metrics(self) -> dict:
+        return {
+            'mode': self.mode,
+            'queued_hashes': len(self._hashes),
+            'buffered_txs': len(self._txs),
+            'lag_sec': round(self.lag_sec(), 3),
+            'max_lag_sec': round(self.max_lag_sec, 3),
+            'offered': self.offered,
+            'scored': self.scored,
+            'shed': dict(self.shed),
+            'shed_total': sum(self.shed.values())
+        }
@@ -6,4 +6,91 @@ load_dotenv()
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
 DATABASE_URL = os.getenv('DATABASE_URL')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '100'))
 BACKEND_PORT = int(os.getenv('BACKEND_PORT','8000'))
+
+# Ethereum websocket RPC: set ALCHEMY_WS to a provider URL (with its key) in .env;
+# defaults to the local fake node (scripts/fake_node.py)
+ALCHEMY_WS = os.getenv('ALCHEMY_WS', 'ws://localhost:8546')
+
+# Shadow scoring: candidate models scored alongside the production model
+SHADOW_MODEL_PATHS = [p.strip() for p in os.getenv('SHADOW_MODEL_PATHS', '').split(',') if p.strip()]
+SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', '1.0'))
+SHADOW_MAX_PENDING = int(os.getenv('SHADOW_MAX_PENDING', '8'))
+SHADOW_MAX_DUTY_CYCLE = float(os.getenv('SHADOW_MAX_DUTY_CYCLE', '0.25'))
+
+# Wallet transfer graph index (multi-hop features)
+GRAPH_INDEX_ENABLED = os.getenv('GRAPH_INDEX_ENABLED', 'true').lower() == 'true'
+GRAPH_RETENTION_HOURS = float(os.getenv('GRAPH_RETENTION_HOURS', '168'))
+GRAPH_COMPACT_EVERY = int(os.getenv('GRAPH_COMPACT_EVERY', '50000'))
+GRAPH_MAX_HOPS = int(os.getenv('GRAPH_MAX_HOPS', '3'))
+
+# Known-bad / known-good address lists (one address per line)
+BLOCKLIST_PATH = os.getenv('BLOCKLIST_PATH')
+ALLOWLIST_PATH = os.getenv('ALLOWLIST_PATH')
+ADDRESS_LISTS_RELOAD_SEC = float(os.getenv('ADDRESS_LISTS_RELOAD_SEC', '60'))
+BLOOM_ERROR_RATE = float(os.getenv('BLOOM_ERROR_RATE', '0.001'))
+
+# Degraded-mode rules (JSON file; built-in defaults when unset)
+FALLBACK_RULES_PATH = os.getenv('FALLBACK_RULES_PATH')
+
+# Durable ingest log, crash recovery and backfill of missed blocks
+INGEST_LOG_ENABLED = os.getenv('INGEST_LOG_ENABLED', 'true').lower() == 'true'
+INGEST_LOG_DIR = os.getenv('INGEST_LOG_DIR', 'ingest_log')
+INGEST_LOG_SEGMENT_MB = float(os.getenv('INGEST_LOG_SEGMENT_MB', '64'))
+INGEST_LOG_KEEP_SEGMENTS = int(os.getenv('INGEST_LOG_KEEP_SEGMENTS', '4'))
+INGEST_LOG_FSYNC = os.getenv('INGEST_LOG_FSYNC', 'false').lower() == 'true'
+BACKFILL_MAX_BLOCKS = int(os.getenv('BACKFILL_MAX_BLOCKS', '256'))
+BACKFILL_BATCH_BLOCKS = int(os.getenv('BACKFILL_BATCH_BLOCKS', '16'))
+BACKFILL_CONNECTIONS = int(os.getenv('BACKFILL_CONNECTIONS', '4'))
+BLOCK_CHECKPOINT_SEC = float(os.getenv('BLOCK_CHECKPOINT_SEC', '12'))
+INGEST_CHECKPOINT_SEC = float(os.getenv('INGEST_CHECKPOINT_SEC', '1'))
+
+# Overload policy: bounded intake, priority (watchlist, value), shedding, staleness deadline
+OVERLOAD_MAX_HASHES = int(os.getenv('OVERLOAD_MAX_HASHES', '5000'))
+OVERLOAD_MAX_TXS = int(os.getenv('OVERLOAD_MAX_TXS', '1000'))
+OVERLOAD_MAX_AGE_SEC = float(os.getenv('OVERLOAD_MAX_AGE_SEC', '30'))
+OVERLOAD_MODE = os.getenv('OVERLOAD_MODE', 'drop_oldest').lower()
+OVERLOAD_SAMPLE_WATERMARK = float(os.getenv('OVERLOAD_SAMPLE_WATERMARK', '0.5'))
+OVERLOAD_SAMPLE_FLOOR = float(os.getenv('OVERLOAD_SAMPLE_FLOOR', '0.05'))
+OVERLOAD_PREFETCH_BATCHES = int(os.getenv('OVERLOAD_PREFETCH_BATCHES', '4'))
+OVERLOAD_WATCH_HOPS = int(os.getenv('OVERLOAD_WATCH_HOPS', '1'))
+
+# Pending transaction tracker: (sender, nonce) slots, hash dedup, block reconciliation
+MEMPOOL_TRACKER_ENABLED = os.getenv('MEMPOOL_TRACKER_ENABLED', 'true').lower() == 'true'
+MEMPOOL_MAX_ENTRIES = int(os.getenv('MEMPOOL_MAX_ENTRIES', '200000'))
+MEMPOOL_TTL_SEC = float(os.getenv('MEMPOOL_TTL_SEC', '10800'))
+MEMPOOL_REORG_DEPTH = int(os.getenv('MEMPOOL_REORG_DEPTH', '2'))
+MEMPOOL_RECONCILE_MAX_BLOCKS = int(os.getenv('MEMPOOL_RECONCILE_MAX_BLOCKS', '32'))
+
+# Hourly wallet rollups (used for long feature windows)
+ROLLUPS_ENABLED = os.getenv('ROLLUPS_ENABLED', 'true').lower() == 'true'
+ROLLUP_MIN_WINDOW_HOURS = float(os.getenv('ROLLUP_MIN_WINDOW_HOURS', '48'))
+ROLLUP_HLL_PRECISION = int(os.getenv('ROLLUP_HLL_PRECISION', '10'))
+
+# Distinct counterparty counting: 'exact' (set) or 'approx' (HyperLogLog)
+DISTINCT_COUNT_MODE = os.getenv('DISTINCT_COUNT_MODE', 'exact').lower()
+DISTINCT_COUNT_PRECISION = int(os.getenv('DISTINCT_COUNT_PRECISION', '12'))
+
+# Columnar export of scored transactions (requires pyarrow)
+PARQUET_EXPORT_ENABLED = os.getenv('PARQUET_EXPORT_ENABLED', 'false').lower() == 'true'
+PARQUET_DIR = os.getenv('PARQUET_DIR', 'scored_parquet')
+PARQUET_FLUSH_ROWS = int(os.getenv('PARQUET_FLUSH_ROWS', '10000'))
+PARQUET_FLUSH_SEC = float(os.getenv('PARQUET_FLUSH_SEC', '60'))
+PARQUET_COMPRESSION = os.getenv('PARQUET_COMPRESSION', 'zstd')
+
+# Explanations of SUSPICIOUS scores (tree-SHAP contributions within a per-batch time budget)
+EXPLAIN_ENABLED = os.getenv('EXPLAIN_ENABLED', 'true').lower() == 'true'
+EXPLAIN_BUDGET_MS = float(os.getenv('EXPLAIN_BUDGET_MS', '25'))
+EXPLAIN_TOP_K = int(os.getenv('EXPLAIN_TOP_K', '3'))
+
+# Snapshots of in-memory detection state (address table, transfer graph, counters) for warm restarts
+SNAPSHOT_ENABLED = os.getenv('SNAPSHOT_ENABLED', 'true').lower() == 'true'
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots')
+SNAPSHOT_INTERVAL_SEC = float(os.getenv('SNAPSHOT_INTERVAL_SEC', '60'))
+SNAPSHOT_FULL_EVERY = int(os.getenv('SNAPSHOT_FULL_EVERY', '10'))
+SNAPSHOT_FULL_RATIO = float(os.getenv('SNAPSHOT_FULL_RATIO', '0.5'))
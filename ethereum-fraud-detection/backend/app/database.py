@@ -1,33 +1,89 @@
-import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from dotenv import load_dotenv
-import json
+import logging
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.models import (
+    Base, Prediction, SQLALCHEMY_URL, engine_options, enable_sqlite_wal, normalize_database_url
+)
+from app.config import DB_STATEMENT_CACHE_SIZE
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-DATABASE_URL = os.getenv('DATABASE_URL')
+# Built once; SQLAlchemy caches its compiled form and asyncpg keeps the
+# prepared statement per pooled connection
+INSERT_PREDICTION = insert(Prediction)
+HEALTH_CHECK = text('SELECT 1')
 
-conn = None
+engine = None
 
 
-def init_db():
-    global conn
-    if DATABASE_URL is None:
-        print('No DATABASE_URL provided, running in memory/mock mode')
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL to its async driver"""
+    url = normalize_database_url(url)
+    if url.startswith('postgresql+psycopg2://'):
+        return 'postgresql+asyncpg://' + url[len('postgresql+psycopg2://'):]
+    if url.startswith('sqlite:///'):
+        return 'sqlite+aiosqlite:///' + url[len('sqlite:///'):]
+    return url
+
+
+async def init_db():
+    """Create the pooled async engine and make sure the tables exist"""
+    global engine
+    if engine is not None:
         return
-    conn = psycopg2.connect(DATABASE_URL)
+    url = to_async_url(SQLALCHEMY_URL)
+    connect_args = {}
+    if url.startswith('postgresql+asyncpg'):
+        connect_args['statement_cache_size'] = DB_STATEMENT_CACHE_SIZE
+    engine = create_async_engine(url, connect_args=connect_args, **engine_options(url))
+    enable_sqlite_wal(engine.sync_engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    logger.info(f"🗄️ Database ready ({engine.dialect.name}, pool={engine.pool.__class__.__name__})")
+
+
+async def close_db():
+    global engine
+    if engine is not None:
+        await engine.dispose()
+        engine = None
+
+
+async def health_check() -> bool:
+    if engine is None:
+        return False
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(HEALTH_CHECK)
+        return True
+    except Exception as e:
+        logger.error(f"Database health check failed: {str(e)}")
+        return False
 
 
-def save_prediction(result: dict):
+async def save_prediction(result: dict):
     # minimal persistence: insert into predictions table
-    if conn is None:
-        print('DB not configured - skipping save')
+    if engine is None:
+        logger.warning('DB not configured - skipping save')
         return
-    cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO predictions (wallet, tx_hash, model_version, score, is_suspicious, explain) VALUES (%s,%s,%s,%s,%s,%s)",
-        (result['wallet'], result.get('tx_hash'), result['model_version'], result['score'], result['is_suspicious'], json.dumps(result.get('explain')))
-    )
-    conn.commit()
-    cur.close()
+    row = {
+        'wallet': result['wallet'],
+        'tx_hash': result.get('tx_hash'),
+        'model_version': result['model_version'],
+        'score': result['score'],
+        'is_suspicious': result['is_suspicious'],
+        'explain': result.get('explain')
+    }
+    # pool_pre_ping covers stale idle connections; a connection dropped
+    # mid-statement is invalidated by the pool and retried once
+    for attempt in range(2):
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(INSERT_PREDICTION, row)
+            return
+        except DBAPIError as e:
+            if e.connection_invalidated and attempt == 0:
+                logger.warning('Database connection lost, reconnecting')
+                continue
+            raise
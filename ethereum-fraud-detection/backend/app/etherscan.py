@@ -29,8 +29,8 @@ ETHERSCAN_ENDPOINTS = {
     "internal": "/account/txlistinternal",
     "erc20": "/account/tokentx"
 }
-ETHERSCAN_API_KEY = "3HTXPGFXRNVMSGYNBDW617YPRAXFPYZHZ5"
-ALCHEMY_KEY = "Ef1v-4uGjH1wd-LkT9Mti"  # your_alchemy_api_key
+ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
+ALCHEMY_KEY = os.getenv("ALCHEMY_API_KEY")
 ALCHEMY_URLS = {
     "mainnet": "https://eth-mainnet.g.alchemy.com/v2/",
     "sepolia": "https://eth-sepolia.g.alchemy.com/v2/"
@@ -0,0 +1,165 @@
+import time
+import logging
+import numpy as np
+
+try:
+    import xgboost as xgb
+except ImportError:
+    xgb = None
+
+logger = logging.getLogger(__name__)
+
+
+def training_statistics(model_package):
+    """
+    Per-feature (mean, std) of the training population, read from the fitted
+    StandardScaler of the preprocessor (the training export stores no
+    separate statistics; the scaler was fitted on the same rows)
+    """
+    scaler = model_package['preprocessor'].named_steps['scaler']
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    std = np.asarray(scaler.scale_, dtype=np.float64)
+    return mean, np.where(std > 0, std, 1.0)
+
+
+class TreeExplainer:
+    """
+    Reasons for SUSPICIOUS scores: tree-SHAP contributions from the booster
+    (`pred_contribs`, in log-odds) plus z-scores against training statistics.
+
+    `explain` only looks at rows above the threshold, most suspicious first,
+    and stops computing contributions once `budget_ms` is spent for the
+    batch; the remaining rows still get their z-scores, which cost nothing.
+    The cost of a contributions call is modelled as fixed (DMatrix, call
+    overhead) plus per row, fitted by least squares on recent calls, so
+    chunks are sized to what actually fits in the remaining budget.
+    """
+
+    def __init__(self, model_package, threshold: float, top_k: int = 3, budget_ms: float = 25.0):
+        if xgb is None:
+            raise ImportError("xgboost is required for tree explanations")
+        self.booster = model_package['model'].get_booster()
+        self.features = list(model_package['features'])
+        self.mean, self.std = training_statistics(model_package)
+        self.threshold = threshold
+        self.top_k = top_k
+        self.budget_sec = budget_ms / 1000.0
+        self._cost = None       # EWMA of (rows, seconds, rows², rows * seconds) per call
+        self.stats = {
+            'requested': 0,
+            'explained': 0,
+            'zscore_only': 0,
+            'batches_over_budget': 0,
+            'errors': 0,
+            'time_sec': 0.0
+        }
+
+    def zscores(self, raw) -> np.ndarray:
+        raw = np.asarray(raw, dtype=np.float64)
+        return np.nan_to_num((raw - self.mean) / self.std)
+
+    def contributions(self, X) -> np.ndarray:
+        """(n, len(features) + 1) log-odds contributions, last column is the bias"""
+        return self.booster.predict(xgb.DMatrix(np.asarray(X, dtype=np.float32)), pred_contribs=True)
+
+    def _observe(self, rows: int, seconds: float):
+        point = (rows, seconds, rows * rows, rows * seconds)
+        if self._cost is None:
+            self._cost = list(point)
+        else:
+            self._cost = [0.8 * s + 0.2 * p for s, p in zip(self._cost, point)]
+
+    def cost_model(self):
+        """(fixed, per_row) seconds of a contributions call, None before the first call"""
+        if self._cost is None:
+            return None
+        n, t, nn, nt = self._cost
+        var = nn - n * n
+        if var > 1e-6 * nn:
+            per_row = max((nt - n * t) / var, 1e-7)
+            return max(t - per_row * n, 0.0), per_row
+        # Only one chunk size seen so far: charge it all per row (conservative)
+        return 0.0, t / n
+
+    def _describe(self, raw_row, z_row, contrib_row=None) -> dict:
+        if contrib_row is not None:
+            # Features pushing the score towards fraud, strongest first
+            order = np.argsort(-contrib_row[:-1])[:self.top_k]
+        else:
+            order = np.argsort(-np.abs(z_row))[:self.top_k]
+        top = []
+        for j in order:
+            item = {
+                'feature': self.features[j],
+                'value': float(raw_row[j]),
+                'zscore': round(float(z_row[j]), 3)
+            }
+            if contrib_row is not None:
+                item['contribution'] = round(float(contrib_row[j]), 4)
+            top.append(item)
+        explanation = {'method': 'tree_shap' if contrib_row is not None else 'zscore', 'top_features': top}
+        if contrib_row is not None:
+            explanation['base_value'] = round(float(contrib_row[-1]), 4)
+        return explanation
+
+    def explain_row(self, raw_row, x_row) -> dict:
+        """Full explanation of a single row, whatever its score (no budget)"""
+        raw_row = np.asarray(raw_row, dtype=np.float64)
+        contribs = self.contributions(np.asarray(x_row).reshape(1, -1))[0]
+        return self._describe(raw_row, self.zscores(raw_row), contribs)
+
+    def explain(self, raw, X, probabilities) -> list:
+        """
+        One explanation per row (None when the row is not above the threshold).
+        `raw` are the model-ordered feature values, `X` the preprocessed matrix.
+        """
+        probabilities = np.asarray(probabilities)
+        explanations = [None] * len(probabilities)
+        rows = np.flatnonzero(probabilities > self.threshold)
+        if rows.size == 0:
+            return explanations
+        rows = rows[np.argsort(-probabilities[rows], kind='stable')]
+        raw = np.asarray(raw, dtype=np.float64)
+        z = self.zscores(raw[rows])
+        self.stats['requested'] += int(rows.size)
+
+        started = time.perf_counter()
+        done = 0
+        try:
+            while done < rows.size:
+                remaining = self.budget_sec - (time.perf_counter() - started)
+                model = self.cost_model()
+                if model is None:
+                    chunk = 1   # first call: measure before committing to a batch
+                else:
+                    fixed, per_row = model
+                    chunk = min(rows.size - done, int((remaining - fixed) / per_row))
+                if chunk <= 0:
+                    self.stats['batches_over_budget'] += 1
+                    break
+                chunk_started = time.perf_counter()
+                contribs = self.contributions(X[rows[done:done + chunk]])
+                self._observe(chunk, time.perf_counter() - chunk_started)
+                for k in range(chunk):
+                    explanations[rows[done + k]] = self._describe(raw[rows[done + k]], z[done + k], contribs[k])
+                done += chunk
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Explanation error: {str(e)}")
+        self.stats['time_sec'] += time.perf_counter() - started
+        self.stats['explained'] += done
+
+        for k in range(done, rows.size):
+            explanations[rows[k]] = self._describe(raw[rows[k]], z[k])
+        self.stats['zscore_only'] += int(rows.size - done)
+        return explanations
+
+    def metrics(self) -> dict:
+        model = self.cost_model()
+        return dict(
+            self.stats,
+            time_sec=round(self.stats['time_sec'], 3),
+            budget_ms=self.budget_sec * 1000.0,
+            call_cost_ms=round(model[0] * 1000.0, 3) if model is not None else None,
+            row_cost_ms=round(model[1] * 1000.0, 3) if model is not None else None
+        )
@@ -0,0 +1,146 @@
+"""
+Single definition of the 18 model features, shared by the training notebook,
+/predict and the websocket monitor.
+
+Features are derived from per-wallet window aggregates named like the columns
+of the training dataset (ETFD). `derive_features` is the single-row path (plain
+floats, no numpy overhead) and `derive_features_batch` the vectorized path;
+both do the same float64 arithmetic in the same order, so they agree exactly
+(see scripts/check_feature_parity.py).
+"""
+
+import math
+import numpy as np
+
+# Liste exacte des features utilisées par le modèle XGBoost
+REQUIRED_FEATURES = [
+    'Month', 'Day', 'Hour', 'time_diff_first_last_received',
+    'total_tx_sent', 'total_tx_sent_unique', 'mean_value_received',
+    'total_received', 'value_volatility', 'tx_volatility',
+    'send_receive_imbalance', 'unique_behavior_ratio', 'is_weekend',
+    'is_night', 'is_business_hours', 'value_category', 'value_anomaly',
+    'frequency_anomaly'
+]
+
+# Agrégats d'une fenêtre (mêmes noms que les colonnes du dataset d'entraînement)
+AGGREGATE_FIELDS = [
+    'Month', 'Day', 'Hour', 'time_diff_first_last_received',
+    'total_tx_sent', 'total_tx_sent_unique', 'mean_value_received',
+    'variance_value_received', 'total_received'
+]
+
+# Bornes des catégories de valeur reçue: ]0, 0.01] -> 0 ... ]10, inf[ -> 4, 0 -> -1
+VALUE_BINS = (0.01, 0.1, 1.0, 10.0)
+
+# 95e percentile de la population d'entraînement (remplacé par le 'feature_thresholds'
+# du model package quand il existe, voir configure)
+ANOMALY_THRESHOLDS = {
+    'mean_value_received': 10.0,
+    'total_tx_sent': 100.0
+}
+
+
+def configure(model_package):
+    """Use the anomaly thresholds exported with the model, if any"""
+    thresholds = (model_package or {}).get('feature_thresholds')
+    if thresholds:
+        ANOMALY_THRESHOLDS.update({name: float(value) for name, value in thresholds.items()})
+
+
+def training_thresholds(df, quantile: float = 0.95) -> dict:
+    """Anomaly thresholds from the training population (notebook export)"""
+    return {name: float(df[name].quantile(quantile)) for name in ANOMALY_THRESHOLDS}
+
+
+def empty_aggregates(now) -> dict:
+    """Aggregates of a wallet with no activity in the window"""
+    return dict(
+        {name: 0.0 for name in AGGREGATE_FIELDS},
+        Month=float(now.month), Day=float(now.day), Hour=float(now.hour)
+    )
+
+
+def derive_features(aggregates: dict, thresholds: dict = None) -> dict:
+    """Single-row path: window aggregates -> the 18 model features"""
+    thresholds = thresholds or ANOMALY_THRESHOLDS
+    month = float(aggregates['Month'])
+    day = float(aggregates['Day'])
+    hour = float(aggregates['Hour'])
+    time_diff = float(aggregates['time_diff_first_last_received'])
+    sent = float(aggregates['total_tx_sent'])
+    unique = float(aggregates['total_tx_sent_unique'])
+    mean = float(aggregates['mean_value_received'])
+    variance = float(aggregates['variance_value_received'])
+    received = float(aggregates['total_received'])
+
+    if mean > 0:
+        value_category = float(sum(mean > bound for bound in VALUE_BINS))
+    else:
+        value_category = -1.0
+
+    return {
+        'Month': month,
+        'Day': day,
+        'Hour': hour,
+        'time_diff_first_last_received': time_diff,
+        'total_tx_sent': sent,
+        'total_tx_sent_unique': unique,
+        'mean_value_received': mean,
+        'total_received': received,
+        'value_volatility': variance / (mean + 1e-8),
+        'tx_volatility': sent / (time_diff + 1),
+        'send_receive_imbalance': (sent - received) / (sent + received + 1),
+        'unique_behavior_ratio': unique / (sent + 1),
+        # Jour du mois modulo 7, comme à l'entraînement
+        'is_weekend': 1.0 if math.fmod(day, 7) >= 5 else 0.0,
+        'is_night': 1.0 if (hour >= 22 or hour <= 6) else 0.0,
+        'is_business_hours': 1.0 if (9 <= hour <= 17) else 0.0,
+        'value_category': value_category,
+        'value_anomaly': 1.0 if mean > thresholds['mean_value_received'] else 0.0,
+        'frequency_anomaly': 1.0 if sent > thresholds['total_tx_sent'] else 0.0
+    }
+
+
+def derive_features_batch(aggregates, thresholds: dict = None) -> np.ndarray:
+    """
+    Vectorized path: column-wise aggregates (a DataFrame or a dict of arrays)
+    -> an (n, len(REQUIRED_FEATURES)) float64 matrix in REQUIRED_FEATURES order.
+    """
+    thresholds = thresholds or ANOMALY_THRESHOLDS
+    col = {name: np.asarray(aggregates[name], dtype=np.float64) for name in AGGREGATE_FIELDS}
+    month, day, hour = col['Month'], col['Day'], col['Hour']
+    time_diff = col['time_diff_first_last_received']
+    sent = col['total_tx_sent']
+    unique = col['total_tx_sent_unique']
+    mean = col['mean_value_received']
+    variance = col['variance_value_received']
+    received = col['total_received']
+
+    value_category = np.where(
+        mean > 0, np.searchsorted(np.asarray(VALUE_BINS), mean, side='left'), -1
+    ).astype(np.float64)
+
+    derived = {
+        'Month': month,
+        'Day': day,
+        'Hour': hour,
+        'time_diff_first_last_received': time_diff,
+        'total_tx_sent': sent,
+        'total_tx_sent_unique': unique,
+        'mean_value_received': mean,
+        'total_received': received,
+        'value_volatility': variance / (mean + 1e-8),
+        'tx_volatility': sent / (time_diff + 1),
+        'send_receive_imbalance': (sent - received) / (sent + received + 1),
+        'unique_behavior_ratio': unique / (sent + 1),
+        'is_weekend': np.fmod(day, 7) >= 5,
+        'is_night': (hour >= 22) | (hour <= 6),
+        'is_business_hours': (hour >= 9) & (hour <= 17),
+        'value_category': value_category,
+        'value_anomaly': mean > thresholds['mean_value_received'],
+        'frequency_anomaly': sent > thresholds['total_tx_sent']
+    }
+    matrix = np.empty((len(month), len(REQUIRED_FEATURES)), dtype=np.float64)
+    for j, name in enumerate(REQUIRED_FEATURES):
+        matrix[:, j] = derived[name]
+    return matrix
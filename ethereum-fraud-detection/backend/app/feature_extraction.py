@@ -3,24 +3,22 @@ from datetime import datetime, timedelta
 from typing import Dict
 import logging
 import numpy as np
-from sqlalchemy import func
 from app.models import Session, Transaction
+from app.rollups import aggregate_window
+from app.sketches import DistinctCounter
+from app.feature_definitions import (
+    REQUIRED_FEATURES, AGGREGATE_FIELDS, empty_aggregates, derive_features, derive_features_batch
+)
+from app.config import (
+    ROLLUPS_ENABLED, ROLLUP_MIN_WINDOW_HOURS, DISTINCT_COUNT_MODE, DISTINCT_COUNT_PRECISION
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Liste exacte des features utilisées par le modèle XGBoost
-REQUIRED_FEATURES = [
-    'Month', 'Day', 'Hour', 'time_diff_first_last_received',
-    'total_tx_sent', 'total_tx_sent_unique', 'mean_value_received',
-    'total_received', 'value_volatility', 'tx_volatility',
-    'send_receive_imbalance', 'unique_behavior_ratio', 'is_weekend',
-    'is_night', 'is_business_hours', 'value_category', 'value_anomaly',
-    'frequency_anomaly'
-]
-
-logger = logging.getLogger(__name__)
+# Wallets per IN (...) clause of the batched window query
+WALLET_QUERY_CHUNK = 500
 
 def get_recent_transactions(wallet_address: str, hours: int = 24) -> list:
     """
@@ -38,122 +36,126 @@ def get_recent_transactions(wallet_address: str, hours: int = 24) -> list:
     finally:
         session.close()
 
-def compute_wallet_features(wallet_address: str, lookback_hours: int = 24) -> Dict:
+def get_recent_transactions_many(wallets, hours: int = 24) -> Dict:
     """
-    Calcule les mêmes features que dans le modèle ML pour une adresse
+    Même requête pour plusieurs adresses à la fois : {adresse: [transactions]}
     """
+    by_wallet = {wallet: [] for wallet in wallets}
+    wallets = list(by_wallet)
+    start_time = datetime.utcnow() - timedelta(hours=hours)
+    session = Session()
     try:
-        # 1. Récupérer l'historique récent des transactions
-        transactions = get_recent_transactions(wallet_address, lookback_hours)
-        
-        # 2. Séparer les transactions envoyées et reçues
-        sent_txs = [tx for tx in transactions if tx.from_address == wallet_address]
-        received_txs = [tx for tx in transactions if tx.to_address == wallet_address]
-        
-        # 3. Features de base des transactions
-        total_tx_sent = len(sent_txs)
-        total_received = sum(tx.value_eth for tx in received_txs)
-        total_sent = sum(tx.value_eth for tx in sent_txs)
-        
-        # 4. Contreparties uniques (comme dans le ML)
-        unique_counterparties = len(set(
-            [tx.to_address for tx in sent_txs] +
-            [tx.from_address for tx in received_txs]
-        ))
-        
-        # 5. Features temporelles
-        now = datetime.utcnow()
-        if received_txs:
-            timestamps = [tx.timestamp for tx in received_txs]  # Only consider received transactions
-            time_diff = (max(timestamps) - min(timestamps)).total_seconds() / 3600 if len(timestamps) > 1 else 0
-        else:
-            time_diff = 0
-            
-        # 6. Calcul des moyennes et volatilités (spécifique aux transactions reçues)
-        if received_txs:
-            received_values = [tx.value_eth for tx in received_txs]
-            mean_value_received = np.mean(received_values)
-            value_std = np.std(received_values) if len(received_values) > 1 else 0
-            value_volatility = value_std / (mean_value_received + 1e-8)
-        else:
-            mean_value_received = 0
-            value_volatility = 0
-        
-        # 7. Features de comportement (identiques au ML)
-        tx_volatility = total_tx_sent / (time_diff + 1)
-        total_volume = total_sent + total_received
-        send_receive_imbalance = (total_sent - total_received) / (total_volume + 1)
-        unique_behavior_ratio = unique_counterparties / (total_tx_sent + 1)
-        
-        # 8. Catégorisation des valeurs (basée sur les transactions reçues)
-        if mean_value_received == 0:
-            value_category = 0
-        elif mean_value_received <= 0.01:
-            value_category = 1
-        elif mean_value_received <= 0.1:
-            value_category = 2
-        elif mean_value_received <= 1:
-            value_category = 3
-        elif mean_value_received <= 10:
-            value_category = 4
-        else:
-            value_category = 5
-            
-        # 9. Features temporelles contextuelles
-        is_weekend = 1 if now.weekday() >= 5 else 0
-        is_night = 1 if (now.hour >= 22 or now.hour <= 6) else 0
-        is_business_hours = 1 if (9 <= now.hour <= 17) else 0
-        
-        # 10. Features d'anomalie
-        value_anomaly = 1 if mean_value_received > 10 else 0  # Basé sur les transactions reçues
-        frequency_anomaly = 1 if total_tx_sent > 100 else 0
-        
-        # Retourner exactement les mêmes features que le modèle ML
-        features = {
-            'Month': now.month,
-            'Day': now.day,
-            'Hour': now.hour,
-            'time_diff_first_last_received': time_diff,
-            'total_tx_sent': total_tx_sent,
-            'total_tx_sent_unique': unique_counterparties,
-            'mean_value_received': mean_value_received,
-            'total_received': total_received,
-            'value_volatility': value_volatility,
-            'tx_volatility': tx_volatility,
-            'send_receive_imbalance': send_receive_imbalance,
-            'unique_behavior_ratio': unique_behavior_ratio,
-            'is_weekend': is_weekend,
-            'is_night': is_night,
-            'is_business_hours': is_business_hours,
-            'value_category': value_category,
-            'value_anomaly': value_anomaly,
-            'frequency_anomaly': frequency_anomaly
-        }
-        
-        # Vérifier que toutes les features requises sont présentes
-        assert all(feature in features for feature in REQUIRED_FEATURES), "Missing required features"
-        return features
+        for i in range(0, len(wallets), WALLET_QUERY_CHUNK):
+            chunk = wallets[i:i + WALLET_QUERY_CHUNK]
+            rows = session.query(Transaction).filter(
+                (Transaction.from_address.in_(chunk) | Transaction.to_address.in_(chunk)) &
+                (Transaction.timestamp >= start_time)
+            ).all()
+            for tx in rows:
+                # A transfer between two wallets of the batch belongs to both
+                for wallet in {tx.from_address, tx.to_address}:
+                    if wallet in by_wallet:
+                        by_wallet[wallet].append(tx)
+        return by_wallet
+    finally:
+        session.close()
+
+def window_aggregates(wallet_address: str, transactions: list, now: datetime) -> Dict:
+    """
+    Agrégats de la fenêtre (colonnes du dataset d'entraînement) à partir des transactions brutes
+    """
+    # 1. Séparer les transactions envoyées et reçues
+    sent_txs = [tx for tx in transactions if tx.from_address == wallet_address]
+    received_txs = [tx for tx in transactions if tx.to_address == wallet_address]
+    
+    # 2. Contreparties uniques (comme dans le ML), exact ou HyperLogLog
+    counter = DistinctCounter(DISTINCT_COUNT_MODE, DISTINCT_COUNT_PRECISION)
+    counter.update(tx.to_address for tx in sent_txs)
+    counter.update(tx.from_address for tx in received_txs)
+    
+    aggregates = empty_aggregates(now)
+    aggregates['total_tx_sent'] = float(len(sent_txs))
+    aggregates['total_tx_sent_unique'] = float(counter.count())
+    
+    # 3. Moyenne, variance et durée (spécifiques aux transactions reçues)
+    if received_txs:
+        timestamps = [tx.timestamp for tx in received_txs]
+        received_values = np.array([tx.value_eth or 0.0 for tx in received_txs], dtype=np.float64)
+        aggregates['time_diff_first_last_received'] = (max(timestamps) - min(timestamps)).total_seconds() / 3600
+        aggregates['mean_value_received'] = float(received_values.mean())
+        aggregates['variance_value_received'] = float(received_values.var())
+        aggregates['total_received'] = float(received_values.sum())
+    return aggregates
 
+def rollup_aggregates(wallet_address: str, lookback_hours: float, now: datetime) -> Dict:
+    """
+    Mêmes agrégats en fusionnant les buckets horaires
+    (la fenêtre est arrondie à l'heure de début du premier bucket)
+    """
+    agg = aggregate_window(wallet_address, now - timedelta(hours=lookback_hours))
+    
+    aggregates = empty_aggregates(now)
+    aggregates['total_tx_sent'] = float(agg['sent_count'])
+    aggregates['total_tx_sent_unique'] = float(agg['unique_counterparties'])
+    if agg['recv_count']:
+        mean_value_received = agg['recv_sum'] / agg['recv_count']
+        aggregates['mean_value_received'] = mean_value_received
+        aggregates['variance_value_received'] = max(agg['recv_sumsq'] / agg['recv_count'] - mean_value_received ** 2, 0.0)
+        aggregates['total_received'] = float(agg['recv_sum'])
+    if agg['recv_count'] > 1:
+        aggregates['time_diff_first_last_received'] = (agg['last_recv_at'] - agg['first_recv_at']).total_seconds() / 3600
+    return aggregates
+
+def compute_window_features_from_rollups(wallet_address: str, lookback_hours: float) -> Dict:
+    """
+    Même calcul que compute_wallet_features, à partir des rollups horaires
+    """
+    return derive_features(rollup_aggregates(wallet_address, lookback_hours, datetime.utcnow()))
+
+def compute_wallet_aggregates(wallet_address: str, lookback_hours: int = 24) -> Dict:
+    """
+    Agrégats de la fenêtre pour une adresse (rollups pour les longues fenêtres)
+    """
+    now = datetime.utcnow()
+    if not wallet_address:
+        return empty_aggregates(now)
+    
+    # Longues fenêtres : fusion des rollups horaires au lieu d'un scan
+    if ROLLUPS_ENABLED and lookback_hours >= ROLLUP_MIN_WINDOW_HOURS:
+        return rollup_aggregates(wallet_address, lookback_hours, now)
+    
+    return window_aggregates(wallet_address, get_recent_transactions(wallet_address, lookback_hours), now)
+
+def compute_wallet_features(wallet_address: str, lookback_hours: int = 24) -> Dict:
+    """
+    Calcule les mêmes features que dans le modèle ML pour une adresse (chemin une ligne)
+    """
+    try:
+        return derive_features(compute_wallet_aggregates(wallet_address, lookback_hours))
     except Exception as e:
         logger.error(f"Error computing features for {wallet_address}: {str(e)}")
-        # En cas d'erreur, retourner des valeurs par défaut sécurisées
-        return {
-            'Month': datetime.utcnow().month,
-            'Day': datetime.utcnow().day,
-            'Hour': datetime.utcnow().hour,
-            'time_diff_first_last_received': 0,
-            'total_tx_sent': 0,
-            'total_tx_sent_unique': 0,
-            'mean_value_received': 0,
-            'total_received': 0,
-            'value_volatility': 0,
-            'tx_volatility': 0,
-            'send_receive_imbalance': 0,
-            'unique_behavior_ratio': 0,
-            'is_weekend': 1 if datetime.utcnow().weekday() >= 5 else 0,
-            'is_night': 1 if (datetime.utcnow().hour >= 22 or datetime.utcnow().hour <= 6) else 0,
-            'is_business_hours': 1 if (9 <= datetime.utcnow().hour <= 17) else 0,
-            'value_category': 0,
-            'value_anomaly': 0,
-            'frequency_anomaly': 0
-        }
\ No newline at end of file
+        # En cas d'erreur, features d'une adresse sans activité
+        return derive_features(empty_aggregates(datetime.utcnow()))
+
+def compute_wallet_feature_matrix(wallets, lookback_hours: int = 24) -> np.ndarray:
+    """
+    Chemin batch : une ligne de features (ordre REQUIRED_FEATURES) par adresse,
+    avec une seule requête pour toutes les adresses de la fenêtre
+    """
+    wallets = list(wallets)
+    now = datetime.utcnow()
+    unique = list(dict.fromkeys(wallet for wallet in wallets if wallet))
+    try:
+        if ROLLUPS_ENABLED and lookback_hours >= ROLLUP_MIN_WINDOW_HOURS:
+            aggregates = {wallet: rollup_aggregates(wallet, lookback_hours, now) for wallet in unique}
+        else:
+            by_wallet = get_recent_transactions_many(unique, lookback_hours)
+            aggregates = {wallet: window_aggregates(wallet, txs, now) for wallet, txs in by_wallet.items()}
+    except Exception as e:
+        logger.error(f"Error computing features for {len(unique)} wallets: {str(e)}")
+        aggregates = {}
+    
+    empty = empty_aggregates(now)
+    rows = [aggregates.get(wallet, empty) if wallet else empty for wallet in wallets]
+    columns = {name: [row[name] for row in rows] for name in AGGREGATE_FIELDS}
+    return derive_features_batch(columns)
@@ -0,0 +1,532 @@
+import time
+import logging
+import datetime
+import itertools
+from collections import defaultdict
+import numpy as np
+from app.tx_records import InternTable, NO_ID
+
+logger = logging.getLogger(__name__)
+
+# Optional features added next to the model features when the index is enabled
+GRAPH_FEATURES = [
+    'graph_fan_out', 'graph_fan_in', 'graph_2hop_out', 'graph_dist_to_flagged'
+]
+
+# Distance value of nodes farther than max_hops from any flagged address
+UNREACHED = np.iinfo(np.int8).max
+
+# Neighbors below which a distance relaxation hop runs on lists instead of numpy
+SMALL_FRONTIER = 256
+
+
+class _CSR:
+    """Compressed adjacency: neighbors of node n are indices[indptr[n]:indptr[n+1]], time-ordered"""
+
+    def __init__(self):
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.times = np.zeros(0, dtype=np.float64)
+
+    @classmethod
+    def build(cls, rows, cols, times, num_nodes):
+        csr = cls()
+        order = np.lexsort((times, rows))
+        csr.indices = cols[order].astype(np.int32)
+        csr.times = times[order]
+        counts = np.bincount(rows, minlength=num_nodes)
+        csr.indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return csr
+
+    @classmethod
+    def distinct(cls, rows, cols, num_nodes):
+        """Sorted distinct neighbors per row (no times): degrees are np.diff(indptr)"""
+        csr = cls()
+        order = np.lexsort((cols, rows))
+        rows, cols = rows[order], cols[order]
+        keep = np.ones(len(rows), dtype=bool)
+        keep[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        csr.indices = cols[keep].astype(np.int32)
+        counts = np.bincount(rows[keep], minlength=num_nodes)
+        csr.indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return csr
+
+    def degree(self, node):
+        if node >= len(self.indptr) - 1:
+            return 0
+        return int(self.indptr[node + 1] - self.indptr[node])
+
+    def degrees(self, nodes):
+        nodes = np.asarray(nodes)
+        inside = nodes < len(self.indptr) - 1
+        result = np.zeros(len(nodes), dtype=np.int64)
+        result[inside] = self.indptr[nodes[inside] + 1] - self.indptr[nodes[inside]]
+        return result
+
+    def contains(self, node, neighbor):
+        """Membership test on a distinct (column-sorted) row, O(log degree)"""
+        if node >= len(self.indptr) - 1:
+            return False
+        row = self.indices[self.indptr[node]:self.indptr[node + 1]]
+        i = np.searchsorted(row, neighbor)
+        return i < len(row) and row[i] == neighbor
+
+    def edges(self):
+        """(rows, cols, times) of every stored edge"""
+        rows = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), np.diff(self.indptr))
+        return rows, self.indices, self.times
+
+    def gather(self, nodes, limit=None):
+        """Concatenated neighbors of all `nodes` (vectorized), the first `limit` of each row when given"""
+        nodes = nodes[nodes < len(self.indptr) - 1]
+        starts = self.indptr[nodes]
+        lens = self.indptr[nodes + 1] - starts
+        if limit is not None:
+            lens = np.minimum(lens, limit)
+        total = int(lens.sum())
+        if total == 0:
+            return self.indices[:0]
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lens)[:-1])), lens)
+        return self.indices[offsets + np.arange(total)]
+
+    def row(self, node, since=None):
+        if node >= len(self.indptr) - 1:
+            return self.indices[:0]
+        start, end = self.indptr[node], self.indptr[node + 1]
+        if since is not None:
+            start += np.searchsorted(self.times[start:end], since)
+        return self.indices[start:end]
+
+
+def _unique(ids: np.ndarray) -> np.ndarray:
+    """Sorted distinct ids (sort-based, much faster than np.unique's hashing on small int arrays)"""
+    ids = np.sort(ids)
+    if ids.size:
+        ids = ids[np.concatenate(([True], ids[1:] != ids[:-1]))]
+    return ids
+
+
+def merge_edges(csr: _CSR, pending, since: float = None):
+    """(rows, cols, times) of compacted plus pending (src, dst, ts) edges, newer than `since` when given"""
+    rows, cols, times = csr.edges()
+    if pending:
+        pending = np.array(pending, dtype=np.float64)
+        rows = np.concatenate((rows, pending[:, 0].astype(np.int32)))
+        cols = np.concatenate((cols, pending[:, 1].astype(np.int32)))
+        times = np.concatenate((times, pending[:, 2]))
+    if since is not None:
+        keep = times > since
+        rows, cols, times = rows[keep], cols[keep], times[keep]
+    return rows, cols, times
+
+
+class TransferGraph:
+    """
+    Directed wallet transfer graph, updated incrementally.
+
+    New edges go to small per-node append buffers; `compact()` periodically
+    merges them into CSR arrays (out- and in-adjacency, edges ordered by
+    time within each row) and drops edges older than the retention window.
+    Node ids are the ids of the shared address InternTable.
+
+    Hop distance to the nearest flagged address is kept in an int8 array:
+    recomputed with a vectorized multi-source BFS on compaction and relaxed
+    incrementally when edges or flags are added, so lookups are O(1).
+    Distinct fan-out/fan-in degrees are likewise precomputed on compaction
+    (plus the new neighbors of the pending edges), so hub wallets cost no
+    more than any other; k-hop walks gather whole frontiers with numpy, and
+    `batch_features` featurizes a whole batch of transfers with array ops.
+    """
+
+    def __init__(self, addresses: InternTable, retention_hours: float = 168,
+                 compact_every: int = 50_000, max_visit: int = 10_000, max_hops: int = 3):
+        self.addresses = addresses
+        self.retention_sec = retention_hours * 3600
+        self.compact_every = compact_every
+        self.max_visit = max_visit
+        self.max_hops = min(max_hops, UNREACHED - 1)
+        self.flagged = set()
+        self._dist = np.full(1024, UNREACHED, dtype=np.int8)
+        self._out = _CSR()
+        self._in = _CSR()
+        self._out_distinct = _CSR()
+        self._in_distinct = _CSR()
+        self._pending_out = defaultdict(list)
+        self._pending_in = defaultdict(list)
+        # Pending neighbors not already in the compacted distinct rows
+        self._new_out = defaultdict(set)
+        self._new_in = defaultdict(set)
+        self._pending = []
+        # Newest edge time ever added (the snapshot watermark; retention doesn't lower it)
+        self.latest_time = None
+        self.compactions = 0
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._out.indices) + len(self._pending)
+
+    def add_edge(self, src: int, dst: int, ts: float = None):
+        if src <= NO_ID or dst <= NO_ID:
+            return
+        ts = ts if ts is not None else time.time()
+        if self.latest_time is None or ts > self.latest_time:
+            self.latest_time = ts
+        self._pending.append((src, dst, ts))
+        self._pending_out[src].append((dst, ts))
+        self._pending_in[dst].append((src, ts))
+        if not self._out_distinct.contains(src, dst):
+            self._new_out[src].add(dst)
+        if not self._in_distinct.contains(dst, src):
+            self._new_in[dst].add(src)
+
+        # Relax flagged distances across the new edge
+        self._ensure_capacity(max(src, dst))
+        d_src, d_dst = int(self._dist[src]), int(self._dist[dst])
+        if d_src + 1 < d_dst:
+            self._propagate(dst, d_src + 1)
+        elif d_dst + 1 < d_src:
+            self._propagate(src, d_dst + 1)
+
+        if len(self._pending) >= self.compact_every:
+            self.compact()
+
+    def add_transfer(self, from_address: str, to_address: str, ts: float = None):
+        self.add_edge(
+            self.addresses.intern(from_address or '', from_address or ''),
+            self.addresses.intern(to_address or '', to_address or ''),
+            ts
+        )
+
+    def compact(self, now: float = None):
+        """Merge pending edges into the CSR arrays and apply retention"""
+        now = now if now is not None else time.time()
+        rows, cols, times = merge_edges(self._out, self._pending)
+
+        keep = times >= now - self.retention_sec
+        rows, cols, times = rows[keep], cols[keep], times[keep]
+
+        num_nodes = len(self.addresses) + 1
+        self._out = _CSR.build(rows, cols, times, num_nodes)
+        self._in = _CSR.build(cols, rows, times, num_nodes)
+        self._out_distinct = _CSR.distinct(rows, cols, num_nodes)
+        self._in_distinct = _CSR.distinct(cols, rows, num_nodes)
+        self._clear_pending()
+        self._recompute_distances()
+        self.compactions += 1
+
+    def snapshot_edges(self):
+        """
+        Compacted out-adjacency and a copy of the pending edges (see merge_edges).
+        Compaction replaces the CSR arrays instead of modifying them, so they
+        can be read from another thread while the graph keeps changing.
+        """
+        return self._out, list(self._pending)
+
+    def restore(self, src, dst, times, flagged, now: float = None):
+        """Replace the graph with snapshot edges and flags (ids from the shared InternTable)"""
+        self.flagged = set(np.asarray(flagged, dtype=np.int64).tolist())
+        self.latest_time = float(np.max(times)) if len(times) else None
+        self._out = _CSR.build(
+            np.asarray(src, dtype=np.int32), np.asarray(dst, dtype=np.int32),
+            np.asarray(times, dtype=np.float64), len(self.addresses) + 1
+        )
+        self._clear_pending()
+        self.compact(now)
+
+    def _clear_pending(self):
+        self._pending = []
+        self._pending_out.clear()
+        self._pending_in.clear()
+        self._new_out.clear()
+        self._new_in.clear()
+
+    def _ensure_capacity(self, node: int):
+        if node >= len(self._dist):
+            grown = np.full(max(node + 1, 2 * len(self._dist)), UNREACHED, dtype=np.int8)
+            grown[:len(self._dist)] = self._dist
+            self._dist = grown
+
+    def _recompute_distances(self):
+        """Multi-source BFS from all flagged nodes over the compacted arrays"""
+        self._ensure_capacity(len(self.addresses))
+        self._dist[:] = UNREACHED
+        if not self.flagged:
+            return
+        frontier = np.fromiter(self.flagged, dtype=np.int64)
+        self._ensure_capacity(int(frontier.max()))
+        self._dist[frontier] = 0
+        for depth in range(1, self.max_hops + 1):
+            neighbors = np.concatenate((self._out.gather(frontier), self._in.gather(frontier)))
+            neighbors = np.unique(neighbors[self._dist[neighbors] > depth]).astype(np.int64)
+            if neighbors.size == 0:
+                break
+            self._dist[neighbors] = depth
+            frontier = neighbors
+
+    def _propagate(self, node: int, depth: int):
+        """
+        Lower the distance of `node` to `depth` and relax its neighborhood a
+        whole frontier at a time. Rows are cut at max_visit + 1 neighbors and
+        the walk stops after about max_visit, so relaxing through a hub costs
+        O(max_visit) (compaction recomputes exact distances). Hops gathering
+        few neighbors use plain lists: numpy call overhead would dominate.
+        """
+        if depth > self.max_hops or depth >= self._dist[node]:
+            return
+        self._dist[node] = depth
+        limit = self.max_visit + 1
+        frontier = np.array([node], dtype=np.int64)
+        visited = 0
+        while frontier.size and depth < self.max_hops and visited < self.max_visit:
+            depth += 1
+            if len(frontier) <= SMALL_FRONTIER:
+                neighbors = self._neighbors_capped(frontier.tolist(), limit)
+                if len(neighbors) <= SMALL_FRONTIER:
+                    visited += len(neighbors)
+                    self._ensure_capacity(max(neighbors, default=0))
+                    dist = self._dist
+                    reached = [n for n in set(neighbors) if dist[n] > depth]
+                    dist[reached] = depth
+                    frontier = np.array(reached, dtype=np.int64)
+                    continue
+            costs = (np.minimum(self._out_distinct.degrees(frontier), limit)
+                     + np.minimum(self._in_distinct.degrees(frontier), limit))
+            reached = []
+            for chunk in self._chunks(frontier, costs, limit):
+                neighbors = np.concatenate((self._gather(chunk, 'out', limit), self._gather(chunk, 'in', limit)))
+                visited += len(neighbors)
+                if neighbors.size:
+                    self._ensure_capacity(int(neighbors.max()))
+                    neighbors = neighbors[self._dist[neighbors] > depth]
+                    self._dist[neighbors] = depth
+                    reached.append(neighbors)
+                if visited >= self.max_visit:
+                    break
+            frontier = _unique(np.concatenate(reached)) if reached else frontier[:0]
+
+    def _neighbors_capped(self, nodes: list, limit: int) -> list:
+        """Out- and in-neighbors of a few nodes as a list, stopping once past `limit`"""
+        result = []
+        for node in nodes:
+            for csr, new in ((self._out_distinct, self._new_out), (self._in_distinct, self._new_in)):
+                if node < len(csr.indptr) - 1:
+                    start = int(csr.indptr[node])
+                    result.extend(csr.indices[start:min(int(csr.indptr[node + 1]), start + limit)].tolist())
+                if node in new:
+                    result.extend(itertools.islice(new[node], limit))
+                if len(result) > limit:
+                    return result
+        return result
+
+    def _neighbors(self, node, direction, since=None):
+        result = []
+        if direction in ('out', 'both'):
+            result.extend(self._out.row(node, since).tolist())
+            result.extend(dst for dst, ts in self._pending_out.get(node, ()) if since is None or ts >= since)
+        if direction in ('in', 'both'):
+            result.extend(self._in.row(node, since).tolist())
+            result.extend(src for src, ts in self._pending_in.get(node, ()) if since is None or ts >= since)
+        return result
+
+    def fan_out(self, node: int, since: float = None) -> int:
+        """Number of distinct receivers of `node`"""
+        if since is not None:
+            return len(np.unique(self._neighbors(node, 'out', since)))
+        return self._out_distinct.degree(node) + len(self._new_out.get(node, ()))
+
+    def fan_in(self, node: int, since: float = None) -> int:
+        """Number of distinct senders to `node`"""
+        if since is not None:
+            return len(np.unique(self._neighbors(node, 'in', since)))
+        return self._in_distinct.degree(node) + len(self._new_in.get(node, ()))
+
+    def _gather(self, frontier, direction, limit):
+        """Distinct neighbors of the frontier nodes (at most `limit` compacted ones per node) plus pending ones"""
+        csr, new = (self._out_distinct, self._new_out) if direction == 'out' else (self._in_distinct, self._new_in)
+        parts = [csr.gather(frontier, limit).astype(np.int64)]
+        # Pending neighbors: walk whichever of frontier / pending nodes is smaller
+        if len(frontier) <= len(new):
+            parts.extend(np.fromiter(new[n], dtype=np.int64) for n in frontier.tolist() if n in new)
+        elif new:
+            members = set(frontier.tolist())
+            parts.extend(np.fromiter(neighbors, dtype=np.int64) for n, neighbors in new.items() if n in members)
+        return _unique(np.concatenate(parts))
+
+    @staticmethod
+    def _chunks(frontier, costs, limit):
+        """Consecutive slices of the frontier whose neighbor counts (`costs`) add up to about `limit`"""
+        cumulative = np.cumsum(costs)
+        start = 0
+        while start < len(frontier):
+            base = cumulative[start - 1] if start else 0
+            end = max(start + 1, int(np.searchsorted(cumulative, base + limit, side='right')))
+            yield frontier[start:end]
+            start = end
+
+    def _k_hop_ids(self, node: int, k: int, direction: str) -> np.ndarray:
+        """
+        Sorted ids reachable from `node` in 1..k hops, at most max_visit of
+        them. Frontiers are gathered in chunks of about max_visit neighbors,
+        rows cut at max_visit + 1 distinct ones (enough to saturate), so a
+        hub costs O(max_visit) instead of O(degree).
+        """
+        csr = self._out_distinct if direction == 'out' else self._in_distinct
+        limit = self.max_visit + 1
+        seen = np.array([node], dtype=np.int64)
+        frontier = seen
+        for _ in range(k):
+            reached = []
+            for chunk in self._chunks(frontier, np.minimum(csr.degrees(frontier), limit), limit):
+                neighbors = np.setdiff1d(self._gather(chunk, direction, limit), seen, assume_unique=True)
+                seen = np.sort(np.concatenate((seen, neighbors)))
+                if seen.size > self.max_visit:
+                    return np.setdiff1d(seen, [node], assume_unique=True)[:self.max_visit]
+                reached.append(neighbors)
+            frontier = np.concatenate(reached) if reached else seen[:0]
+            if frontier.size == 0:
+                break
+        return np.setdiff1d(seen, [node], assume_unique=True)
+
+    def k_hop(self, node: int, k: int = 2, direction: str = 'out') -> set:
+        """Nodes reachable from `node` in 1..k hops (bounded by max_visit)"""
+        return set(self._k_hop_ids(node, k, direction).tolist())
+
+    def distance_to_flagged(self, node: int, max_hops: int = None) -> int:
+        """Undirected hop distance to the nearest flagged address, -1 if none within max_hops"""
+        max_hops = self.max_hops if max_hops is None else min(max_hops, self.max_hops)
+        if node <= NO_ID or node >= len(self._dist):
+            return -1
+        distance = int(self._dist[node])
+        return distance if distance <= max_hops else -1
+
+    def mark_flagged(self, node: int):
+        if node > NO_ID and node not in self.flagged:
+            self.flagged.add(node)
+            self._ensure_capacity(node)
+            self._propagate(node, 0)
+
+    def node_features(self, node: int, max_hops: int = None) -> dict:
+        if node <= NO_ID:
+            return {'graph_fan_out': 0, 'graph_fan_in': 0, 'graph_2hop_out': 0, 'graph_dist_to_flagged': -1}
+        return {
+            'graph_fan_out': self.fan_out(node),
+            'graph_fan_in': self.fan_in(node),
+            'graph_2hop_out': len(self._k_hop_ids(node, 2, 'out')),
+            'graph_dist_to_flagged': self.distance_to_flagged(node, max_hops)
+        }
+
+    def _pending_counts(self, new, nodes) -> np.ndarray:
+        """Pending distinct neighbors of each node"""
+        if not new:
+            return np.zeros(len(nodes), dtype=np.int64)
+        return np.fromiter((len(new.get(n, ())) for n in nodes.tolist()), dtype=np.int64, count=len(nodes))
+
+    def _two_hop_counts(self, nodes: np.ndarray) -> np.ndarray:
+        """
+        len(_k_hop_ids(node, 2, 'out')) of sorted distinct `nodes`, for all of
+        them at once: (node, neighbor) pairs of both hops are gathered in one
+        pass and counted per node. A node with more than max_visit + 1
+        distinct neighbors at either hop (a hub, or a wallet paying one)
+        saturates at max_visit without a walk; other nodes with more than
+        max_visit + 1 pairs take the bounded per-node walk.
+        """
+        limit = self.max_visit + 1
+        csr, new = self._out_distinct, self._new_out
+        hop1_counts = csr.degrees(nodes) + self._pending_counts(new, nodes)
+        owners1 = np.repeat(np.arange(len(nodes)), np.minimum(csr.degrees(nodes), limit))
+        hop1 = csr.gather(nodes, limit).astype(np.int64)
+        light = hop1_counts <= limit
+        saturated = ~light
+        if new:
+            extra = [(i, np.fromiter(new[n], dtype=np.int64))
+                     for i, n in enumerate(nodes.tolist()) if n in new and light[i]]
+            if extra:
+                owners1 = np.concatenate([owners1] + [np.full(len(ids), i) for i, ids in extra])
+                hop1 = np.concatenate([hop1] + [ids for _, ids in extra])
+        keep = light[owners1]
+        owners1, hop1 = owners1[keep], hop1[keep]
+
+        # Second hop: rows of the first-hop neighbors, unless an owner's total is over the limit
+        hop2_sizes = csr.degrees(hop1) + self._pending_counts(new, hop1)
+        totals = hop1_counts + np.bincount(owners1, weights=hop2_sizes, minlength=len(nodes)).astype(np.int64)
+        largest = np.zeros(len(nodes), dtype=np.int64)
+        np.maximum.at(largest, owners1, hop2_sizes)
+        saturated |= largest > limit
+        light &= (totals <= limit) & ~saturated
+        keep = light[owners1]
+        owners1, hop1 = owners1[keep], hop1[keep]
+        owners2 = np.repeat(owners1, csr.degrees(hop1))
+        hop2 = csr.gather(hop1).astype(np.int64)
+        if new:
+            extra = [(owner, np.fromiter(new[n], dtype=np.int64))
+                     for owner, n in zip(owners1.tolist(), hop1.tolist()) if n in new]
+            if extra:
+                owners2 = np.concatenate([owners2] + [np.full(len(ids), owner) for owner, ids in extra])
+                hop2 = np.concatenate([hop2] + [ids for _, ids in extra])
+
+        owners = np.concatenate((owners1, owners2))
+        reached = np.concatenate((hop1, hop2))
+        keep = reached != nodes[owners]
+        pairs = _unique(owners[keep] * (len(self.addresses) + 2) + reached[keep])
+        counts = np.bincount(pairs // (len(self.addresses) + 2), minlength=len(nodes))
+        counts = np.minimum(counts, self.max_visit)
+        counts[saturated] = self.max_visit
+        for i in np.flatnonzero(~light & ~saturated).tolist():
+            counts[i] = len(self._k_hop_ids(int(nodes[i]), 2, 'out'))
+        return counts
+
+    def batch_features(self, from_ids, to_ids, max_hops: int = None) -> np.ndarray:
+        """
+        Graph features of a batch of transfers, one row per transfer in
+        GRAPH_FEATURES order: max over both ends, nearest flagged distance.
+        Each distinct wallet of the batch is looked up once, with array ops.
+        """
+        max_hops = self.max_hops if max_hops is None else min(max_hops, self.max_hops)
+        ends = np.stack((np.asarray(from_ids, dtype=np.int64), np.asarray(to_ids, dtype=np.int64)), axis=1)
+        nodes = _unique(ends[ends > NO_ID])
+
+        # Per node; the extra last row stands for missing addresses
+        fan_out = np.append(self._out_distinct.degrees(nodes) + self._pending_counts(self._new_out, nodes), 0)
+        fan_in = np.append(self._in_distinct.degrees(nodes) + self._pending_counts(self._new_in, nodes), 0)
+        two_hop = np.append(self._two_hop_counts(nodes), 0)
+        dist = np.full(len(nodes) + 1, UNREACHED, dtype=np.int64)
+        inside = nodes < len(self._dist)
+        dist[:-1][inside] = self._dist[nodes[inside]]
+        dist[dist > max_hops] = UNREACHED
+
+        index = np.where(ends > NO_ID, np.searchsorted(nodes, ends), len(nodes))
+        nearest = dist[index].min(axis=1)
+        return np.stack((
+            fan_out[index].max(axis=1),
+            fan_in[index].max(axis=1),
+            two_hop[index].max(axis=1),
+            np.where(nearest == UNREACHED, -1, nearest)
+        ), axis=1)
+
+    def transaction_features(self, from_id: int, to_id: int, max_hops: int = None) -> dict:
+        """Graph features of a transfer: max over both ends, nearest flagged distance"""
+        return dict(zip(GRAPH_FEATURES, self.batch_features([from_id], [to_id], max_hops)[0].tolist()))
+
+    def load_from_db(self, session_factory, transaction_model, since: datetime.datetime = None):
+        """
+        Bootstrap the index from stored transfers within the retention window
+        (only those stored after `since` when topping up a restored snapshot)
+        """
+        session = session_factory()
+        try:
+            start_time = datetime.datetime.now() - datetime.timedelta(seconds=self.retention_sec)
+            query = session.query(
+                transaction_model.from_address,
+                transaction_model.to_address,
+                transaction_model.timestamp
+            ).filter(transaction_model.timestamp >= start_time)
+            if since is not None:
+                query = query.filter(transaction_model.timestamp > since)
+            rows = query.order_by(transaction_model.timestamp).all()
+        finally:
+            session.close()
+
+        for from_address, to_address, timestamp in rows:
+            self.add_transfer(from_address, to_address, timestamp.timestamp() if timestamp else None)
+        self.compact()
+        logger.info(f"🕸️ Transfer graph loaded: {len(self.addresses)} addresses, {self.num_edges} edges")
@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import zlib
+import bisect
+import struct
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Record framing: payload length and CRC32 of the payload, little endian
+RECORD_HEADER = struct.Struct('<II')
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.log'
+READ_BUFFER_BYTES = 1 << 20
+
+
+def _segment_name(base_offset: int) -> str:
+    return f"{SEGMENT_PREFIX}{base_offset:020d}{SEGMENT_SUFFIX}"
+
+
+class Checkpoint:
+    """
+    Consumer position (next offset to process) and last block covered.
+
+    `advance` only moves the position in memory; `write` persists it
+    atomically (tmp file, fsync, rename) and may run on another thread, so
+    the consumer can advance on every batch and the writes be coalesced.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+        self.last_block = None
+        self.updated_at = None
+        self.dirty = False
+        self._lock = threading.Lock()
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r') as f:
+                    state = json.load(f)
+                self.offset = int(state.get('offset', 0))
+                self.last_block = state.get('last_block')
+                self.updated_at = state.get('updated_at')
+            except Exception as e:
+                logger.error(f"❌ Unreadable checkpoint {path}, starting from 0: {str(e)}")
+        self.durable_offset = self.offset
+
+    def advance(self, offset: int = None, last_block: int = None):
+        if offset is not None:
+            self.offset = offset
+        if last_block is not None:
+            self.last_block = max(last_block, self.last_block or 0)
+        self.updated_at = time.time()
+        self.dirty = True
+
+    def write(self) -> int:
+        """Persist the current position; returns the offset written"""
+        with self._lock:
+            # Cleared first: an advance during the write marks it dirty again
+            self.dirty = False
+            state = {'offset': self.offset, 'last_block': self.last_block, 'updated_at': self.updated_at}
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.durable_offset = state['offset']
+            return state['offset']
+
+
+class IngestLog:
+    """
+    Append-only log of raw transactions split into size-bounded segments.
+
+    Each record gets a sequential offset; a segment file is named after the
+    offset of its first record. A torn tail (crash mid-write) is detected by
+    length/CRC and truncated on open. Segments entirely below the persisted
+    checkpoint are deleted once more than `keep_segments` exist.
+
+    Consumers commit offset ranges, possibly out of order (replay and live
+    batches run side by side after a restart); the checkpoint only moves
+    over a contiguous run of committed ranges. Nothing touches the disk
+    until `open`.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 keep_segments: int = 4, fsync: bool = False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.keep_segments = keep_segments
+        self.fsync = fsync
+        self.checkpoint = None
+        self.next_offset = 0
+        self._lock = threading.Lock()
+        self._bases = []
+        self._file = None
+        # Ranges committed ahead of the checkpoint: start -> end
+        self._committed = {}
+        self.appended = 0
+        self.replayed = 0
+
+    def open(self):
+        """Create the directory, load the checkpoint and reopen the last segment for appends"""
+        if self._file is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.checkpoint = Checkpoint(os.path.join(self.directory, 'checkpoint.json'))
+        self._bases = sorted(
+            int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+        if not self._bases:
+            self._bases = [self.checkpoint.offset]
+        self.next_offset = self._recover_tail()
+        self._file = open(self._path(self._bases[-1]), 'ab')
+
+    def _path(self, base_offset: int) -> str:
+        return os.path.join(self.directory, _segment_name(base_offset))
+
+    def _scan(self, f):
+        """Yield (payload, end_position) of each valid record from the current position"""
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            length, crc = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            yield payload, f.tell()
+
+    def _recover_tail(self) -> int:
+        """Count records of the last segment and cut any torn write"""
+        path = self._path(self._bases[-1])
+        count, valid_end = 0, 0
+        if os.path.isfile(path):
+            with open(path, 'rb', buffering=READ_BUFFER_BYTES) as f:
+                for _, valid_end in self._scan(f):
+                    count += 1
+            if valid_end < os.path.getsize(path):
+                logger.warning(f"⚠️ Truncating torn tail of {path} at byte {valid_end}")
+                with open(path, 'r+b') as f:
+                    f.truncate(valid_end)
+        return self._bases[-1] + count
+
+    def append_many(self, payloads) -> int:
+        """Append raw payloads; returns the offset following the last one"""
+        with self._lock:
+            for payload in payloads:
+                self._file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+                self._file.write(payload)
+                self.next_offset += 1
+                self.appended += 1
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            if self._file.tell() >= self.segment_bytes:
+                self._roll()
+            return self.next_offset
+
+    def _roll(self):
+        self._file.close()
+        self._bases.append(self.next_offset)
+        self._file = open(self._path(self.next_offset), 'ab')
+
+    def read_from(self, offset: int, max_records: int = None):
+        """Yield (offset, payload) from `offset` up to the current end"""
+        with self._lock:
+            self._file.flush()
+            bases = list(self._bases)
+            end = self.next_offset
+        offset = max(offset, bases[0])
+        produced = 0
+        for i in range(bisect.bisect_right(bases, offset) - 1, len(bases)):
+            current = bases[i]
+            path = self._path(current)
+            if not os.path.isfile(path):
+                continue
+            with open(path, 'rb', buffering=READ_BUFFER_BYTES) as f:
+                for payload, _ in self._scan(f):
+                    if current >= end:
+                        return
+                    if current >= offset:
+                        yield current, payload
+                        produced += 1
+                        if max_records is not None and produced >= max_records:
+                            return
+                    current += 1
+
+    def pending(self) -> int:
+        """Records appended but not yet committed"""
+        return self.next_offset - self.checkpoint.offset
+
+    def commit_range(self, start: int, end: int):
+        """Mark offsets start..end-1 as processed (persisted by flush_checkpoint)"""
+        if end <= start:
+            return
+        self._committed[start] = end
+        offset = self.checkpoint.offset
+        while offset in self._committed:
+            offset = self._committed.pop(offset)
+        if offset != self.checkpoint.offset:
+            self.checkpoint.advance(offset)
+
+    def commit_block(self, number: int):
+        """Mark the chain as covered up to block `number`"""
+        self.checkpoint.advance(last_block=number)
+
+    def flush_checkpoint(self):
+        """Persist the checkpoint if it moved, then drop the segments it covers (thread-safe)"""
+        if self.checkpoint.dirty:
+            self._delete_consumed_segments(self.checkpoint.write())
+
+    def _delete_consumed_segments(self, offset: int):
+        with self._lock:
+            while len(self._bases) > self.keep_segments and self._bases[1] <= offset:
+                base = self._bases.pop(0)
+                try:
+                    os.remove(self._path(base))
+                except OSError as e:
+                    logger.error(f"Error deleting segment {base}: {str(e)}")
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush_checkpoint()
+        with self._lock:
+            self._file.close()
+            self._file = None
+
+    def metrics(self) -> dict:
+        return {
+            'directory': self.directory,
+            'segments': len(self._bases),
+            'next_offset': self.next_offset,
+            'committed_offset': self.checkpoint.offset,
+            'durable_offset': self.checkpoint.durable_offset,
+            'pending': self.pending(),
+            'ranges_ahead': len(self._committed),
+            'last_block': self.checkpoint.last_block,
+            'appended': self.appended,
+            'replayed': self.replayed
+        }
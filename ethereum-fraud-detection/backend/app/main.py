@@ -1,8 +1,8 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import os
 from .ml_inference import predict_wallet
-from .database import init_db, save_prediction
+from .database import init_db, close_db, health_check, save_prediction
 
 app = FastAPI()
 
@@ -11,13 +11,24 @@ class PredictRequest(BaseModel):
 
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    await init_db()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_db()
+
+@app.get('/health')
+async def health():
+    if not await health_check():
+        raise HTTPException(status_code=503, detail='database unavailable')
+    return {'status': 'ok'}
 
 @app.post('/predict')
 async def predict(req: PredictRequest):
     try:
-        result = predict_wallet(req.wallet)
-        save_prediction(result)
+        # DB window query + model inference are blocking: keep them off the event loop
+        result = await run_in_threadpool(predict_wallet, req.wallet)
+        await save_prediction(result)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,295 @@
+import time
+import logging
+from collections import OrderedDict, deque
+import numpy as np
+from app.tx_records import to_raw_bytes
+
+logger = logging.getLogger(__name__)
+
+# Snapshot layout of the tracker tables (fees are clipped to 64 bits, values kept whole)
+HASH_DTYPE = np.dtype([('tx_hash', 'u1', (32,)), ('seen_at', '<f8')])
+SLOT_DTYPE = np.dtype([
+    ('sender', 'u1', (20,)), ('nonce', '<u8'), ('tx_hash', 'u1', (32,)), ('fee', '<u8'),
+    ('to', 'u1', (20,)), ('has_to', '?'), ('value', 'u1', (32,)), ('seen_at', '<f8'), ('versions', '<u4')
+])
+MINED_DTYPE = np.dtype([('sender', 'u1', (20,)), ('nonce', '<u8'), ('block', '<i8'), ('mined_at', '<f8')])
+_MAX_U64 = (1 << 64) - 1
+
+
+def _pack(rows, dtype) -> np.ndarray:
+    """Structured array from tuples in field order (byte fields zero-padded)"""
+    array = np.zeros(len(rows), dtype=dtype)
+    for name, column in zip(dtype.names, zip(*rows)):
+        size = dtype[name].shape[0] if dtype[name].shape else None
+        if size is None:
+            array[name] = column
+        else:
+            raw = b''.join(value[:size].ljust(size, b'\0') for value in column)
+            array[name] = np.frombuffer(raw, dtype=np.uint8).reshape(-1, size)
+    return array
+
+
+def _unpack(column: np.ndarray) -> list:
+    """Rows of a fixed-size byte field as bytes objects"""
+    size = column.shape[1]
+    raw = np.ascontiguousarray(column).tobytes()
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+def _fee(tx) -> int:
+    """Fee a replacement competes on (EIP-1559 max fee, else legacy gas price)"""
+    return int(tx.get('maxFeePerGas') or tx.get('gasPrice') or 0)
+
+
+class _BoundedTable:
+    """
+    Dict bounded to `limit` entries, oldest evicted first. The age order is
+    a side deque of (key, value, time); entries whose value was since
+    replaced or removed are skipped, so `items` stays a plain dict: a
+    snapshot copies it in one C-level call, where copying an OrderedDict
+    walks every node.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.items = {}
+        self._order = deque()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key):
+        return self.items.get(key)
+
+    def pop(self, key):
+        return self.items.pop(key, None)
+
+    def put(self, key, value, ts: float) -> int:
+        """Insert or replace `key` as the newest entry; returns how many old entries were evicted"""
+        items = self.items
+        items[key] = value
+        self._order.append((key, value, ts))
+        evicted = 0
+        while len(items) > self.limit:
+            evicted += self._pop_oldest()
+        if len(self._order) > 2 * len(items) + 1024:
+            # Mostly stale entries (mined slots, replacements): keep the current ones
+            self._order = deque(entry for entry in self._order if items.get(entry[0]) is entry[1])
+        return evicted
+
+    def _pop_oldest(self) -> int:
+        key, value, _ = self._order.popleft()
+        if self.items.get(key) is value:
+            del self.items[key]
+            return 1
+        return 0
+
+    def evict_before(self, cutoff: float) -> int:
+        """Drop entries older than `cutoff` (put order is time order)"""
+        evicted = 0
+        while self._order and self._order[0][2] < cutoff:
+            evicted += self._pop_oldest()
+        return evicted
+
+
+class PendingSlot:
+    """Latest known transaction for one (sender, nonce); replaced, never modified (snapshots share it)"""
+    __slots__ = ('tx_hash', 'fee', 'to', 'value', 'seen_at', 'versions')
+
+    def __init__(self, tx_hash: bytes, fee: int, to: bytes, value: int, seen_at: float, versions: int = 1):
+        self.tx_hash = tx_hash
+        self.fee = fee
+        self.to = to
+        self.value = value
+        self.seen_at = seen_at
+        self.versions = versions
+
+
+class MempoolTracker:
+    """
+    Pending transactions keyed by (sender, nonce), plus a set of known hashes.
+
+    - `filter_new` drops hashes already fetched, so re-announced hashes are
+      neither re-fetched nor re-scored.
+    - `admit` collapses replacements: a same-nonce tx paying more for the same
+      recipient and value (a fee bump) is not scored again; a cancel or a
+      redirect (different recipient/value) is. Underpriced replacements and
+      nonces already mined are skipped.
+    - `reconcile_block` frees the slots of mined transactions; a block number
+      seen again with another hash (reorg) forgets the orphaned block's
+      nonces so they can be re-admitted.
+
+    Every table is bounded by `max_entries` (oldest out first) and evicted
+    after `ttl_sec`, so memory stays flat under churn. The hash, slot and
+    mined tables can be saved with a state snapshot (`export_state` copies
+    them on the event loop, `encode_state` packs them off it) and restored.
+    """
+
+    def __init__(self, max_entries: int = 200_000, ttl_sec: float = 3 * 3600, max_blocks: int = 64):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.max_blocks = max_blocks
+        self._hashes = _BoundedTable(max_entries)   # tx hash -> first seen
+        self._slots = _BoundedTable(max_entries)    # (sender, nonce) -> PendingSlot
+        self._mined = _BoundedTable(max_entries)    # (sender, nonce) -> (block number, mined_at)
+        self._blocks = OrderedDict()    # block number -> (block hash, [(sender, nonce)])
+        self.stats = {
+            'announced': 0,
+            'refetch_skipped': 0,
+            'duplicates_skipped': 0,
+            'admitted': 0,
+            'replacements_collapsed': 0,
+            'replacements_scored': 0,
+            'underpriced_skipped': 0,
+            'mined_skipped': 0,
+            'mined_reconciled': 0,
+            'reorgs': 0,
+            'evicted': 0
+        }
+
+    @staticmethod
+    def _bounded_put(table: OrderedDict, key, value, limit: int) -> int:
+        table[key] = value
+        table.move_to_end(key)
+        dropped = 0
+        while len(table) > limit:
+            table.popitem(last=False)
+            dropped += 1
+        return dropped
+
+    def filter_new(self, tx_hashes, now: float = None) -> list:
+        """Hashes not fetched before (order kept, duplicates within the batch removed)"""
+        now = now if now is not None else time.time()
+        fresh = []
+        for tx_hash in tx_hashes:
+            key = to_raw_bytes(tx_hash)
+            self.stats['announced'] += 1
+            if key in self._hashes:
+                self.stats['refetch_skipped'] += 1
+                continue
+            self.stats['evicted'] += self._hashes.put(key, now, now)
+            fresh.append(tx_hash)
+        return fresh
+
+    def admit(self, tx, now: float = None) -> bool:
+        """Whether a fetched transaction needs scoring"""
+        now = now if now is not None else time.time()
+        tx_hash = to_raw_bytes(tx.get('hash'))
+        if tx_hash not in self._hashes:
+            self.stats['evicted'] += self._hashes.put(tx_hash, now, now)
+
+        key = (to_raw_bytes(tx.get('from')), int(tx.get('nonce', 0) or 0))
+        if key in self._mined and not tx.get('blockNumber'):
+            self.stats['mined_skipped'] += 1
+            return False
+
+        fee = _fee(tx)
+        to = to_raw_bytes(tx.get('to'))
+        value = int(tx.get('value', 0) or 0)
+        slot = self._slots.get(key)
+        if slot is None:
+            self.stats['evicted'] += self._slots.put(key, PendingSlot(tx_hash, fee, to, value, now), now)
+            self.stats['admitted'] += 1
+            return True
+
+        if slot.tx_hash == tx_hash:
+            self.stats['duplicates_skipped'] += 1
+            return False
+        if fee <= slot.fee and not tx.get('blockNumber'):
+            # Nodes reject a replacement that does not pay more
+            self.stats['underpriced_skipped'] += 1
+            return False
+
+        rescore = (to, value) != (slot.to, slot.value)
+        self.stats['evicted'] += self._slots.put(key, PendingSlot(tx_hash, fee, to, value, now, slot.versions + 1), now)
+        if rescore:
+            self.stats['replacements_scored'] += 1
+            return True
+        self.stats['replacements_collapsed'] += 1
+        return False
+
+    def reconcile_block(self, block, now: float = None):
+        """Retire the (sender, nonce) slots mined in `block`"""
+        now = now if now is not None else time.time()
+        number = int(block['number'])
+        block_hash = to_raw_bytes(block['hash'])
+        known = self._blocks.get(number)
+        if known is not None:
+            if known[0] == block_hash:
+                return
+            # Reorg: the orphaned block's nonces may be mined again elsewhere
+            self.stats['reorgs'] += 1
+            logger.warning(f"🔀 Reorg at block {number}: forgetting {len(known[1])} mined nonces")
+            for key in known[1]:
+                self._mined.pop(key)
+
+        keys = []
+        for tx in block['transactions']:
+            if not hasattr(tx, 'get'):
+                continue  # block fetched without full transactions
+            key = (to_raw_bytes(tx.get('from')), int(tx.get('nonce', 0) or 0))
+            keys.append(key)
+            self._slots.pop(key)
+            self.stats['evicted'] += self._mined.put(key, (number, now), now)
+            self.stats['mined_reconciled'] += 1
+        self._bounded_put(self._blocks, number, (block_hash, keys), self.max_blocks)
+
+    def evict_expired(self, now: float = None) -> int:
+        """Drop entries older than ttl_sec"""
+        now = now if now is not None else time.time()
+        cutoff = now - self.ttl_sec
+        evicted = sum(table.evict_before(cutoff) for table in (self._hashes, self._slots, self._mined))
+        self.stats['evicted'] += evicted
+        return evicted
+
+    def export_state(self) -> dict:
+        """Copies of the tables, cheap enough for the event loop (slots are replaced, never modified)"""
+        return {'hashes': self._hashes.items.copy(), 'slots': self._slots.items.copy(), 'mined': self._mined.items.copy()}
+
+    @staticmethod
+    def encode_state(state: dict) -> dict:
+        """Structured arrays of an exported state, oldest entries first (for another thread)"""
+        arrays = {
+            'mempool_hashes': _pack(list(state['hashes'].items()), HASH_DTYPE),
+            'mempool_slots': _pack([
+                (sender, nonce, slot.tx_hash, min(slot.fee, _MAX_U64), slot.to, bool(slot.to),
+                 slot.value.to_bytes(32, 'big'), slot.seen_at, slot.versions)
+                for (sender, nonce), slot in state['slots'].items()
+            ], SLOT_DTYPE),
+            'mempool_mined': _pack([
+                (sender, nonce, block, mined_at) for (sender, nonce), (block, mined_at) in state['mined'].items()
+            ], MINED_DTYPE)
+        }
+        for key, time_field in (('mempool_hashes', 'seen_at'), ('mempool_slots', 'seen_at'), ('mempool_mined', 'mined_at')):
+            arrays[key] = arrays[key][np.argsort(arrays[key][time_field], kind='stable')]
+        return arrays
+
+    def restore_state(self, arrays: dict, now: float = None):
+        """Reload tables saved by encode_state (expired entries are dropped)"""
+        hashes = arrays['mempool_hashes']
+        for tx_hash, seen_at in zip(_unpack(hashes['tx_hash']), hashes['seen_at'].tolist()):
+            self._hashes.put(tx_hash, seen_at, seen_at)
+        slots = arrays['mempool_slots']
+        for sender, nonce, tx_hash, fee, to, has_to, value, seen_at, versions in zip(
+                _unpack(slots['sender']), slots['nonce'].tolist(), _unpack(slots['tx_hash']), slots['fee'].tolist(),
+                _unpack(slots['to']), slots['has_to'].tolist(), _unpack(slots['value']),
+                slots['seen_at'].tolist(), slots['versions'].tolist()):
+            self._slots.put((sender, nonce), PendingSlot(
+                tx_hash, fee, to if has_to else b'', int.from_bytes(value, 'big'), seen_at, versions
+            ), seen_at)
+        mined = arrays['mempool_mined']
+        for sender, nonce, block, mined_at in zip(_unpack(mined['sender']), mined['nonce'].tolist(),
+                                                  mined['block'].tolist(), mined['mined_at'].tolist()):
+            self._mined.put((sender, nonce), (block, mined_at), mined_at)
+        self.evict_expired(now)
+
+    def metrics(self) -> dict:
+        return dict(
+            self.stats,
+            known_hashes=len(self._hashes),
+            pending_slots=len(self._slots),
+            mined_nonces=len(self._mined)
+        )
@@ -1,68 +1,98 @@
+import os
+import logging
 import joblib
 import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+from datetime import datetime, timedelta
 from typing import Dict
-from .etherscan import fetch_all_txs
+from .etherscan import fetch_transactions
+from .feature_extraction import compute_wallet_features, window_aggregates
+from . import feature_definitions
+from .explanations import TreeExplainer
+from .config import EXPLAIN_TOP_K
 
-MODEL_PATH = 'model/fraud_model.pkl'
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model', 'fraud_detection_model.pkl')
+# Same threshold as the websocket monitor
+ALERT_THRESHOLD = 0.7
 
 # simple stub: load artifact if exists otherwise random
 try:
-    model = joblib.load(MODEL_PATH)
+    model_package = joblib.load(MODEL_PATH)
+    model = model_package['model']
+    preprocessor = model_package['preprocessor']
+    feature_definitions.configure(model_package)
 except Exception:
-    model = None
+    model_package = model = preprocessor = None
 
+try:
+    explainer = TreeExplainer(model_package, ALERT_THRESHOLD, top_k=EXPLAIN_TOP_K) if model is not None else None
+except Exception as e:
+    logger.warning(f"Explanations disabled: {str(e)}")
+    explainer = None
 
-def compute_features_for_wallet(wallet: str) -> Dict:
-    """Placeholder feature computation using synthetic values"""
-    # in real impl: query blockchain txs from blockchain.py and compute
-    features = {
-        'tx_count_24h': 100,
-        'sum_value_24h': 50.0,
-        'unique_counterparties_24h': 20,
-        'avg_value_24h': 0.5,
-        'avg_gas_price': 50
-    }
-    return features
 
+def compute_features_for_wallet(wallet: str) -> Dict:
+    """The 18 features the XGBoost model was trained on (single-row path of feature_definitions)"""
+    return compute_wallet_features(wallet)
 
-def normalize_features(d: Dict) -> np.ndarray:
-    arr = np.array([d['tx_count_24h'], d['sum_value_24h'], d['unique_counterparties_24h'], d['avg_value_24h'], d['avg_gas_price']], dtype=float)
-    return arr.reshape(1, -1)
 
+def features_from_etherscan_txs(address: str, txs, lookback_hours: int = 24) -> Dict:
+    """
+    Same features from Etherscan txlist rows instead of the local DB (rows
+    without a timeStamp, e.g. from the Alchemy fallback, are skipped)
+    """
+    now = datetime.utcnow()
+    start = now - timedelta(hours=lookback_hours)
+    transfers = []
+    for tx in txs:
+        if not tx.get('timeStamp'):
+            continue
+        timestamp = datetime.utcfromtimestamp(int(tx['timeStamp']))
+        if timestamp >= start:
+            transfers.append(SimpleNamespace(
+                from_address=(tx.get('from') or '').lower(),
+                to_address=(tx.get('to') or '').lower(),
+                value_eth=int(tx.get('value') or 0) / 1e18,
+                timestamp=timestamp
+            ))
+    return feature_definitions.derive_features(window_aggregates(address.lower(), transfers, now))
 
-def predict_wallet(wallet: str) -> Dict:
-    features = compute_features_for_wallet(wallet)
-    X = normalize_features(features)
 
+def predict_from_features(wallet: str, features: Dict) -> Dict:
     if model is None:
         # random score for POC
-        score = float(np.random.rand())
-        model_version = 'stub-rand'
-    else:
-        score = float(model.decision_function(X)[0])
-        model_version = 'isoforest-v0.1'
-        # normalize decision function to [0,1]
-        score = 1 / (1 + np.exp(-score))
-
-    explain = {
-        'top_features': [
-            {'feature': 'tx_count_24h', 'value': features['tx_count_24h'], 'zscore': 3.2},
-            {'feature': 'sum_value_24h', 'value': features['sum_value_24h'], 'zscore': 2.7}
-        ]
-    }
+        return {
+            'wallet': wallet,
+            'score': float(np.random.rand()),
+            'is_suspicious': False,
+            'model_version': 'stub-rand',
+            'features': features,
+            'explain': None
+        }
+
+    raw = pd.DataFrame([features]).reindex(columns=model_package['features'], fill_value=0)
+    X = preprocessor.transform(raw)
+    score = float(model.predict_proba(X)[0, 1])
+    explain = explainer.explain_row(raw.to_numpy(dtype=np.float64)[0], X[0]) if explainer is not None else None
 
     return {
         'wallet': wallet,
         'score': score,
-        'is_suspicious': score > 0.8,
-        'model_version': model_version,
-        'features': features,
+        'is_suspicious': score > ALERT_THRESHOLD,
+        'model_version': f"xgboost-{model_package.get('training_date', 'unknown')}",
+        'features': {name: float(value) for name, value in features.items()},
         'explain': explain
     }
 
 
-def predict_from_address(address: str):
-    txs = fetch_all_txs(address)
-    # ensuite extraire features à l'aide de feature_engineering.extract_features_from_etherscan_txs
-    features = extract_features_from_etherscan_txs(address, txs)
-    return predict_from_features(features)
+def predict_wallet(wallet: str) -> Dict:
+    return predict_from_features(wallet, compute_features_for_wallet(wallet))
+
+
+def predict_from_address(address: str, chain: str = 'mainnet') -> Dict:
+    """Score a wallet from its Etherscan history (for wallets the monitor has not seen)"""
+    txs = fetch_transactions(address, chain)
+    return predict_from_features(address, features_from_etherscan_txs(address, txs))
@@ -1,13 +1,19 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, create_engine
+from sqlalchemy import (
+    Column, Integer, Float, String, Boolean, DateTime, JSON, LargeBinary,
+    UniqueConstraint, create_engine, event
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+from app.config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+)
 
 Base = declarative_base()
 
 class Transaction(Base):
     __tablename__ = 'transactions'
-    
+
     id = Column(Integer, primary_key=True)
     hash = Column(String, unique=True)
     from_address = Column(String)
@@ -15,11 +21,93 @@ class Transaction(Base):
     value_eth = Column(Float)
     gas_price = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
-    
+
     def __repr__(self):
         return f"<Transaction {self.hash}>"
 
+class Prediction(Base):
+    __tablename__ = 'predictions'
+
+    id = Column(Integer, primary_key=True)
+    wallet = Column(String, index=True)
+    tx_hash = Column(String)
+    model_version = Column(String)
+    score = Column(Float)
+    is_suspicious = Column(Boolean)
+    explain = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Prediction {self.wallet} {self.score}>"
+
+class WalletHourlyStats(Base):
+    """Per-wallet, per-hour rollup of the transactions table"""
+    __tablename__ = 'wallet_hourly_stats'
+    __table_args__ = (UniqueConstraint('wallet', 'bucket_start', name='uq_wallet_bucket'),)
+
+    id = Column(Integer, primary_key=True)
+    wallet = Column(String, nullable=False)
+    bucket_start = Column(DateTime, nullable=False, index=True)
+    sent_count = Column(Integer, default=0)
+    sent_sum = Column(Float, default=0.0)
+    sent_sumsq = Column(Float, default=0.0)
+    recv_count = Column(Integer, default=0)
+    recv_sum = Column(Float, default=0.0)
+    recv_sumsq = Column(Float, default=0.0)
+    first_recv_at = Column(DateTime)
+    last_recv_at = Column(DateTime)
+    first_seen_at = Column(DateTime)
+    last_seen_at = Column(DateTime)
+    # HyperLogLog sketch of distinct counterparties
+    counterparties = Column(LargeBinary)
+
+    def __repr__(self):
+        return f"<WalletHourlyStats {self.wallet} {self.bucket_start}>"
+
+
+def normalize_database_url(url: str) -> str:
+    """
+    Sync URL for DATABASE_URL: Heroku/Supabase-style postgres:// is rejected
+    by SQLAlchemy >= 1.4, and a bare postgresql:// picks a default driver
+    that changed in 2.1 (psycopg 3); name psycopg2 (requirements.txt)
+    """
+    for scheme in ('postgres://', 'postgresql://'):
+        if url.startswith(scheme):
+            return 'postgresql+psycopg2://' + url[len(scheme):]
+    return url
+
+
+def engine_options(url: str) -> dict:
+    """Pool settings shared by the sync and async engines"""
+    if url.startswith('sqlite'):
+        # SQLite connections are cheap; the default pool is enough
+        return {}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True
+    }
+
+
+def enable_sqlite_wal(engine):
+    """WAL lets readers proceed while the monitor writes"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA busy_timeout=5000')
+        cursor.close()
+
+
 # Configuration
-engine = create_engine('sqlite:///transactions.db')
+SQLALCHEMY_URL = normalize_database_url(DATABASE_URL or 'sqlite:///transactions.db')
+engine = create_engine(SQLALCHEMY_URL, **engine_options(SQLALCHEMY_URL))
+enable_sqlite_wal(engine)
 Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
\ No newline at end of file
+Session = sessionmaker(bind=engine)
@@ -0,0 +1,202 @@
+import os
+import time
+import queue
+import logging
+import datetime
+import threading
+import numpy as np
+from app.feature_extraction import REQUIRED_FEATURES
+from app.graph_index import GRAPH_FEATURES
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+FEATURE_COLUMNS = REQUIRED_FEATURES + GRAPH_FEATURES
+# Per-row text columns of a batch (lists); the numeric ones are arrays
+TEXT_COLUMNS = ('hash', 'from', 'to', 'classification', 'list_match')
+PART_SUFFIX = '.parquet'
+
+
+def scored_schema():
+    """Columns of the scored transaction files (one float32 column per feature)"""
+    return pa.schema(
+        [
+            ('hash', pa.string()),
+            ('from', pa.string()),
+            ('to', pa.string()),
+            ('value_eth', pa.float64()),
+            ('gas_price', pa.float64()),
+            ('classification', pa.dictionary(pa.int8(), pa.string())),
+            ('list_match', pa.string()),
+            ('timestamp', pa.timestamp('us'))
+        ] + [(name, pa.float32()) for name in FEATURE_COLUMNS]
+    )
+
+
+def partition_dir(directory: str, ts: datetime.datetime) -> str:
+    """Hive-style date/hour partition directory"""
+    return os.path.join(directory, f"date={ts:%Y-%m-%d}", f"hour={ts:%H}")
+
+
+class ParquetSink:
+    """
+    Buffers scored transactions and writes them as compressed Parquet files
+    partitioned by date and hour, on a writer thread.
+
+    Scored transactions arrive as columnar batches (see `append`) and are
+    written as Arrow arrays without going through per-row dicts. A buffer is
+    written once it holds `flush_rows` rows or is `flush_sec` old; every
+    flush adds one part file per partition it touches. Files are written
+    under a temporary name and renamed, so readers never see partial files.
+    """
+
+    def __init__(self, directory: str, flush_rows: int = 10_000, flush_sec: float = 60.0,
+                 compression: str = 'zstd'):
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_sec = flush_sec
+        self.compression = compression
+        self.rows_written = 0
+        self.files_written = 0
+        self.errors = 0
+        self._buffer = []
+        self._buffered_rows = 0
+        self._buffer_started = None
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return pa is not None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if not self.enabled:
+            logger.warning("⚠️ pyarrow is not installed - Parquet export disabled")
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='parquet-sink', daemon=True)
+        self._thread.start()
+        logger.info(f"🗃️ Parquet export to {self.directory} ({self.compression})")
+
+    def stop(self):
+        """Write whatever is buffered and wait for the writer"""
+        if self._thread is None:
+            return
+        self._hand_off()
+        self._stopping.set()
+        self._thread.join(timeout=30)
+        self._thread = None
+
+    def append(self, batch: dict):
+        """
+        Queue a batch of scored transactions for export: TEXT_COLUMNS as
+        lists, 'value_eth', 'gas_price' and 'seen_at' (epoch seconds) as
+        arrays, 'features' as an (n, len(FEATURE_COLUMNS)) float32 matrix
+        with NaN where a feature is missing
+        """
+        rows = len(batch['seen_at'])
+        if self._thread is None or not rows:
+            return
+        with self._lock:
+            if not self._buffer:
+                self._buffer_started = time.monotonic()
+            self._buffer.append(batch)
+            self._buffered_rows += rows
+            full = self._buffered_rows >= self.flush_rows
+        if full:
+            self._hand_off()
+
+    def _hand_off(self):
+        with self._lock:
+            batches, self._buffer = self._buffer, []
+            self._buffered_rows = 0
+            self._buffer_started = None
+        if batches:
+            self._queue.put(batches)
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                batches = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                with self._lock:
+                    stale = (self._buffer_started is not None and
+                             time.monotonic() - self._buffer_started >= self.flush_sec)
+                if stale:
+                    self._hand_off()
+                continue
+            try:
+                self._write(batches)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Parquet export error ({sum(len(b['seen_at']) for b in batches)} rows lost): {str(e)}")
+
+    def _table(self, batches, seen_at: np.ndarray, offsets: np.ndarray):
+        """Arrow table of the concatenated batches (timestamps in local time, like the DB)"""
+        schema = scored_schema()
+        columns = {
+            name: pa.array([value for batch in batches for value in batch[name]], type=schema.field(name).type)
+            for name in TEXT_COLUMNS
+        }
+        for name in ('value_eth', 'gas_price'):
+            columns[name] = pa.array(np.concatenate([batch[name] for batch in batches]), type=pa.float64())
+        # Microseconds rounded from the fraction alone, as datetime.fromtimestamp does
+        seconds = np.floor(seen_at)
+        micros = (seconds + offsets).astype(np.int64) * 1_000_000 + np.round((seen_at - seconds) * 1e6).astype(np.int64)
+        columns['timestamp'] = pa.array(micros, type=pa.timestamp('us'))
+        features = np.concatenate([batch['features'] for batch in batches])
+        for j, name in enumerate(FEATURE_COLUMNS):
+            columns[name] = pa.array(features[:, j], mask=np.isnan(features[:, j]), type=pa.float32())
+        return pa.Table.from_arrays([columns[name] for name in schema.names], schema=schema)
+
+    def _write(self, batches):
+        seen_at = np.concatenate([batch['seen_at'] for batch in batches])
+        # Partitions and UTC offsets are resolved per distinct minute (time zones move in whole minutes)
+        minutes, inverse = np.unique(np.floor(seen_at / 60).astype(np.int64), return_inverse=True)
+        paths = {}
+        minute_partition = np.array([
+            paths.setdefault(partition_dir(self.directory, datetime.datetime.fromtimestamp(minute * 60)), len(paths))
+            for minute in minutes.tolist()
+        ])
+        offsets = np.array([time.localtime(minute * 60).tm_gmtoff for minute in minutes.tolist()], dtype=np.float64)
+        table = self._table(batches, seen_at, offsets[inverse])
+        row_partition = minute_partition[inverse]
+
+        for path, partition in paths.items():
+            part = table.take(pa.array(np.flatnonzero(row_partition == partition)))
+            os.makedirs(path, exist_ok=True)
+            self._sequence += 1
+            name = f"part-{int(time.time() * 1000)}-{self._sequence:06d}"
+            tmp_path = os.path.join(path, f".{name}.tmp")
+            pq.write_table(part, tmp_path, compression=self.compression)
+            os.replace(tmp_path, os.path.join(path, name + PART_SUFFIX))
+            self.rows_written += len(part)
+            self.files_written += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            buffered = self._buffered_rows
+        return {
+            'enabled': self._thread is not None,
+            'directory': self.directory,
+            'buffered_rows': buffered,
+            'pending_flushes': self._queue.qsize(),
+            'rows_written': self.rows_written,
+            'files_written': self.files_written,
+            'errors': self.errors
+        }
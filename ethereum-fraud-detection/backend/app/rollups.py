@@ -0,0 +1,140 @@
+import logging
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from app.models import Session, Transaction, WalletHourlyStats
+from app.sketches import HyperLogLog
+from app.config import ROLLUP_HLL_PRECISION
+
+logger = logging.getLogger(__name__)
+
+
+def bucket_start(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _get_bucket(session, wallet: str, bucket: datetime) -> WalletHourlyStats:
+    # Row lock on Postgres so concurrent writers don't lose each other's increments
+    row = session.query(WalletHourlyStats).filter_by(
+        wallet=wallet, bucket_start=bucket
+    ).with_for_update().one_or_none()
+    if row is None:
+        row = WalletHourlyStats(
+            wallet=wallet, bucket_start=bucket,
+            sent_count=0, sent_sum=0.0, sent_sumsq=0.0,
+            recv_count=0, recv_sum=0.0, recv_sumsq=0.0
+        )
+        session.add(row)
+    return row
+
+
+def _fold(row: WalletHourlyStats, value: float, ts: datetime, counterparty: str, sent: bool):
+    if sent:
+        row.sent_count += 1
+        row.sent_sum += value
+        row.sent_sumsq += value * value
+    else:
+        row.recv_count += 1
+        row.recv_sum += value
+        row.recv_sumsq += value * value
+        row.first_recv_at = min(row.first_recv_at or ts, ts)
+        row.last_recv_at = max(row.last_recv_at or ts, ts)
+    row.first_seen_at = min(row.first_seen_at or ts, ts)
+    row.last_seen_at = max(row.last_seen_at or ts, ts)
+
+    if counterparty:
+        sketch = (HyperLogLog.from_bytes(row.counterparties) if row.counterparties
+                  else HyperLogLog(ROLLUP_HLL_PRECISION))
+        sketch.add(counterparty)
+        row.counterparties = sketch.to_bytes()
+
+
+def update_rollups(session, tx_row: Transaction, retries: int = 1) -> bool:
+    """
+    Fold one stored transaction into the hourly buckets of both wallets
+    (caller commits). The transaction row is flushed first, so a duplicate
+    hash still raises to the caller; the buckets are written in a savepoint,
+    and losing a race to insert the same bucket (uq_wallet_bucket) retries
+    against the winner's row instead of failing the caller's transaction.
+    """
+    session.add(tx_row)
+    session.flush()
+    for attempt in range(retries + 1):
+        try:
+            with session.begin_nested():
+                _fold_transaction(session, tx_row)
+            return True
+        except IntegrityError as e:
+            if attempt == retries:
+                logger.error(f"❌ Rollup of {tx_row.hash} skipped (rebuild_rollups restores it): {str(e)}")
+                return False
+    return False
+
+
+def _fold_transaction(session, tx_row: Transaction):
+    ts = tx_row.timestamp or datetime.utcnow()
+    bucket = bucket_start(ts)
+    value = tx_row.value_eth or 0.0
+    if tx_row.from_address:
+        _fold(_get_bucket(session, tx_row.from_address, bucket), value, ts, tx_row.to_address, sent=True)
+    if tx_row.to_address:
+        _fold(_get_bucket(session, tx_row.to_address, bucket), value, ts, tx_row.from_address, sent=False)
+
+
+def aggregate_window(wallet_address: str, since: datetime) -> dict:
+    """
+    Merge the wallet's hourly buckets from the bucket containing `since` on.
+    Sums add up, min/max timestamps combine and counterparty sketches merge.
+    """
+    session = Session()
+    try:
+        rows = session.query(WalletHourlyStats).filter(
+            (WalletHourlyStats.wallet == wallet_address) &
+            (WalletHourlyStats.bucket_start >= bucket_start(since))
+        ).all()
+    finally:
+        session.close()
+
+    agg = {
+        'sent_count': 0, 'sent_sum': 0.0, 'sent_sumsq': 0.0,
+        'recv_count': 0, 'recv_sum': 0.0, 'recv_sumsq': 0.0,
+        'first_recv_at': None, 'last_recv_at': None,
+        'unique_counterparties': 0, 'unique_counterparties_error': 0.0, 'buckets': len(rows)
+    }
+    sketch = None
+    for row in rows:
+        for key in ('sent_count', 'sent_sum', 'sent_sumsq', 'recv_count', 'recv_sum', 'recv_sumsq'):
+            agg[key] += getattr(row, key) or 0
+        if row.first_recv_at is not None:
+            agg['first_recv_at'] = min(agg['first_recv_at'] or row.first_recv_at, row.first_recv_at)
+            agg['last_recv_at'] = max(agg['last_recv_at'] or row.last_recv_at, row.last_recv_at)
+        if row.counterparties:
+            bucket_sketch = HyperLogLog.from_bytes(row.counterparties)
+            sketch = bucket_sketch if sketch is None else sketch.merge(bucket_sketch)
+    if sketch is not None:
+        agg['unique_counterparties'] = round(sketch.count())
+        agg['unique_counterparties_error'] = sketch.relative_error
+    return agg
+
+
+def rebuild_rollups(batch_size: int = 10_000):
+    """Recompute every bucket from the transactions table (for existing databases)"""
+    session = Session()
+    try:
+        session.query(WalletHourlyStats).delete()
+        session.commit()
+        last_id = 0
+        while True:
+            rows = session.query(Transaction).filter(Transaction.id > last_id).order_by(Transaction.id).limit(batch_size).all()
+            if not rows:
+                break
+            for tx_row in rows:
+                update_rollups(session, tx_row)
+            session.commit()
+            last_id = rows[-1].id
+            logger.info(f"📦 Rolled up transactions up to id {last_id}")
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    rebuild_rollups()
@@ -0,0 +1,124 @@
+import json
+import logging
+import threading
+import numpy as np
+from app.feature_extraction import REQUIRED_FEATURES
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal
+}
+
+
+class Rule:
+    """Threshold on one named feature: `feature <op> threshold`"""
+
+    def __init__(self, name: str, feature: str, op: str, threshold: float):
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator {op!r} in rule {name!r}")
+        self.name = name
+        self.feature = feature
+        self.op = op
+        self.threshold = float(threshold)
+
+    def __repr__(self):
+        return f"<Rule {self.name}: {self.feature} {self.op} {self.threshold:g}>"
+
+
+# Degraded-mode rules (used when the model is missing or inference fails)
+DEFAULT_RULES = [
+    Rule('fast_received_burst', 'time_diff_first_last_received', '<', 300),
+    Rule('high_send_count', 'total_tx_sent', '>', 50),
+    Rule('volatile_received_values', 'value_volatility', '>', 0.7),
+    Rule('value_anomaly', 'value_anomaly', '==', 1),
+    Rule('frequency_anomaly', 'frequency_anomaly', '==', 1)
+]
+DEFAULT_MIN_HITS = 2
+
+
+class RuleSet:
+    """
+    Rules compiled against a feature column layout and evaluated on whole
+    batches: one vectorized comparison per rule over a feature matrix, a
+    transaction is SUSPICIOUS when at least `min_hits` rules fire.
+    """
+
+    def __init__(self, rules=None, min_hits: int = DEFAULT_MIN_HITS, feature_names=None):
+        self.rules = list(rules if rules is not None else DEFAULT_RULES)
+        self.min_hits = min_hits
+        self.feature_names = list(feature_names or REQUIRED_FEATURES)
+        column_index = {name: i for i, name in enumerate(self.feature_names)}
+        missing = [rule.feature for rule in self.rules if rule.feature not in column_index]
+        if missing:
+            raise ValueError(f"Rules reference unknown features: {missing}")
+        self._columns = [column_index[rule.feature] for rule in self.rules]
+        self._ops = [OPERATORS[rule.op] for rule in self.rules]
+        self._thresholds = [np.float32(rule.threshold) for rule in self.rules]
+        self._lock = threading.Lock()
+        self.rule_hits = np.zeros(len(self.rules), dtype=np.int64)
+        self.evaluated = 0
+        self.flagged = 0
+
+    @classmethod
+    def from_file(cls, path: str, feature_names=None):
+        """
+        Load rules from JSON:
+        {"min_hits": 2, "rules": [{"name": ..., "feature": ..., "op": ">", "threshold": 50}]}
+        """
+        with open(path, 'r') as f:
+            config = json.load(f)
+        rules = [Rule(r['name'], r['feature'], r['op'], r['threshold']) for r in config['rules']]
+        return cls(rules, config.get('min_hits', DEFAULT_MIN_HITS), feature_names)
+
+    def evaluate(self, feature_matrix: np.ndarray):
+        """Boolean (n_rows, n_rules) matrix of rule hits and the SUSPICIOUS mask"""
+        feature_matrix = np.asarray(feature_matrix)
+        hits = np.empty((feature_matrix.shape[0], len(self.rules)), dtype=bool)
+        for j, (column, op, threshold) in enumerate(zip(self._columns, self._ops, self._thresholds)):
+            op(feature_matrix[:, column], threshold, out=hits[:, j])
+        suspicious = hits.sum(axis=1) >= self.min_hits
+
+        with self._lock:
+            self.rule_hits += hits.sum(axis=0)
+            self.evaluated += int(feature_matrix.shape[0])
+            self.flagged += int(np.count_nonzero(suspicious))
+        return hits, suspicious
+
+    def classify(self, feature_matrix: np.ndarray) -> list:
+        if len(feature_matrix) == 0:
+            return []
+        _, suspicious = self.evaluate(feature_matrix)
+        return np.where(suspicious, "SUSPICIOUS", "LEGITIMATE").tolist()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'min_hits': self.min_hits,
+                'evaluated': self.evaluated,
+                'flagged': self.flagged,
+                'rules': {
+                    rule.name: {
+                        'condition': f"{rule.feature} {rule.op} {rule.threshold:g}",
+                        'hits': int(hits)
+                    }
+                    for rule, hits in zip(self.rules, self.rule_hits)
+                }
+            }
+
+
+def load_rule_set(path: str = None) -> RuleSet:
+    """Rules from `path` when given and valid, otherwise the defaults"""
+    if path:
+        try:
+            rule_set = RuleSet.from_file(path)
+            logger.info(f"📏 Loaded {len(rule_set.rules)} fallback rules from {path}")
+            return rule_set
+        except Exception as e:
+            logger.error(f"❌ Error loading rules from {path}: {str(e)}")
+    return RuleSet()
@@ -0,0 +1,197 @@
+import os
+import time
+import queue
+import random
+import logging
+import threading
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingHistogram:
+    """Fixed-bin histogram over [low, high] updated in place"""
+
+    def __init__(self, bins: int = 20, low: float = 0.0, high: float = 1.0):
+        self.bins = bins
+        self.low = low
+        self.high = high
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.total = 0
+        self.sum = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        scaled = (values - self.low) / (self.high - self.low) * self.bins
+        idx = np.clip(scaled.astype(np.int64), 0, self.bins - 1)
+        self.counts += np.bincount(idx, minlength=self.bins)
+        self.total += int(values.size)
+        self.sum += float(values.sum())
+
+    def to_dict(self):
+        return {
+            'low': self.low,
+            'high': self.high,
+            'counts': self.counts.tolist(),
+            'count': self.total,
+            'mean': self.sum / self.total if self.total else 0.0
+        }
+
+
+class CandidateStats:
+    """Agreement and score-distribution statistics for one candidate model"""
+
+    def __init__(self):
+        self.scored = 0
+        self.agreements = 0
+        self.primary_only = 0
+        self.candidate_only = 0
+        self.errors = 0
+        self.scores = StreamingHistogram()
+        self.deltas = StreamingHistogram(low=-1.0, high=1.0)
+
+    def update(self, primary_scores, candidate_scores, threshold):
+        primary_flags = primary_scores > threshold
+        candidate_flags = candidate_scores > threshold
+        self.scored += int(primary_flags.size)
+        self.agreements += int(np.count_nonzero(primary_flags == candidate_flags))
+        self.primary_only += int(np.count_nonzero(primary_flags & ~candidate_flags))
+        self.candidate_only += int(np.count_nonzero(candidate_flags & ~primary_flags))
+        self.scores.update(candidate_scores)
+        self.deltas.update(candidate_scores - primary_scores)
+
+    def to_dict(self):
+        return {
+            'scored': self.scored,
+            'agreement_rate': self.agreements / self.scored if self.scored else None,
+            'primary_only_suspicious': self.primary_only,
+            'candidate_only_suspicious': self.candidate_only,
+            'errors': self.errors,
+            'score_histogram': self.scores.to_dict(),
+            'delta_histogram': self.deltas.to_dict()
+        }
+
+
+def load_candidate_models(paths) -> dict:
+    """Load candidate model packages (same layout as the production pickle)"""
+    candidates = {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            with open(path, 'rb') as f:
+                package = joblib.load(f)
+            if package.get('model') is None or package.get('preprocessor') is None:
+                logger.error(f"❌ Shadow model {path} missing required components")
+                continue
+            candidates[name] = package
+            logger.info(f"👥 Shadow model loaded: {name}")
+        except Exception as e:
+            logger.error(f"❌ Error loading shadow model {path}: {str(e)}")
+    return candidates
+
+
+class ShadowScorer:
+    """
+    Scores already-featurized batches with candidate models on a side thread.
+
+    The primary path only enqueues (never blocks); batches are shed when the
+    queue is full, and the worker sleeps after each batch so that it never
+    uses more than `max_duty_cycle` of wall time.
+    """
+
+    def __init__(self, candidates: dict, threshold: float = 0.7, max_pending: int = 8,
+                 sample_rate: float = 1.0, max_duty_cycle: float = 0.25):
+        self.candidates = candidates
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.max_duty_cycle = min(max(max_duty_cycle, 0.01), 1.0)
+        self.primary_scores = StreamingHistogram()
+        self.stats = {name: CandidateStats() for name in candidates}
+        self.submitted = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.candidates)
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+        self._thread.start()
+        logger.info(f"👥 Shadow scoring started with {len(self.candidates)} candidate(s)")
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def submit(self, feature_df, primary_scores) -> bool:
+        """Queue a scored batch for shadow evaluation without blocking"""
+        if not self.enabled:
+            return False
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        try:
+            self._queue.put_nowait((feature_df, np.asarray(primary_scores, dtype=np.float64)))
+            self.submitted += 1
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _score(self, name, package, feature_df):
+        expected_features = package.get('features')
+        if expected_features:
+            feature_df = feature_df.reindex(columns=expected_features, fill_value=0)
+        X = package['preprocessor'].transform(feature_df)
+        return package['model'].predict_proba(X)[:, 1]
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                feature_df, primary_scores = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            started = time.perf_counter()
+            results = {}
+            for name, package in self.candidates.items():
+                try:
+                    results[name] = self._score(name, package, feature_df)
+                except Exception as e:
+                    logger.error(f"Shadow scoring error ({name}): {str(e)}")
+                    results[name] = None
+
+            with self._lock:
+                self.primary_scores.update(primary_scores)
+                for name, candidate_scores in results.items():
+                    if candidate_scores is None:
+                        self.stats[name].errors += 1
+                    else:
+                        self.stats[name].update(primary_scores, candidate_scores, self.threshold)
+
+            # Cap shadow load: idle long enough to stay under the duty cycle
+            elapsed = time.perf_counter() - started
+            idle = elapsed * (1.0 - self.max_duty_cycle) / self.max_duty_cycle
+            if idle > 0:
+                self._stopping.wait(idle)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'submitted_batches': self.submitted,
+                'dropped_batches': self.dropped,
+                'pending_batches': self._queue.qsize(),
+                'primary_score_histogram': self.primary_scores.to_dict(),
+                'candidates': {name: stats.to_dict() for name, stats in self.stats.items()}
+            }
@@ -0,0 +1,199 @@
+import math
+import hashlib
+import binascii
+import numpy as np
+
+_MASK_64 = (1 << 64) - 1
+_MIX_1 = np.uint64(0xbf58476d1ce4e5b9)
+_MIX_2 = np.uint64(0x94d049bb133111eb)
+_BIT_SHIFTS = (32, 16, 8, 4, 2, 1)
+_ADDRESS_CHARS = 42
+
+
+def _mix64(x):
+    """splitmix64 finalizer (vectorized over uint64 arrays)"""
+    with np.errstate(over='ignore'):
+        x = (x ^ (x >> np.uint64(30))) * _MIX_1
+        x = (x ^ (x >> np.uint64(27))) * _MIX_2
+        return x ^ (x >> np.uint64(31))
+
+
+def _mix64_scalar(x: int) -> int:
+    """Same finalizer on a single Python int (avoids NumPy call overhead)"""
+    x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & _MASK_64
+    x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & _MASK_64
+    return x ^ (x >> 31)
+
+
+def _is_address(value) -> bool:
+    return isinstance(value, str) and len(value) == _ADDRESS_CHARS and value[:2] in ('0x', '0X')
+
+
+def _hash64(value) -> int:
+    """Hex addresses: splitmix64 over their last 16 bytes; anything else: blake2b"""
+    if _is_address(value):
+        try:
+            raw = bytes.fromhex(value[2:])
+            lo = int.from_bytes(raw[4:12], 'little')
+            hi = int.from_bytes(raw[12:20], 'little')
+            return _mix64_scalar(lo ^ _mix64_scalar(hi))
+        except ValueError:
+            pass
+    if isinstance(value, str):
+        value = value.lower().encode()
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+
+
+def _hash_many(values) -> np.ndarray:
+    """_hash64 over a batch, decoding hex addresses in one pass when possible"""
+    values = [value for value in values if value is not None]
+    try:
+        chars = np.frombuffer(''.join(values).encode('ascii'), dtype=np.uint8)
+        if len(chars) == _ADDRESS_CHARS * len(values) and values:
+            chars = chars.reshape(-1, _ADDRESS_CHARS)
+            if np.all(chars[:, 0] == ord('0')) and np.all((chars[:, 1] | 0x20) == ord('x')):
+                raw = np.frombuffer(binascii.unhexlify(np.ascontiguousarray(chars[:, 2:]).tobytes()),
+                                    dtype=np.uint8).reshape(-1, 20)
+                lo = np.ascontiguousarray(raw[:, 4:12]).view('<u8').ravel()
+                hi = np.ascontiguousarray(raw[:, 12:20]).view('<u8').ravel()
+                return _mix64(lo ^ _mix64(hi))
+    except (TypeError, ValueError, binascii.Error):
+        # Not all hex address strings: hash one by one
+        pass
+    return np.fromiter((_hash64(value) for value in values), dtype=np.uint64, count=len(values))
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Vectorized int.bit_length for uint64 arrays"""
+    length = np.zeros(len(values), dtype=np.uint8)
+    values = values.copy()
+    for shift in _BIT_SHIFTS:
+        high = values >= (np.uint64(1) << np.uint64(shift))
+        length[high] += shift
+        values[high] >>= np.uint64(shift)
+    length += (values > 0).astype(np.uint8)
+    return length
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch with 2**p one-byte registers.
+
+    Relative standard error is about 1.04 / sqrt(2**p) (p=10: 3.3%,
+    p=12: 1.6%, p=14: 0.8%). Sketches with the same p merge losslessly
+    (register-wise max), so per-bucket or per-shard sketches can be combined.
+    """
+
+    def __init__(self, p: int = 12, registers=None):
+        if not 4 <= p <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, value):
+        x = _hash64(value)
+        index = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        """Add many values at once (None is skipped); same registers as repeated add()"""
+        hashes = _hash_many(values)
+        if not len(hashes):
+            return
+        width = np.uint64(64 - self.p)
+        index = (hashes >> width).astype(np.intp)
+        rest = hashes & ((np.uint64(1) << width) - np.uint64(1))
+        rank = (int(width) + 1 - _bit_length(rest).astype(np.int32)).astype(np.uint8)
+        registers = np.frombuffer(self.registers, dtype=np.uint8).copy()
+        np.maximum.at(registers, index, rank)
+        self.registers = bytearray(registers.tobytes())
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """In-place register-wise max with another sketch of the same precision"""
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        merged = np.maximum(np.frombuffer(self.registers, dtype=np.uint8),
+                            np.frombuffer(other.registers, dtype=np.uint8))
+        self.registers = bytearray(merged.tobytes())
+        return self
+
+    def count(self) -> float:
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / float(np.sum(np.ldexp(1.0, -registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * self.m and zeros:
+            # Small range: linear counting is more accurate
+            estimate = self.m * math.log(self.m / zeros)
+        return estimate
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def bounds(self, sigmas: float = 2.0):
+        """(estimate, low, high); sigmas=2 covers ~95% of estimates"""
+        estimate = self.count()
+        margin = sigmas * self.relative_error * estimate
+        return estimate, max(estimate - margin, 0.0), estimate + margin
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.p]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        return cls(data[0], data[1:])
+
+
+class DistinctCounter:
+    """
+    Distinct counter switchable between an exact set and a HyperLogLog.
+
+    Both modes expose the same add/update/merge/count calls, so per-bucket
+    or per-shard counters combine the same way whichever mode is configured.
+    None (the receiver of a contract creation) is never counted, in either
+    mode. In exact mode relative_error is 0.
+    """
+
+    def __init__(self, mode: str = 'exact', p: int = 12):
+        if mode not in ('exact', 'approx'):
+            raise ValueError(f"Unknown distinct count mode: {mode}")
+        self.mode = mode
+        self._values = set() if mode == 'exact' else None
+        self._sketch = HyperLogLog(p) if mode == 'approx' else None
+
+    def add(self, value):
+        if value is None:
+            return
+        if self._sketch is None:
+            self._values.add(value)
+        else:
+            self._sketch.add(value)
+
+    def update(self, values):
+        if self._sketch is None:
+            self._values.update(value for value in values if value is not None)
+        else:
+            self._sketch.update(values)
+
+    def merge(self, other: 'DistinctCounter') -> 'DistinctCounter':
+        if other.mode != self.mode:
+            raise ValueError("Cannot merge exact and approximate counters")
+        if self._sketch is None:
+            self._values |= other._values
+        else:
+            self._sketch.merge(other._sketch)
+        return self
+
+    def count(self) -> int:
+        if self._sketch is None:
+            return len(self._values)
+        return round(self._sketch.count())
+
+    @property
+    def relative_error(self) -> float:
+        return 0.0 if self._sketch is None else self._sketch.relative_error
@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+import numpy as np
+from app.graph_index import merge_edges
+from app.mempool import MempoolTracker
+
+logger = logging.getLogger(__name__)
+
+FULL_PREFIX = 'full-'
+DELTA_PREFIX = 'delta-'
+META_FILE = 'meta.json'
+ARRAYS = ('labels', 'src', 'dst', 'times', 'flagged')
+MEMPOOL_ARRAYS = ('mempool_hashes', 'mempool_slots', 'mempool_mined')
+
+
+def _snapshot_name(kind: str, seq: int) -> str:
+    return f"{FULL_PREFIX if kind == 'full' else DELTA_PREFIX}{seq:010d}"
+
+
+class SnapshotStore:
+    """
+    Binary snapshots of the monitor's in-memory state, for warm restarts.
+
+    A snapshot is a directory of .npy arrays (interned address labels, graph
+    edges as int32 ids with float32 times relative to `time_base`, flagged
+    ids, pending-tx tracker tables) plus meta.json (counters, watermark). A
+    full snapshot holds everything; the next ones are deltas against it,
+    holding only the labels interned and the edges added since (flags,
+    counters and tracker tables are bounded and always whole). A new full
+    snapshot is taken every `full_every` snapshots or once the delta
+    outgrows `full_ratio` of it, so a restore reads at most two snapshots.
+    Directories are written under a temporary name and renamed; arrays are
+    memory-mapped on load.
+
+    `capture` only takes references and cheap copies (on the event loop,
+    between batches) and fixes the watermark and full base right away, so
+    the next capture never depends on a write having finished; `write` does
+    the merging, encoding and disk I/O (meant for an executor thread, one
+    write at a time).
+    """
+
+    def __init__(self, directory: str, full_every: int = 10, full_ratio: float = 0.5):
+        self.directory = directory
+        self.full_every = full_every
+        self.full_ratio = full_ratio
+        self._seq = 0
+        self._base = None           # {'seq', 'labels', 'edges', 'watermark'} of the last full snapshot
+        self._deltas = 0
+        self._write_lock = threading.Lock()
+        self.stats = {
+            'full_written': 0,
+            'deltas_written': 0,
+            'last_kind': None,
+            'last_bytes': 0,
+            'last_capture_ms': 0.0,
+            'last_write_ms': 0.0,
+            'last_snapshot_at': None,
+            'restored_from': None,
+            'restore_ms': None,
+            'errors': 0
+        }
+
+    def capture(self, addresses, graph, counters: dict, mempool=None) -> dict:
+        """Reference or copy the state to snapshot; full or delta against the last full snapshot"""
+        started = time.perf_counter()
+        base = self._base
+        num_labels = len(addresses)
+        csr, pending = graph.snapshot_edges() if graph is not None else (None, None)
+        full = base is None or self._deltas >= self.full_every
+        if not full:
+            # Growth since the full snapshot (net of expired edges; an estimate is enough)
+            new_edges = max(graph.num_edges - base['edges'], 0) if graph is not None else 0
+            full = (num_labels - base['labels']) + new_edges > self.full_ratio * max(base['labels'] + base['edges'], 1)
+
+        self._seq += 1
+        label_start = 0 if full else base['labels']
+        # Newest edge time covered, taken now: the next delta must not depend on this write finishing
+        watermark = graph.latest_time if graph is not None else None
+        state = {
+            'seq': self._seq,
+            'kind': 'full' if full else 'delta',
+            'base': self._seq if full else base['seq'],
+            'created_at': time.time(),
+            'label_start': label_start,
+            'num_labels': num_labels,
+            'labels': addresses.labels(label_start + 1),
+            'csr': csr,
+            'pending': pending,
+            'since': None if full else base['watermark'],
+            'watermark': watermark,
+            'flagged': np.fromiter(graph.flagged, dtype=np.int32) if graph is not None else None,
+            'counters': dict(counters),
+            'mempool': mempool.export_state() if mempool is not None else None
+        }
+        if full:
+            self._base = {
+                'seq': self._seq,
+                'labels': num_labels,
+                'edges': graph.num_edges if graph is not None else 0,
+                'watermark': watermark
+            }
+            self._deltas = 0
+        else:
+            self._deltas += 1
+        self.stats['last_capture_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return state
+
+    def _encode(self, state: dict) -> dict:
+        arrays = {'labels': np.array([label.encode() for label in state['labels']] or [b''], dtype=np.bytes_)}
+        if state['csr'] is not None:
+            src, dst, times = merge_edges(state['csr'], state['pending'], state['since'])
+            state['time_base'] = float(times.min()) if len(times) else 0.0
+            arrays['src'] = src.astype(np.int32)
+            arrays['dst'] = dst.astype(np.int32)
+            arrays['times'] = (times - state['time_base']).astype(np.float32)
+            arrays['flagged'] = state['flagged']
+        if state['mempool'] is not None:
+            arrays.update(MempoolTracker.encode_state(state['mempool']))
+        return arrays
+
+    def write(self, state: dict) -> int:
+        """Encode and write one captured state atomically; returns bytes written"""
+        with self._write_lock:
+            return self._write(state)
+
+    def _write(self, state: dict) -> int:
+        started = time.perf_counter()
+        arrays = self._encode(state)
+        name = _snapshot_name(state['kind'], state['seq'])
+        tmp_path = os.path.join(self.directory, name + '.tmp')
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        # Created on the first write, not when the store is built
+        os.makedirs(tmp_path)
+        written = 0
+        for key, array in arrays.items():
+            path = os.path.join(tmp_path, key + '.npy')
+            np.save(path, array)
+            written += os.path.getsize(path)
+        meta = {key: state.get(key) for key in (
+            'seq', 'kind', 'base', 'created_at', 'label_start', 'num_labels', 'watermark', 'time_base', 'counters'
+        )}
+        meta['num_new_labels'] = len(state['labels'])
+        with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.directory, name))
+        self._prune(state)
+
+        self.stats['full_written' if state['kind'] == 'full' else 'deltas_written'] += 1
+        self.stats['last_kind'] = state['kind']
+        self.stats['last_bytes'] = written
+        self.stats['last_write_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        self.stats['last_snapshot_at'] = state['created_at']
+        return written
+
+    def _prune(self, state: dict):
+        """Drop snapshots older than this one, except its full base"""
+        for name in os.listdir(self.directory):
+            if not name.startswith((FULL_PREFIX, DELTA_PREFIX)):
+                continue
+            seq = int(name.split('-')[1].split('.')[0])
+            if name.endswith('.tmp') or seq >= state['seq'] or (name.startswith(FULL_PREFIX) and seq == state['base']):
+                continue
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def _read(self, name: str) -> dict:
+        path = os.path.join(self.directory, name)
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            snapshot = json.load(f)
+        for key in ARRAYS + MEMPOOL_ARRAYS:
+            array_path = os.path.join(path, key + '.npy')
+            if os.path.isfile(array_path):
+                snapshot[key] = np.load(array_path, mmap_mode='r')
+        return snapshot
+
+    def load(self):
+        """
+        Newest full snapshot merged with its newest delta (arrays read through
+        memory maps): labels, src, dst, times, flagged, counters, watermark,
+        mempool (tracker tables, or None). None when there is nothing to restore
+        """
+        started = time.perf_counter()
+        if not os.path.isdir(self.directory):
+            return None
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith((FULL_PREFIX, DELTA_PREFIX)) and not name.endswith('.tmp'))
+        fulls = [name for name in names if name.startswith(FULL_PREFIX)]
+        for full_name in reversed(fulls):
+            try:
+                full = self._read(full_name)
+                deltas = [name for name in names if name.startswith(DELTA_PREFIX)
+                          and int(name[len(DELTA_PREFIX):]) > full['seq']]
+                delta = None
+                for delta_name in reversed(deltas):
+                    candidate = self._read(delta_name)
+                    if candidate['base'] == full['seq']:
+                        delta = candidate
+                        break
+                break
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"❌ Unreadable snapshot {full_name}, trying an older one: {str(e)}")
+        else:
+            return None
+
+        parts = [full] + ([delta] if delta is not None else [])
+        latest = parts[-1]
+        labels = [label for part in parts for label in np.char.decode(part['labels'][:part['num_new_labels']]).tolist()]
+        graph_parts = [part for part in parts if 'times' in part]
+        restored = {
+            'labels': labels,
+            'src': np.concatenate([part['src'] for part in graph_parts]) if graph_parts else None,
+            'dst': np.concatenate([part['dst'] for part in graph_parts]) if graph_parts else None,
+            'times': np.concatenate([part['times'].astype(np.float64) + part['time_base'] for part in graph_parts])
+                     if graph_parts else None,
+            'flagged': latest.get('flagged'),
+            'counters': latest['counters'],
+            'watermark': latest['watermark'],
+            'mempool': {key: latest[key] for key in MEMPOOL_ARRAYS} if MEMPOOL_ARRAYS[0] in latest else None
+        }
+        # Restored times are rounded (float32), so the next snapshot starts a new full one
+        self._seq = latest['seq']
+        self._base = None
+        self.stats['restored_from'] = [_snapshot_name(part['kind'], part['seq']) for part in parts]
+        self.stats['restore_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        return restored
+
+    def metrics(self) -> dict:
+        return dict(self.stats, directory=self.directory, seq=self._seq, deltas_since_full=self._deltas)
@@ -0,0 +1,273 @@
+import numpy as np
+
+WEI_PER_ETH = 10 ** 18
+GWEI = 10 ** 9
+
+# Scenario presets; rates are at 1x (mainnet is ~15 tx/s in the public mempool)
+SCENARIOS = {
+    'mainnet': {
+        'tps': 15.0,
+        'addresses': 50_000,
+        'reuse_exponent': 1.1,     # Zipf skew of sender/receiver popularity
+        'fresh_address_rate': 0.05,
+        'value_log_mean': -2.0,    # log-normal ETH values (median ~0.14 ETH)
+        'value_log_sigma': 2.0,
+        'zero_value_rate': 0.35,   # contract calls
+        'contract_creation_rate': 0.002,
+        'bursts_per_hour': 2.0,
+        'burst_size': (20, 80),
+        'burst_window_sec': 180.0,
+        'replacement_rate': 0.03,  # fee bumps / cancels of still-pending txs
+        'rebroadcast_rate': 0.1    # hashes announced again
+    },
+    'exchange': {
+        'tps': 15.0,
+        'addresses': 20_000,
+        'reuse_exponent': 1.5,
+        'fresh_address_rate': 0.02,
+        'value_log_mean': -1.0,
+        'value_log_sigma': 1.5,
+        'zero_value_rate': 0.2,
+        'contract_creation_rate': 0.001,
+        'bursts_per_hour': 1.0,
+        'burst_size': (20, 60),
+        'burst_window_sec': 300.0,
+        'replacement_rate': 0.02,
+        'rebroadcast_rate': 0.1
+    },
+    'attack': {
+        'tps': 15.0,
+        'addresses': 50_000,
+        'reuse_exponent': 1.1,
+        'fresh_address_rate': 0.1,
+        'value_log_mean': -2.0,
+        'value_log_sigma': 2.0,
+        'zero_value_rate': 0.35,
+        'contract_creation_rate': 0.002,
+        'bursts_per_hour': 30.0,
+        'burst_size': (50, 200),
+        'burst_window_sec': 120.0,
+        'replacement_rate': 0.05,
+        'rebroadcast_rate': 0.2
+    }
+}
+
+
+def _hex(value: int) -> str:
+    return hex(int(value))
+
+
+def _address(raw: bytes) -> str:
+    return '0x' + raw.hex()
+
+
+class SyntheticChain:
+    """
+    Seeded stream of mainnet-like transactions, one simulated second at a time.
+
+    The stream depends only on the seed and scenario, never on wall-clock
+    time: a run at 100x replays exactly the same transactions and blocks as a
+    run at 1x, only faster. Fraud-like bursts (many fresh wallets paying one
+    scam address within a few minutes, then the address draining to a few
+    others) are injected at `bursts_per_hour`; `fraud_addresses` records
+    their receivers as ground truth. Mempool churn is simulated too: pending
+    txs get replaced (fee bump or cancel, same nonce, always above the fee of
+    the slot's current occupant) and hashes re-announced; only the current
+    (highest fee) version of each (sender, nonce) is mined.
+    """
+
+    def __init__(self, seed: int = 0, scenario: str = 'mainnet', chain_id: int = 1,
+                 block_time: int = 12, start_block: int = 20_000_000,
+                 start_timestamp: int = 1_700_000_000, keep_blocks: int = 1024, **overrides):
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {scenario}")
+        self.params = dict(SCENARIOS[scenario], **overrides)
+        self.scenario = scenario
+        self.chain_id = chain_id
+        self.block_time = block_time
+        self.start_timestamp = start_timestamp
+        self.keep_blocks = keep_blocks
+        self.rng = np.random.default_rng(seed)
+
+        n = self.params['addresses']
+        self.addresses = [_address(self.rng.bytes(20)) for _ in range(n)]
+        weights = 1.0 / np.arange(1, n + 1) ** self.params['reuse_exponent']
+        self._cumulative = np.cumsum(weights / weights.sum())
+        self.nonces = {}
+        self.fraud_addresses = set()
+
+        self.second = 0
+        self.block_number = start_block
+        self.blocks = {}
+        self._parent_hash = '0x' + '00' * 32
+        self._block_txs = []
+        # (sender, nonce) -> current (highest fee) pending version
+        self._slots = {}
+        self._bursts = []
+        self._gas_price = 20 * GWEI
+
+    def _pick(self, count: int):
+        """Popular addresses most of the time, fresh ones at fresh_address_rate"""
+        picks = np.searchsorted(self._cumulative, self.rng.random(count))
+        fresh = self.rng.random(count) < self.params['fresh_address_rate']
+        return [
+            _address(self.rng.bytes(20)) if is_fresh else self.addresses[min(i, len(self.addresses) - 1)]
+            for i, is_fresh in zip(picks, fresh)
+        ]
+
+    def _transaction(self, sender: str, to, value_wei: int) -> dict:
+        nonce = self.nonces.get(sender, 0)
+        self.nonces[sender] = nonce + 1
+        return dict({
+            'hash': _address(self.rng.bytes(32)),
+            'from': sender,
+            'to': to,
+            'value': _hex(value_wei),
+            'gas': _hex(21_000 if value_wei else int(self.rng.integers(40_000, 300_000))),
+            'gasPrice': _hex(int(self._gas_price * self.rng.uniform(1.0, 1.5))),
+            'nonce': _hex(nonce),
+            'input': '0x',
+            'type': '0x0',
+            'chainId': _hex(self.chain_id),
+            'blockHash': None,
+            'blockNumber': None,
+            'transactionIndex': None
+        }, **self._signature('0x0'))
+
+    def _signature(self, tx_type: str) -> dict:
+        """
+        Random r, s and recovery parity y. Legacy txs carry it in v as
+        EIP-155 (35 + 2 * chainId + y); typed txs carry y itself, in v and yParity
+        """
+        parity = int(self.rng.integers(0, 2))
+        signature = {'r': _address(self.rng.bytes(32)), 's': _address(self.rng.bytes(32))}
+        if tx_type == '0x0':
+            signature['v'] = _hex(35 + 2 * self.chain_id + parity)
+        else:
+            signature['v'] = signature['yParity'] = _hex(parity)
+        return signature
+
+    def _replacement(self, tx: dict) -> dict:
+        """
+        New version of tx's (sender, nonce) paying more than the current one;
+        sometimes a cancel (0 ETH to self)
+        """
+        current = self._slots.get((tx['from'], tx['nonce']), tx)
+        replacement = dict(
+            current,
+            hash=_address(self.rng.bytes(32)),
+            gasPrice=_hex(int(int(current['gasPrice'], 16) * self.rng.uniform(1.1, 1.5))),
+            **self._signature(current['type'])
+        )
+        if self.rng.random() < 0.3:
+            replacement['to'] = tx['from']
+            replacement['value'] = '0x0'
+        return replacement
+
+    def _values(self, count: int, log_mean: float, log_sigma: float):
+        values = self.rng.lognormal(log_mean, log_sigma, count)
+        zero = self.rng.random(count) < self.params['zero_value_rate']
+        return [0 if z else int(v * WEI_PER_ETH) for v, z in zip(values, zero)]
+
+    def _start_burst(self):
+        low, high = self.params['burst_size']
+        scam = _address(self.rng.bytes(20))
+        self.fraud_addresses.add(scam)
+        size = int(self.rng.integers(low, high + 1))
+        window = self.params['burst_window_sec']
+        # Victim deposits, then the scam address sweeps funds to a few wallets
+        offsets = np.sort(self.rng.uniform(0, window, size)).astype(int)
+        for offset in offsets:
+            victim = _address(self.rng.bytes(20))
+            value = int(self.rng.lognormal(-1.0, 1.0) * WEI_PER_ETH)
+            self._bursts.append((self.second + int(offset), victim, scam, value))
+        for offset in range(int(window), int(window) + 30, 5):
+            self._bursts.append((self.second + offset, scam, _address(self.rng.bytes(20)),
+                                 int(self.rng.lognormal(1.0, 0.5) * WEI_PER_ETH)))
+
+    def step(self) -> list:
+        """Transactions entering the mempool during the next simulated second"""
+        p = self.params
+        self._gas_price = max(GWEI, int(self._gas_price * self.rng.lognormal(0.0, 0.01)))
+
+        if self.rng.random() < p['bursts_per_hour'] / 3600.0:
+            self._start_burst()
+
+        count = int(self.rng.poisson(p['tps']))
+        senders = self._pick(count)
+        receivers = self._pick(count)
+        creations = self.rng.random(count) < p['contract_creation_rate']
+        values = self._values(count, p['value_log_mean'], p['value_log_sigma'])
+        txs = [
+            self._transaction(sender, None if create else receiver, value)
+            for sender, receiver, create, value in zip(senders, receivers, creations, values)
+        ]
+
+        due = [burst for burst in self._bursts if burst[0] <= self.second]
+        if due:
+            self._bursts = [burst for burst in self._bursts if burst[0] > self.second]
+            txs.extend(self._transaction(sender, to, value) for _, sender, to, value in due)
+
+        for tx in txs:
+            self._slots[(tx['from'], tx['nonce'])] = tx
+
+        # Mempool churn over the not yet mined transactions
+        pending = self._block_txs
+        if pending:
+            replaced = self.rng.integers(0, len(pending), self.rng.binomial(count, p['replacement_rate']))
+            for i in replaced:
+                replacement = self._replacement(pending[i])
+                self._slots[(replacement['from'], replacement['nonce'])] = replacement
+                txs.append(replacement)
+        self._block_txs.extend(txs)
+        if pending:
+            rebroadcast = self.rng.integers(0, len(pending), self.rng.binomial(count, p['rebroadcast_rate']))
+            txs.extend(pending[i] for i in rebroadcast)
+
+        self.second += 1
+        if self.second % self.block_time == 0:
+            self._seal_block()
+        return txs
+
+    def _seal_block(self):
+        number = self.block_number
+        block_hash = _address(self.rng.bytes(32))
+        # Only the current (highest fee) version of each (sender, nonce) is mined
+        self._block_txs = list(self._slots.values())
+        self._slots = {}
+        for index, tx in enumerate(self._block_txs):
+            tx['blockHash'] = block_hash
+            tx['blockNumber'] = _hex(number)
+            tx['transactionIndex'] = _hex(index)
+        self.blocks[number] = {
+            'number': _hex(number),
+            'hash': block_hash,
+            'parentHash': self._parent_hash,
+            'timestamp': _hex(self.start_timestamp + self.second),
+            'miner': self.addresses[0],
+            'gasLimit': _hex(30_000_000),
+            'gasUsed': _hex(sum(int(tx['gas'], 16) for tx in self._block_txs)),
+            'baseFeePerGas': _hex(self._gas_price),
+            'difficulty': '0x0',
+            'totalDifficulty': '0x0',
+            'extraData': '0x',
+            'nonce': '0x0000000000000000',
+            'mixHash': '0x' + '00' * 32,
+            'sha3Uncles': '0x' + '00' * 32,
+            'logsBloom': '0x' + '00' * 256,
+            'transactionsRoot': '0x' + '00' * 32,
+            'stateRoot': '0x' + '00' * 32,
+            'receiptsRoot': '0x' + '00' * 32,
+            'size': _hex(1000 + 120 * len(self._block_txs)),
+            'uncles': [],
+            'transactions': self._block_txs
+        }
+        self.blocks.pop(number - self.keep_blocks, None)
+        self._parent_hash = block_hash
+        self._block_txs = []
+        self.block_number += 1
+
+    @property
+    def head(self) -> int:
+        """Number of the latest sealed block"""
+        return self.block_number - 1
@@ -0,0 +1,172 @@
+import time
+import datetime
+import numpy as np
+from app.feature_extraction import REQUIRED_FEATURES
+
+# Position of each model feature inside a feature vector
+FEATURE_INDEX = {name: i for i, name in enumerate(REQUIRED_FEATURES)}
+NUM_FEATURES = len(REQUIRED_FEATURES)
+
+# Sentinel id for a missing address (contract creation has no 'to')
+NO_ID = 0
+
+# Structured layout used for batched vector operations over records
+TX_DTYPE = np.dtype([
+    ('hash_id', '<u4'),
+    ('from_id', '<u4'),
+    ('to_id', '<u4'),
+    ('nonce', '<u8'),
+    ('value_eth', '<f8'),
+    ('gas_price', '<f8'),
+    ('seen_at', '<f8')
+])
+
+
+def to_raw_bytes(value) -> bytes:
+    """Convert a hex string / HexBytes / bytes value to raw bytes"""
+    if not value:
+        return b''
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    if value[:2] in ('0x', '0X'):
+        value = value[2:]
+    return bytes.fromhex(value)
+
+
+class InternTable:
+    """Maps raw address / hash bytes to dense integer ids"""
+
+    def __init__(self):
+        # Id 0 is reserved for the empty key
+        self._ids = {b'': NO_ID}
+        self._keys = [b'']
+        self._labels = ['']
+
+    def __len__(self):
+        return len(self._keys) - 1
+
+    def intern(self, value, label: str = None) -> int:
+        """Return the id of `value`, allocating one on first sight"""
+        key = to_raw_bytes(value)
+        key_id = self._ids.get(key)
+        if key_id is None:
+            key_id = len(self._keys)
+            self._ids[key] = key_id
+            self._keys.append(key)
+            self._labels.append(label if label is not None else ('0x' + key.hex() if key else ''))
+        return key_id
+
+    def lookup(self, value) -> int:
+        """Id of `value`, or -1 when it was never interned"""
+        return self._ids.get(to_raw_bytes(value), -1)
+
+    def key(self, key_id: int) -> bytes:
+        return self._keys[key_id]
+
+    def label(self, key_id: int) -> str:
+        """Text form of the key (as first seen, e.g. checksummed address)"""
+        return self._labels[key_id]
+
+    def labels(self, start: int = 1) -> list:
+        """Labels of ids start.. (copy), in id order"""
+        return self._labels[start:]
+
+    def extend(self, labels):
+        """Intern text keys in order (ids follow the order given, e.g. a snapshot restore)"""
+        for label in labels:
+            self.intern(label, label)
+
+    def clear(self):
+        self._ids = {b'': NO_ID}
+        self._keys = [b'']
+        self._labels = ['']
+
+
+class TxRecord:
+    """Compact in-memory transaction record (features live in a per-batch float32 matrix)"""
+
+    __slots__ = ('hash_id', 'from_id', 'to_id', 'nonce', 'value_wei', 'gas_price', 'seen_at')
+
+    def __init__(self, hash_id, from_id, to_id, nonce, value_wei, gas_price, seen_at):
+        self.hash_id = hash_id
+        self.from_id = from_id
+        self.to_id = to_id
+        self.nonce = nonce
+        self.value_wei = value_wei
+        self.gas_price = gas_price
+        self.seen_at = seen_at
+
+    @classmethod
+    def from_web3(cls, tx, addresses: InternTable, hashes: InternTable, seen_at: float = None):
+        """Build a record from a web3 transaction (AttributeDict or dict)"""
+        from_address = tx.get('from') or ''
+        to_address = tx.get('to') or ''
+        return cls(
+            hash_id=hashes.intern(tx.get('hash', b'')),
+            from_id=addresses.intern(from_address, from_address),
+            to_id=addresses.intern(to_address, to_address),
+            nonce=int(tx.get('nonce', 0) or 0),
+            value_wei=int(tx.get('value', 0) or 0),
+            gas_price=float(tx.get('gasPrice', 0) or 0),
+            seen_at=seen_at if seen_at is not None else time.time()
+        )
+
+    @property
+    def value_eth(self) -> float:
+        return self.value_wei / 1e18
+
+
+def records_to_array(records) -> np.ndarray:
+    """Pack records into a structured NumPy array"""
+    return np.array(
+        [(r.hash_id, r.from_id, r.to_id, r.nonce, r.value_wei / 1e18, r.gas_price, r.seen_at) for r in records],
+        dtype=TX_DTYPE
+    )
+
+
+def batch_to_dicts(batch: np.ndarray, features: np.ndarray, addresses: InternTable, hashes: InternTable,
+                   classifications) -> list:
+    """
+    Legacy tx_data dicts used for persistence and broadcast, from a
+    records_to_array batch and its (n, NUM_FEATURES) feature matrix (a NaN
+    row for records without features). Arrays are converted once per batch.
+    """
+    rows = batch[['hash_id', 'from_id', 'to_id', 'value_eth', 'gas_price', 'seen_at']].tolist()
+    has_features = ~np.isnan(features[:, 0])
+    # Records of a batch usually share one seen_at
+    stamps = {
+        seen_at: datetime.datetime.fromtimestamp(seen_at).isoformat()
+        for seen_at in np.unique(batch['seen_at']).tolist()
+    }
+    return [
+        {
+            'hash': hashes.label(hash_id),
+            'from': addresses.label(from_id),
+            'to': addresses.label(to_id) or None,
+            'value_eth': value_eth,
+            'gas_price': gas_price,
+            'classification': classification,
+            'timestamp': stamps[seen_at],
+            'features': dict(zip(REQUIRED_FEATURES, vector)) if present else {}
+        }
+        for (hash_id, from_id, to_id, value_eth, gas_price, seen_at), vector, present, classification
+        in zip(rows, features.tolist(), has_features.tolist(), classifications)
+    ]
+
+
+def features_to_vector(features: dict) -> np.ndarray:
+    """Fixed-order float32 vector of the model features"""
+    return np.array([features.get(name, 0) for name in REQUIRED_FEATURES], dtype=np.float32)
+
+
+def features_to_matrix(features_list) -> np.ndarray:
+    """Stack feature dicts into an (n, NUM_FEATURES) float32 matrix"""
+    matrix = np.empty((len(features_list), NUM_FEATURES), dtype=np.float32)
+    for i, features in enumerate(features_list):
+        matrix[i] = features_to_vector(features)
+    return matrix
+
+
+def vector_to_features(vector) -> dict:
+    """Inverse of features_to_vector (for JSON / legacy consumers)"""
+    return dict(zip(REQUIRED_FEATURES, np.asarray(vector, dtype=np.float64).tolist()))
@@ -1,6 +1,9 @@
 import os
+import re
 import sys
 import json
+import time
+import numpy as np
 import pandas as pd
 import datetime
 import logging
@@ -8,9 +11,13 @@ import joblib
 import asyncio
 import websockets
 from web3 import Web3
+from hexbytes import HexBytes
 import socket
 import warnings
 import urllib.parse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the app directory to Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -20,7 +27,39 @@ if app_dir not in sys.path:
 
 # Import after path setup
 from app.models import Session, Transaction
-from app.feature_extraction import compute_wallet_features
+from app.feature_extraction import compute_wallet_feature_matrix, REQUIRED_FEATURES
+from app import feature_definitions
+from app.tx_records import (
+    InternTable, TxRecord, NUM_FEATURES, records_to_array, batch_to_dicts,
+    features_to_matrix, vector_to_features, to_raw_bytes
+)
+from app.shadow_scoring import ShadowScorer, load_candidate_models
+from app.graph_index import TransferGraph, GRAPH_FEATURES
+from app.address_lists import AddressListRegistry
+from app.rules import load_rule_set
+from app.ingest_log import IngestLog
+from app.rollups import update_rollups
+from app.sketches import HyperLogLog, DistinctCounter
+from app.parquet_sink import ParquetSink
+from app.mempool import MempoolTracker
+from app.backpressure import OverloadPolicy
+from app.explanations import TreeExplainer
+from app.snapshots import SnapshotStore
+from app.config import (
+    SHADOW_MODEL_PATHS, SHADOW_SAMPLE_RATE, SHADOW_MAX_PENDING, SHADOW_MAX_DUTY_CYCLE,
+    GRAPH_INDEX_ENABLED, GRAPH_RETENTION_HOURS, GRAPH_COMPACT_EVERY, GRAPH_MAX_HOPS,
+    BLOCKLIST_PATH, ALLOWLIST_PATH, ADDRESS_LISTS_RELOAD_SEC, BLOOM_ERROR_RATE,
+    FALLBACK_RULES_PATH,
+    INGEST_LOG_ENABLED, INGEST_LOG_DIR, INGEST_LOG_SEGMENT_MB, INGEST_LOG_KEEP_SEGMENTS, INGEST_LOG_FSYNC,
+    BACKFILL_MAX_BLOCKS, BACKFILL_BATCH_BLOCKS, BACKFILL_CONNECTIONS, BLOCK_CHECKPOINT_SEC, INGEST_CHECKPOINT_SEC,
+    OVERLOAD_MAX_HASHES, OVERLOAD_MAX_TXS, OVERLOAD_MAX_AGE_SEC, OVERLOAD_MODE, OVERLOAD_SAMPLE_WATERMARK,
+    OVERLOAD_SAMPLE_FLOOR, OVERLOAD_PREFETCH_BATCHES, OVERLOAD_WATCH_HOPS,
+    MEMPOOL_TRACKER_ENABLED, MEMPOOL_MAX_ENTRIES, MEMPOOL_TTL_SEC, MEMPOOL_REORG_DEPTH, MEMPOOL_RECONCILE_MAX_BLOCKS,
+    ROLLUPS_ENABLED, ROLLUP_HLL_PRECISION, DISTINCT_COUNT_MODE, DISTINCT_COUNT_PRECISION,
+    EXPLAIN_ENABLED, EXPLAIN_BUDGET_MS, EXPLAIN_TOP_K,
+    SNAPSHOT_ENABLED, SNAPSHOT_DIR, SNAPSHOT_INTERVAL_SEC, SNAPSHOT_FULL_EVERY, SNAPSHOT_FULL_RATIO,
+    ALCHEMY_WS, PARQUET_EXPORT_ENABLED, PARQUET_DIR, PARQUET_FLUSH_ROWS, PARQUET_FLUSH_SEC, PARQUET_COMPRESSION
+)
 from sqlalchemy.exc import IntegrityError
 
 # WebSocket configuration
@@ -29,9 +68,89 @@ WEBSOCKET_HOST = 'localhost'  # ← CHANGÉ: accepte IPv4 et IPv6
 WEBSOCKET_PORT = 8765
 MAX_CONNECTIONS = 100
 
+# Classification threshold on the model's fraud probability
+ALERT_THRESHOLD = 0.7
+# Maximum number of pending transactions scored together
+MONITOR_BATCH_SIZE = 64
+# Tx hashes only live for one batch; the hash table is recycled past this size
+TX_HASH_TABLE_MAX = 100_000
+
 # Store connected clients
 connected_clients = {}
 
+# Interned addresses (long-lived) and tx hashes (recycled between batches)
+address_table = InternTable()
+hash_table = InternTable()
+
+# Multi-hop transfer graph over the same address ids
+transfer_graph = TransferGraph(
+    address_table,
+    retention_hours=GRAPH_RETENTION_HOURS,
+    compact_every=GRAPH_COMPACT_EVERY,
+    max_hops=GRAPH_MAX_HOPS
+) if GRAPH_INDEX_ENABLED else None
+
+# Known scam / trusted addresses, checked before featurization
+address_lists = AddressListRegistry(BLOCKLIST_PATH, ALLOWLIST_PATH, BLOOM_ERROR_RATE)
+
+# Degraded-mode classifier (no model loaded, or inference failed)
+fallback_rules = load_rule_set(FALLBACK_RULES_PATH)
+
+# Durable log of raw transactions with the consumer checkpoint
+ingest_log = IngestLog(
+    INGEST_LOG_DIR,
+    segment_bytes=int(INGEST_LOG_SEGMENT_MB * 1024 * 1024),
+    keep_segments=INGEST_LOG_KEEP_SEGMENTS,
+    fsync=INGEST_LOG_FSYNC
+) if INGEST_LOG_ENABLED else None
+
+# Heads seen by the poller, (monotonic time, block): a head is checkpointed once
+# every hash announced before that time has been logged or shed
+block_marks = deque()
+# Replay / backfill in progress: the block checkpoint waits for the backfill
+recovering = False
+
+# Pending txs by (sender, nonce): skips re-announced hashes and fee-bump replacements
+mempool = MempoolTracker(
+    max_entries=MEMPOOL_MAX_ENTRIES,
+    ttl_sec=MEMPOOL_TTL_SEC,
+    max_blocks=MEMPOOL_RECONCILE_MAX_BLOCKS + MEMPOOL_REORG_DEPTH
+) if MEMPOOL_TRACKER_ENABLED else None
+
+# Bounded intake between the pending filter and the scorer (load shedding)
+overload = OverloadPolicy(
+    max_hashes=OVERLOAD_MAX_HASHES,
+    max_txs=OVERLOAD_MAX_TXS,
+    max_age_sec=OVERLOAD_MAX_AGE_SEC,
+    mode=OVERLOAD_MODE,
+    sample_watermark=OVERLOAD_SAMPLE_WATERMARK,
+    sample_floor=OVERLOAD_SAMPLE_FLOOR
+)
+
+# Scored transactions with their features, for offline analytics
+scored_sink = ParquetSink(
+    PARQUET_DIR,
+    flush_rows=PARQUET_FLUSH_ROWS,
+    flush_sec=PARQUET_FLUSH_SEC,
+    compression=PARQUET_COMPRESSION
+) if PARQUET_EXPORT_ENABLED else None
+
+# Periodic snapshots of the state above, for warm restarts
+snapshots = SnapshotStore(
+    SNAPSHOT_DIR,
+    full_every=SNAPSHOT_FULL_EVERY,
+    full_ratio=SNAPSHOT_FULL_RATIO
+) if SNAPSHOT_ENABLED else None
+
+# Monitoring counters (exposed through the 'metrics' message)
+monitor_stats = {
+    'processed_count': 0,
+    'suspicious_count': 0,
+    'started_at': None
+}
+# Restored counters already include work the recovery may re-process
+count_recovered = True
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -61,9 +180,18 @@ def is_port_in_use(port: int) -> bool:
             pass
         return True
 
+def connect_web3() -> Web3:
+    """New websocket connection (ALCHEMY_WS=ws://localhost:8546 with scripts/fake_node.py for local load tests)"""
+    # Full blocks (backfill / mempool reconciliation) exceed the 1 MB default frame limit
+    return Web3(Web3.LegacyWebSocketProvider(ALCHEMY_WS, websocket_kwargs={'max_size': 64 * 1024 * 1024}))
+
+
 # Initialize Web3
-ALCHEMY_WS = os.getenv('ALCHEMY_WS', "wss://eth-mainnet.g.alchemy.com/v2/Ef1v-4uGjH1wd-LkT9Mti")
-w3 = Web3(Web3.LegacyWebSocketProvider(ALCHEMY_WS))
+w3 = connect_web3()
+# Every web3 call goes through this single thread (see rpc())
+rpc_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='web3-rpc')
+# Snapshot writes, one at a time (shut down before the final snapshot)
+snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='snapshots')
 
 # Load the trained model
 model = None
@@ -92,6 +220,8 @@ try:
     
     model = model_package.get('model')
     preprocessor = model_package.get('preprocessor')
+    # Anomaly thresholds of the training population
+    feature_definitions.configure(model_package)
     
     if model and preprocessor:
         logger.info("✅ Model and preprocessor loaded successfully")
@@ -105,6 +235,23 @@ except Exception as e:
     logger.error(f"❌ Error loading model: {str(e)}")
     logger.warning("⚠️ Server will use rule-based classification")
 
+# Reasons attached to SUSPICIOUS model scores
+explainer = None
+if EXPLAIN_ENABLED and model is not None:
+    try:
+        explainer = TreeExplainer(model_package, ALERT_THRESHOLD, top_k=EXPLAIN_TOP_K, budget_ms=EXPLAIN_BUDGET_MS)
+    except Exception as e:
+        logger.warning(f"⚠️ Explanations disabled: {str(e)}")
+
+# Candidate models scored in the background against the production model
+shadow_scorer = ShadowScorer(
+    load_candidate_models(SHADOW_MODEL_PATHS),
+    threshold=ALERT_THRESHOLD,
+    max_pending=SHADOW_MAX_PENDING,
+    sample_rate=SHADOW_SAMPLE_RATE,
+    max_duty_cycle=SHADOW_MAX_DUTY_CYCLE
+)
+
 
 def save_to_database(tx_data):
     """Save transaction to database"""
@@ -129,6 +276,11 @@ def save_to_database(tx_data):
         )
         
         session.add(tx_row)
+        
+        # Keep the hourly wallet rollups in step with the raw table
+        if ROLLUPS_ENABLED:
+            update_rollups(session, tx_row)
+        
         session.commit()
         logger.info(f"💾 Saved transaction {tx_data['hash'][:16]}... to DB")
         return True
@@ -156,35 +308,40 @@ def process_request(path, request_headers):
     return None
 
 
+def wallet_pair_features(txs) -> np.ndarray:
+    """
+    (n, len(REQUIRED_FEATURES)) float32 features of each tx's sender and
+    receiver combined (element-wise max), with one window query per batch
+    """
+    matrix = compute_wallet_feature_matrix([wallet for tx in txs for wallet in (tx.get('from'), tx.get('to'))])
+    return np.maximum(matrix[0::2], matrix[1::2]).astype(np.float32)
+
+
 def extract_features(tx):
     """Extract relevant features for fraud detection"""
-    logger.debug(f"Processing transaction: {tx.get('hash', '').hex()[:16]}...")
-    
-    from_features = compute_wallet_features(tx.get('from', ''))
-    to_features = compute_wallet_features(tx.get('to', ''))
-    
-    # Combine features
-    return {k: max(from_features.get(k, 0), to_features.get(k, 0)) 
-            for k in from_features.keys()}
+    logger.debug(f"Processing transaction: {to_raw_bytes(tx.get('hash', b'')).hex()[:16]}...")
+    return vector_to_features(wallet_pair_features([tx])[0])
 
 
-def classify_transaction(features):
-    """Classify transaction as legitimate or suspicious"""
+def score_matrix(feature_matrix, extra_features=None):
+    """
+    Classify an (n, len(REQUIRED_FEATURES)) float32 feature matrix.
+    `extra_features` (one dict per row, or a dict of columns) adds optional
+    columns such as the graph features; models only see the columns they were trained on.
+    Returns (classifications, explanations); explanations are None except
+    for SUSPICIOUS model scores.
+    """
+    if len(feature_matrix) == 0:
+        return [], []
+
     if model is None or preprocessor is None:
-        # Rule-based fallback
-        suspicious_indicators = [
-            features.get('time_diff_first_last_received', 0) < 300,
-            features.get('total_tx_sent', 0) > 50,
-            features.get('value_volatility', 0) > 0.7,
-            features.get('value_anomaly', 0) == 1,
-            features.get('frequency_anomaly', 0) == 1
-        ]
-        
-        is_suspicious = sum(suspicious_indicators) >= 2
-        return "SUSPICIOUS" if is_suspicious else "LEGITIMATE"
+        return fallback_rules.classify(feature_matrix), [None] * len(feature_matrix)
 
     try:
-        feature_df = pd.DataFrame([features])
+        feature_df = pd.DataFrame(feature_matrix, columns=REQUIRED_FEATURES)
+        if extra_features:
+            feature_df = feature_df.join(pd.DataFrame(extra_features, index=feature_df.index))
+        full_df = feature_df
         
         # Ensure columns match training data
         if 'features' in model_package:
@@ -193,56 +350,183 @@ def classify_transaction(features):
         
         # Preprocess and predict
         X = preprocessor.transform(feature_df)
-        prediction = model.predict(X)[0]
-        probability = model.predict_proba(X)[0][1]
+        probabilities = model.predict_proba(X)[:, 1]
+        
+        # Candidate models see the exact same batch, off the primary path
+        shadow_scorer.submit(full_df, probabilities)
         
-        return "SUSPICIOUS" if probability > 0.7 else "LEGITIMATE"
+        classifications = ["SUSPICIOUS" if p > ALERT_THRESHOLD else "LEGITIMATE" for p in probabilities]
+        if explainer is not None:
+            explanations = explainer.explain(feature_df.to_numpy(dtype=np.float64), X, probabilities)
+        else:
+            explanations = [None] * len(classifications)
+        return classifications, explanations
     
     except Exception as e:
         logger.error(f"Classification error: {str(e)}")
-        suspicious_indicators = [
-            features.get('time_diff_first_last_received', 0) < 300,
-            features.get('total_tx_sent', 0) > 50,
-        ]
-        return "SUSPICIOUS" if sum(suspicious_indicators) >= 1 else "LEGITIMATE"
+        return fallback_rules.classify(feature_matrix), [None] * len(feature_matrix)
+
+
+def classify_matrix(feature_matrix, extra_features=None):
+    """Classifications only (see score_matrix)"""
+    return score_matrix(feature_matrix, extra_features)[0]
+
+
+def classify_batch(features_list):
+    """Classify a batch of feature dicts with a single model call"""
+    return classify_matrix(features_to_matrix(features_list))
+
+
+def classify_transaction(features):
+    """Classify transaction as legitimate or suspicious"""
+    return classify_batch([features])[0]
+
+
+def export_scored(batch, features, graph_matrix, classifications, list_matches):
+    """Hand scored records to the Parquet sink as columns (record array and feature matrices, no dicts)"""
+    if graph_matrix is None:
+        graph_matrix = np.full((len(batch), len(GRAPH_FEATURES)), np.nan, dtype=np.float32)
+    scored_sink.append({
+        'hash': [hash_table.label(i) for i in batch['hash_id'].tolist()],
+        'from': [address_table.label(i) for i in batch['from_id'].tolist()],
+        'to': [address_table.label(i) or None for i in batch['to_id'].tolist()],
+        'classification': classifications,
+        'list_match': list_matches,
+        'value_eth': batch['value_eth'],
+        'gas_price': batch['gas_price'],
+        'seen_at': batch['seen_at'],
+        'features': np.hstack((features, graph_matrix.astype(np.float32)))
+    })
+
+
+def handle_transactions(txs):
+    """Process and classify a batch of new transactions"""
+    txs = [tx for tx in txs if tx]
+    if not txs:
+        return []
+
+    seen_at = time.time()
+    records = []
+    record_txs = []
+    list_verdicts = []
+    for tx in txs:
+        try:
+            record = TxRecord.from_web3(tx, address_table, hash_table, seen_at)
+            # Listed addresses skip featurization and model inference
+            verdict = address_lists.check(tx.get('from'), tx.get('to'))
+            records.append(record)
+            record_txs.append(tx)
+            list_verdicts.append(verdict)
+        except Exception as e:
+            logger.error(f"Error handling transaction: {str(e)}")
+
+    if not records:
+        return []
+
+    # Batch feature path: one window query for every wallet of the batch (listed rows stay NaN)
+    to_score = [i for i, verdict in enumerate(list_verdicts) if verdict is None]
+    features = np.full((len(records), NUM_FEATURES), np.nan, dtype=np.float32)
+    if to_score:
+        features[to_score] = wallet_pair_features([record_txs[i] for i in to_score])
+
+    # Graph features are computed before this batch's edges are added, once for the whole batch
+    graph_matrix = None
+    if transfer_graph is not None:
+        graph_matrix = transfer_graph.batch_features(
+            [record.from_id for record in records], [record.to_id for record in records]
+        )
+        for record in records:
+            transfer_graph.add_edge(record.from_id, record.to_id, record.seen_at)
+
+    classifications = list(list_verdicts)
+    explanations = [None] * len(records)
+    if to_score:
+        scored, reasons = score_matrix(
+            features[to_score],
+            dict(zip(GRAPH_FEATURES, graph_matrix[to_score].T)) if graph_matrix is not None else None
+        )
+        for i, classification, explanation in zip(to_score, scored, reasons):
+            classifications[i] = classification
+            explanations[i] = explanation
+
+    list_matches = [
+        None if verdict is None else ('blocklist' if verdict == "SUSPICIOUS" else 'allowlist')
+        for verdict in list_verdicts
+    ]
+    batch = records_to_array(records)
+    graph_rows = graph_matrix.tolist() if graph_matrix is not None else None
+    results = []
+    kept = []
+    for i, tx_data in enumerate(batch_to_dicts(batch, features, address_table, hash_table, classifications)):
+        try:
+            if list_matches[i] is not None:
+                tx_data['list_match'] = list_matches[i]
+            if explanations[i] is not None:
+                tx_data['explain'] = explanations[i]
+            if graph_rows is not None:
+                tx_data['features'].update(zip(GRAPH_FEATURES, graph_rows[i]))
+                if tx_data['classification'] == "SUSPICIOUS":
+                    transfer_graph.mark_flagged(records[i].from_id)
+            
+            # Log classification
+            emoji = "⚠️" if tx_data['classification'] == "SUSPICIOUS" else "✅"
+            logger.info(f"{emoji} {tx_data['classification']}: {tx_data['hash'][:16]}... ({tx_data['value_eth']:.4f} ETH)")
+            
+            # Save to database
+            save_to_database(tx_data)
+            
+            results.append(tx_data)
+            kept.append(i)
+            
+        except Exception as e:
+            logger.error(f"Error handling transaction: {str(e)}")
+
+    if scored_sink is not None and scored_sink.running and kept:
+        export_scored(batch[kept], features[kept], graph_matrix[kept] if graph_matrix is not None else None,
+                      [classifications[i] for i in kept], [list_matches[i] for i in kept])
+
+    # Records of this batch are done with; recycle the hash ids
+    if len(hash_table) > TX_HASH_TABLE_MAX:
+        hash_table.clear()
+
+    return results
 
 
 def handle_transaction(tx):
     """Process and classify new transactions"""
-    if not tx:
-        return None
-        
-    try:
-        # Extract features
-        features = extract_features(tx)
-        
-        # Classify transaction
-        classification = classify_transaction(features)
-        
-        # Prepare transaction data
-        tx_data = {
-            'hash': tx.get('hash', '').hex(),
-            'from': tx.get('from', ''),
-            'to': tx.get('to', ''),
-            'value_eth': float(tx.get('value', 0)) / 1e18,
-            'gas_price': float(tx.get('gasPrice', 0)),
-            'classification': classification,
-            'timestamp': datetime.datetime.now().isoformat(),
-            'features': features
+    results = handle_transactions([tx])
+    return results[0] if results else None
+
+
+def collect_metrics():
+    """Snapshot of monitoring and shadow-scoring statistics"""
+    return {
+        'processed_count': monitor_stats['processed_count'],
+        'suspicious_count': monitor_stats['suspicious_count'],
+        'started_at': monitor_stats['started_at'],
+        'clients': len(connected_clients),
+        'model_loaded': model is not None,
+        'interned_addresses': len(address_table),
+        'graph': {
+            'edges': transfer_graph.num_edges,
+            'flagged': len(transfer_graph.flagged),
+            'compactions': transfer_graph.compactions
+        } if transfer_graph is not None else None,
+        'shadow': shadow_scorer.metrics(),
+        'address_lists': address_lists.metrics(),
+        'fallback_rules': fallback_rules.metrics(),
+        'ingest_log': ingest_log.metrics() if ingest_log is not None else None,
+        'parquet_export': scored_sink.metrics() if scored_sink is not None else None,
+        'mempool': mempool.metrics() if mempool is not None else None,
+        'overload': overload.metrics(),
+        'explanations': explainer.metrics() if explainer is not None else None,
+        'snapshots': snapshots.metrics() if snapshots is not None else None,
+        'distinct_counts': {
+            'mode': DISTINCT_COUNT_MODE,
+            'relative_error': DistinctCounter(DISTINCT_COUNT_MODE, DISTINCT_COUNT_PRECISION).relative_error,
+            'rollup_relative_error': HyperLogLog(ROLLUP_HLL_PRECISION).relative_error if ROLLUPS_ENABLED else None
         }
-        
-        # Log classification
-        emoji = "⚠️" if classification == "SUSPICIOUS" else "✅"
-        logger.info(f"{emoji} {classification}: {tx_data['hash'][:16]}... ({tx_data['value_eth']:.4f} ETH)")
-        
-        # Save to database
-        save_to_database(tx_data)
-        
-        return tx_data
-        
-    except Exception as e:
-        logger.error(f"Error handling transaction: {str(e)}")
-        return None
+    }
 
 
 async def handle_client(websocket):
@@ -285,6 +569,19 @@ async def handle_client(websocket):
                         'type': 'pong',
                         'timestamp': datetime.datetime.now().isoformat()
                     }))
+                elif data.get('type') == 'reload_lists':
+                    reloaded = await asyncio.get_running_loop().run_in_executor(None, address_lists.reload)
+                    await websocket.send(json.dumps({
+                        'type': 'lists_reloaded',
+                        'reloaded': reloaded,
+                        'data': address_lists.metrics()
+                    }))
+                elif data.get('type') == 'metrics':
+                    await websocket.send(json.dumps({
+                        'type': 'metrics',
+                        'data': collect_metrics(),
+                        'timestamp': datetime.datetime.now().isoformat()
+                    }))
                 else:
                     await websocket.send(json.dumps({
                         'type': 'message_received',
@@ -336,41 +633,446 @@ async def broadcast_transaction(tx_data):
         logger.info(f"🧹 Cleaned up {len(disconnected)} disconnected clients")
 
 
+def serialize_tx(tx) -> bytes:
+    """Raw transaction as stored in the ingest log"""
+    return Web3.to_json(tx).encode()
+
+
+def deserialize_tx(payload: bytes) -> dict:
+    return json.loads(payload)
+
+
+# Hash of a logged transaction, read without decoding the whole record (see serialize_tx)
+LOGGED_HASH = re.compile(rb'"hash": "(0x[0-9a-f]{64})"')
+# Hashes per IN (...) clause when checking stored transactions
+HASH_QUERY_CHUNK = 500
+
+
+def logged_hashes(end_offset: int) -> set:
+    """Hashes of the transactions still in the ingest log, before `end_offset` (thread-safe)"""
+    hashes = set()
+    for offset, payload in ingest_log.read_from(0):
+        if offset >= end_offset:
+            break
+        match = LOGGED_HASH.search(payload)
+        if match:
+            hashes.add(match.group(1).decode())
+    return hashes
+
+
+def stored_hashes(tx_hashes) -> set:
+    """Those of `tx_hashes` already saved to the transactions table"""
+    session = Session()
+    try:
+        stored = set()
+        for i in range(0, len(tx_hashes), HASH_QUERY_CHUNK):
+            rows = session.query(Transaction.hash).filter(Transaction.hash.in_(tx_hashes[i:i + HASH_QUERY_CHUNK]))
+            stored.update(tx_hash for (tx_hash,) in rows)
+        return stored
+    finally:
+        session.close()
+
+
+def drop_scored(txs, known: set) -> list:
+    """Transactions neither in `known` (logged hashes) nor in the database"""
+    hashes = ['0x' + to_raw_bytes(tx.get('hash')).hex() for tx in txs]
+    unlogged = [tx_hash for tx_hash in hashes if tx_hash not in known]
+    stored = stored_hashes(unlogged) if unlogged else set()
+    return [tx for tx, tx_hash in zip(txs, hashes) if tx_hash not in known and tx_hash not in stored]
+
+
+async def process_transactions(txs, log=True, count=True):
+    """Log, classify and broadcast a batch, then commit its ingest log range"""
+    end_offset = None
+    if ingest_log is not None and log and txs:
+        end_offset = ingest_log.append_many([serialize_tx(tx) for tx in txs])
+    try:
+        await score_and_broadcast(txs, count)
+    finally:
+        # A failed batch is not retried: don't hold the checkpoint behind it
+        if end_offset is not None:
+            ingest_log.commit_range(end_offset - len(txs), end_offset)
+
+
+async def score_and_broadcast(txs, count=True):
+    """Classify a batch, count the results (unless `count` is False) and broadcast them"""
+    for tx_data in handle_transactions(txs):
+        if count:
+            monitor_stats['processed_count'] += 1
+            if tx_data['classification'] == 'SUSPICIOUS':
+                monitor_stats['suspicious_count'] += 1
+        
+        # Broadcast to clients
+        await broadcast_transaction(tx_data)
+        
+        # Log stats every 100 transactions
+        processed_count = monitor_stats['processed_count']
+        if count and processed_count % 100 == 0:
+            suspicious_count = monitor_stats['suspicious_count']
+            fraud_rate = (suspicious_count / processed_count) * 100
+            logger.info(f"📊 Processed: {processed_count} | Suspicious: {suspicious_count} ({fraud_rate:.1f}%) | Clients: {len(connected_clients)}")
+
+
+async def persist_ingest_checkpoint():
+    """Coalesced checkpoint writes (fsync + rename) off the event loop"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(INGEST_CHECKPOINT_SEC)
+        try:
+            await loop.run_in_executor(None, ingest_log.flush_checkpoint)
+        except Exception as e:
+            logger.error(f"Error writing ingest checkpoint: {str(e)}")
+
+
+async def replay_batch(batch, start_offset, end_offset):
+    """Re-process logged transactions and commit their range (records missing from the log included)"""
+    try:
+        # The crash may have come after some of them were stored
+        batch = drop_scored(batch, set()) if batch else batch
+        if batch:
+            await process_transactions(batch, log=False, count=count_recovered)
+            ingest_log.replayed += len(batch)
+    finally:
+        ingest_log.commit_range(start_offset, end_offset)
+    # Let live monitoring and client handlers run between batches
+    await asyncio.sleep(0)
+
+
+async def replay_ingest_log(end_offset):
+    """Re-process transactions logged (before `end_offset`) but not committed before the last shutdown"""
+    start_offset = ingest_log.checkpoint.offset
+    if end_offset <= start_offset:
+        return
+    logger.info(f"⏪ Replaying {end_offset - start_offset} uncommitted transactions from the ingest log")
+    started = time.perf_counter()
+    batch, batch_start = [], start_offset
+    for offset, payload in ingest_log.read_from(start_offset):
+        if offset >= end_offset:
+            break
+        batch.append(deserialize_tx(payload))
+        if len(batch) >= MONITOR_BATCH_SIZE:
+            await replay_batch(batch, batch_start, offset + 1)
+            batch, batch_start = [], offset + 1
+    await replay_batch(batch, batch_start, end_offset)
+    logger.info(f"✅ Replay done in {time.perf_counter() - started:.1f}s")
+
+
+def fetch_blocks(block_numbers, web3=None):
+    """Fetch full blocks in one JSON-RPC batch (a websocket provider is not thread-safe)"""
+    web3 = web3 if web3 is not None else w3
+    with web3.batch_requests() as batch:
+        for number in block_numbers:
+            batch.add(web3.eth.get_block(number, full_transactions=True))
+        return batch.execute()
+
+
+# Backfill threads each open their own connection, so chunks are fetched in parallel
+backfill_connections = threading.local()
+
+
+def fetch_backfill_blocks(block_numbers):
+    """fetch_blocks over this backfill thread's own websocket connection"""
+    web3 = getattr(backfill_connections, 'w3', None)
+    if web3 is None:
+        web3 = backfill_connections.w3 = connect_web3()
+    return fetch_blocks(block_numbers, web3)
+
+
+async def rpc(fn, *args):
+    """Run a blocking web3 call on the RPC thread (the websocket provider is not thread-safe)"""
+    return await asyncio.get_running_loop().run_in_executor(rpc_executor, fn, *args)
+
+
+# Fields of a raw eth_getTransactionByHash result, formatted like w3.eth.get_transaction
+TX_QUANTITY_FIELDS = (
+    'value', 'gas', 'gasPrice', 'maxFeePerGas', 'maxPriorityFeePerGas', 'nonce',
+    'blockNumber', 'transactionIndex', 'chainId', 'type', 'v', 'yParity'
+)
+TX_BYTES_FIELDS = ('hash', 'blockHash', 'input', 'r', 's')
+TX_ADDRESS_FIELDS = ('from', 'to')
+
+
+def format_transaction(raw: dict) -> dict:
+    """Raw JSON-RPC transaction -> ints, HexBytes and checksum addresses"""
+    tx = dict(raw)
+    for key in TX_QUANTITY_FIELDS:
+        if isinstance(tx.get(key), str):
+            tx[key] = int(tx[key], 16)
+    for key in TX_BYTES_FIELDS:
+        if isinstance(tx.get(key), str):
+            tx[key] = HexBytes(tx[key])
+    for key in TX_ADDRESS_FIELDS:
+        if tx.get(key):
+            tx[key] = Web3.to_checksum_address(tx[key])
+    return tx
+
+
+def fetch_transactions(tx_hashes):
+    """
+    Fetch transactions in one JSON-RPC batch; dropped ones come back as None
+    (w3.batch_requests would fail the whole batch on a TransactionNotFound)
+    """
+    responses = w3.provider.make_batch_request(
+        [('eth_getTransactionByHash', [Web3.to_hex(tx_hash)]) for tx_hash in tx_hashes]
+    )
+    return [format_transaction(response['result']) if response.get('result') else None for response in responses]
+
+
+def tx_priority(tx):
+    """Watchlisted transactions first (listed, or next to a flagged address), then by value"""
+    value_eth = int(tx.get('value', 0) or 0) / 1e18
+    # Uncounted probe: the list counters reflect scoring lookups only
+    watched = address_lists.is_blocklisted(tx.get('from'), tx.get('to'))
+    if not watched and transfer_graph is not None:
+        for address in (tx.get('from'), tx.get('to')):
+            node = address_table.lookup(address) if address else -1
+            if 0 <= transfer_graph.distance_to_flagged(node, OVERLOAD_WATCH_HOPS):
+                watched = True
+                break
+    return (1 if watched else 0, value_eth)
+
+
+async def backfill_missed_blocks(last_block, head, log_end):
+    """
+    Score transactions mined in blocks last_block+1..head (missed while the
+    monitor was down): up to BACKFILL_CONNECTIONS chunks are fetched in
+    parallel, and scored in block order so the block checkpoint follows.
+    Transactions already scored while pending (logged before `log_end`, or
+    stored) are skipped: the block checkpoint lags behind the scoring
+    """
+    if last_block is None or last_block >= head:
+        ingest_log.commit_block(head)
+        return
+
+    start = max(last_block + 1, head - BACKFILL_MAX_BLOCKS + 1)
+    if start > last_block + 1:
+        logger.warning(f"⚠️ Gap of {head - last_block} blocks, backfilling only the last {BACKFILL_MAX_BLOCKS}")
+    logger.info(f"⏩ Backfilling blocks {start}..{head}")
+
+    loop = asyncio.get_running_loop()
+    known = await loop.run_in_executor(None, logged_hashes, log_end)
+    scored = skipped = 0
+    chunks = deque(
+        list(range(chunk_start, min(chunk_start + BACKFILL_BATCH_BLOCKS, head + 1)))
+        for chunk_start in range(start, head + 1, BACKFILL_BATCH_BLOCKS)
+    )
+    pool = ThreadPoolExecutor(max_workers=BACKFILL_CONNECTIONS, thread_name_prefix='backfill')
+    fetches = deque()
+    try:
+        while chunks or fetches:
+            # Keep every connection busy, plus one chunk ready to score
+            while chunks and len(fetches) <= BACKFILL_CONNECTIONS:
+                block_numbers = chunks.popleft()
+                fetches.append((block_numbers, loop.run_in_executor(pool, fetch_backfill_blocks, block_numbers)))
+            block_numbers, fetch = fetches.popleft()
+            blocks = await fetch
+            txs = [tx for block in blocks for tx in block['transactions']]
+            fresh = drop_scored(txs, known)
+            skipped += len(txs) - len(fresh)
+            txs = fresh
+            if mempool is not None:
+                txs = [tx for tx in txs if mempool.admit(tx)]
+                for block in blocks:
+                    mempool.reconcile_block(block)
+            for i in range(0, len(txs), MONITOR_BATCH_SIZE):
+                await process_transactions(txs[i:i + MONITOR_BATCH_SIZE], count=count_recovered)
+                # Let live monitoring and client handlers run between batches
+                await asyncio.sleep(0)
+            scored += len(txs)
+            ingest_log.commit_block(block_numbers[-1])
+        logger.info(f"✅ Backfill done: {scored} scored, {skipped} already scored before the restart")
+    finally:
+        for _, fetch in fetches:
+            fetch.cancel()
+        pool.shutdown(wait=False)
+
+
+async def recover_missed_transactions(end_offset, last_block, head):
+    """Replay the ingest log, then backfill missed blocks, alongside live monitoring"""
+    global recovering
+    try:
+        await replay_ingest_log(end_offset)
+        await backfill_missed_blocks(last_block, head, end_offset)
+    except Exception as e:
+        logger.error(f"Error during recovery: {str(e)}")
+    finally:
+        recovering = False
+
+
+async def reconcile_mempool(last_block, head):
+    """Retire mined (sender, nonce) slots; the last few blocks are re-read to catch reorgs"""
+    start = head if last_block is None else last_block + 1 - MEMPOOL_REORG_DEPTH
+    start = max(start, head - MEMPOOL_RECONCILE_MAX_BLOCKS + 1)
+    for chunk_start in range(start, head + 1, BACKFILL_BATCH_BLOCKS):
+        block_numbers = list(range(chunk_start, min(chunk_start + BACKFILL_BATCH_BLOCKS, head + 1)))
+        for block in await rpc(fetch_blocks, block_numbers):
+            if block is not None:
+                mempool.reconcile_block(block)
+    mempool.evict_expired()
+    return head
+
+
+def advance_block_checkpoint():
+    """Checkpoint the newest polled head whose announced hashes are all logged (or shed)"""
+    if not block_marks or recovering:
+        return
+    oldest = overload.oldest_announced()
+    covered = None
+    while block_marks and (oldest is None or block_marks[0][0] < oldest):
+        covered = block_marks.popleft()[1]
+    if covered is not None:
+        ingest_log.commit_block(covered)
+
+
+async def poll_pending(tx_filter):
+    """Move announced hashes into the bounded intake and keep block bookkeeping going"""
+    last_block_check = time.monotonic()
+    reconciled_block = None
+    observed_head = None
+
+    while True:
+        try:
+            tx_hashes = await rpc(tx_filter.get_new_entries)
+            if mempool is not None:
+                tx_hashes = mempool.filter_new(tx_hashes)
+            overload.offer_hashes(tx_hashes)
+            if observed_head is not None:
+                # Hashes of that head are announced by now: covered once they leave the intake
+                block_marks.append((time.monotonic(), observed_head))
+                observed_head = None
+
+            if time.monotonic() - last_block_check >= BLOCK_CHECKPOINT_SEC:
+                last_block_check = time.monotonic()
+                head = await rpc(lambda: w3.eth.block_number)
+                if mempool is not None:
+                    reconciled_block = await reconcile_mempool(reconciled_block, head)
+                # Remember how far the chain is covered, for backfill after a restart
+                if ingest_log is not None:
+                    observed_head = head
+
+        except Exception as e:
+            logger.error(f"Error polling pending transactions: {str(e)}")
+
+        await asyncio.sleep(0.1)
+
+
+async def drain_intake():
+    """Fetch queued hashes and score the highest-priority fresh transactions"""
+    last_report = time.monotonic()
+
+    while True:
+        try:
+            # Prefetch while the scoring buffer has room, so priority can pick among more
+            fetched = 0
+            while overload.has_room() and fetched < OVERLOAD_PREFETCH_BATCHES:
+                queued = overload.next_hashes(MONITOR_BATCH_SIZE)
+                if not queued:
+                    break
+                txs = await rpc(fetch_transactions, [tx_hash for tx_hash, _ in queued])
+                items = []
+                for (_, announced_at), tx in zip(queued, txs):
+                    # Replacements that only bump the fee were already scored
+                    if tx is None or (mempool is not None and not mempool.admit(tx)):
+                        continue
+                    items.append((tx_priority(tx), announced_at, tx))
+                overload.offer_txs(items)
+                fetched += 1
+
+            overload.drop_stale()
+            batch = overload.next_batch(MONITOR_BATCH_SIZE)
+            if batch:
+                await process_transactions(batch)
+            if ingest_log is not None:
+                advance_block_checkpoint()
+
+            if time.monotonic() - last_report >= 30:
+                last_report = time.monotonic()
+                metrics = overload.metrics()
+                if metrics['shed_total']:
+                    logger.warning(f"🚦 Shedding load: {metrics['shed']} | queued={metrics['queued_hashes']} "
+                                   f"buffered={metrics['buffered_txs']} lag={metrics['lag_sec']}s")
+
+            if not batch:
+                await asyncio.sleep(0.05)
+            else:
+                # Let the poller and client handlers run between batches
+                await asyncio.sleep(0)
+
+        except Exception as e:
+            logger.error(f"Error in monitoring: {str(e)}")
+            await asyncio.sleep(0.1)
+
+
 async def monitor_transactions():
     """Monitor blockchain transactions"""
+    global recovering
     logger.info("🔍 Starting transaction monitoring...")
-    tx_filter = w3.eth.filter("pending")
-    
-    processed_count = 0
-    suspicious_count = 0
-    
+    tx_filter = await rpc(w3.eth.filter, "pending")
+    monitor_stats['started_at'] = datetime.datetime.now().isoformat()
+
+    tasks = [poll_pending(tx_filter), drain_intake()]
+    if ingest_log is not None:
+        # Live monitoring starts right away; the pending filter covers what is mined after `head`
+        recovering = True
+        head = await rpc(lambda: w3.eth.block_number)
+        tasks.append(recover_missed_transactions(ingest_log.next_offset, ingest_log.checkpoint.last_block, head))
+
+    await asyncio.gather(*tasks)
+
+
+async def reload_address_lists():
+    """Periodically pick up changed blocklist / allowlist files"""
+    loop = asyncio.get_running_loop()
     while True:
+        await asyncio.sleep(ADDRESS_LISTS_RELOAD_SEC)
         try:
-            for tx_hash in tx_filter.get_new_entries():
-                try:
-                    tx = w3.eth.get_transaction(tx_hash)
-                    tx_data = handle_transaction(tx)
-                    
-                    if tx_data:
-                        processed_count += 1
-                        if tx_data['classification'] == 'SUSPICIOUS':
-                            suspicious_count += 1
-                        
-                        # Broadcast to clients
-                        await broadcast_transaction(tx_data)
-                        
-                        # Log stats every 100 transactions
-                        if processed_count % 100 == 0:
-                            fraud_rate = (suspicious_count / processed_count) * 100
-                            logger.info(f"📊 Processed: {processed_count} | Suspicious: {suspicious_count} ({fraud_rate:.1f}%) | Clients: {len(connected_clients)}")
-                            
-                except Exception as e:
-                    logger.error(f"Error processing tx {tx_hash}: {str(e)}")
-                    
+            await loop.run_in_executor(None, address_lists.reload_if_changed)
         except Exception as e:
-            logger.error(f"Error in monitoring: {str(e)}")
-        
-        await asyncio.sleep(0.1)
+            logger.error(f"Error reloading address lists: {str(e)}")
+
+
+def capture_snapshot() -> dict:
+    """Copy the in-memory state to snapshot (on the event loop, between batches)"""
+    counters = {key: monitor_stats[key] for key in ('processed_count', 'suspicious_count')}
+    return snapshots.capture(address_table, transfer_graph, counters, mempool)
+
+
+def restore_snapshot():
+    """Reload the last snapshot; returns the newest edge time it covers (or None)"""
+    global count_recovered
+    if len(address_table):
+        return None
+    snapshot = snapshots.load()
+    if snapshot is None:
+        return None
+    address_table.extend(snapshot['labels'])
+    if transfer_graph is not None and snapshot['times'] is not None:
+        transfer_graph.restore(snapshot['src'], snapshot['dst'], snapshot['times'], snapshot['flagged'])
+    monitor_stats.update(snapshot['counters'])
+    # Known hashes and (sender, nonce) slots: replacements of txs scored before the restart collapse
+    if mempool is not None and snapshot['mempool'] is not None:
+        mempool.restore_state(snapshot['mempool'])
+    # Replayed and backfilled transactions may have been counted before the snapshot
+    count_recovered = False
+    logger.info(f"♻️ Restored snapshot {snapshots.stats['restored_from']}: {len(address_table)} addresses, "
+                f"{transfer_graph.num_edges if transfer_graph is not None else 0} edges, "
+                f"{mempool.metrics()['pending_slots'] if mempool is not None else 0} pending slots, "
+                f"{monitor_stats['processed_count']} processed in {snapshots.stats['restore_ms']:.0f} ms")
+    return snapshot['watermark']
+
+
+async def snapshot_state():
+    """Periodically snapshot the detection state; encoding and I/O run off the event loop"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL_SEC)
+        try:
+            state = capture_snapshot()
+            written = await loop.run_in_executor(snapshot_executor, snapshots.write, state)
+            logger.debug(f"📸 {state['kind']} snapshot #{state['seq']}: {written} bytes")
+        except Exception as e:
+            snapshots.stats['errors'] += 1
+            logger.error(f"Error writing snapshot: {str(e)}")
 
 
 async def main():
@@ -390,6 +1092,27 @@ async def main():
         logger.info(f"🔌 Port: {WEBSOCKET_PORT}")
         logger.info(f"👥 Max connections: {MAX_CONNECTIONS}")
         logger.info(f"🤖 ML Model: {'Loaded ✅' if model else 'Rule-based ⚠️'}")
+        logger.info(f"👥 Shadow models: {len(shadow_scorer.candidates)}")
+
+        # Durable state directories are created here, not when the module is imported
+        if ingest_log is not None:
+            ingest_log.open()
+
+        # Warm restart from the last snapshot, then only the transfers stored after it
+        restored_until = None
+        if snapshots is not None:
+            try:
+                restored_until = restore_snapshot()
+            except Exception as e:
+                logger.error(f"❌ Snapshot restore failed, rebuilding from the database: {str(e)}")
+                address_table.clear()
+                if transfer_graph is not None:
+                    transfer_graph.restore([], [], [], [])
+        if transfer_graph is not None:
+            since = datetime.datetime.fromtimestamp(restored_until) if restored_until is not None else None
+            transfer_graph.load_from_db(Session, Transaction, since=since)
+
+        address_lists.reload()
 
         # Start WebSocket server (without process_request to avoid conflicts)
         server = await websockets.serve(
@@ -404,8 +1127,14 @@ async def main():
         logger.info(f"✅ Server started at ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
         logger.info("=" * 60)
         
-        # Start transaction monitoring
+        # Start shadow scoring and transaction monitoring
+        shadow_scorer.start()
+        if scored_sink is not None:
+            scored_sink.start()
         monitor_task = asyncio.create_task(monitor_transactions())
+        lists_task = asyncio.create_task(reload_address_lists())
+        snapshot_task = asyncio.create_task(snapshot_state()) if snapshots is not None else None
+        checkpoint_task = asyncio.create_task(persist_ingest_checkpoint()) if ingest_log is not None else None
         
         try:
             await asyncio.Future()
@@ -415,6 +1144,21 @@ async def main():
             server.close()
             await server.wait_closed()
             monitor_task.cancel()
+            lists_task.cancel()
+            if snapshot_task is not None:
+                snapshot_task.cancel()
+                try:
+                    # Cancelling doesn't stop a write already running in the executor: let it finish first
+                    snapshot_executor.shutdown(wait=True)
+                    snapshots.write(capture_snapshot())
+                except Exception as e:
+                    logger.error(f"Error writing final snapshot: {str(e)}")
+            if ingest_log is not None:
+                checkpoint_task.cancel()
+                ingest_log.close()
+            shadow_scorer.stop()
+            if scored_sink is not None:
+                scored_sink.stop()
             logger.info("✅ Server stopped")
             
     except Exception as e:
@@ -0,0 +1,120 @@
+"""
+Warm-restart snapshots: size, event-loop pause and restore time vs a rebuild.
+
+Feeds the synthetic chain into an address table and transfer graph the way
+the monitor does, snapshots every `--interval` simulated seconds (full +
+deltas), then restores into fresh structures and checks they match. The
+baseline is the cold start path: re-adding every transfer of the window one
+by one (what load_from_db does after its query).
+
+    python scripts/bench_snapshots.py --scenario mainnet --seconds 7200 --interval 60
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+import numpy as np
+from app.tx_records import InternTable
+from app.graph_index import TransferGraph
+from app.snapshots import SnapshotStore
+from app.synthetic_chain import SyntheticChain, SCENARIOS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='mainnet')
+    parser.add_argument('--seconds', type=int, default=7200, help='simulated seconds of traffic')
+    parser.add_argument('--interval', type=int, default=60, help='simulated seconds between snapshots')
+    parser.add_argument('--full-every', type=int, default=10)
+    parser.add_argument('--full-ratio', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=3)
+    parser.add_argument('--dir', help='snapshot directory (default: a temporary one)')
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp(prefix='snapshots-')
+    chain = SyntheticChain(seed=args.seed, scenario=args.scenario)
+    addresses = InternTable()
+    graph = TransferGraph(addresses)
+    store = SnapshotStore(directory, full_every=args.full_every, full_ratio=args.full_ratio)
+    counters = {'processed_count': 0, 'suspicious_count': 0}
+    start = time.time() - args.seconds
+    transfers = []
+    captures = {'full': [], 'delta': []}
+    writes = {'full': [], 'delta': []}
+    sizes = {'full': [], 'delta': []}
+
+    for second in range(args.seconds):
+        ts = start + second
+        for tx in chain.step():
+            src = addresses.intern(tx['from'], tx['from'])
+            dst = addresses.intern(tx['to'] or '', tx['to'] or '')
+            graph.add_edge(src, dst, ts)
+            transfers.append((tx['from'], tx['to'], ts))
+            counters['processed_count'] += 1
+            if tx['to'] in chain.fraud_addresses:
+                graph.mark_flagged(dst)
+                counters['suspicious_count'] += 1
+        if (second + 1) % args.interval == 0:
+            state = store.capture(addresses, graph, counters)
+            captures[state['kind']].append(store.stats['last_capture_ms'])
+            sizes[state['kind']].append(store.write(state))
+            writes[state['kind']].append(store.stats['last_write_ms'])
+
+    print(f"scenario={args.scenario} simulated={args.seconds}s transfers={len(transfers)} "
+          f"addresses={len(addresses)} edges={graph.num_edges} flagged={len(graph.flagged)}")
+    for kind in ('full', 'delta'):
+        if sizes[kind]:
+            print(f"  {kind:5s} x{len(sizes[kind]):3d}  size avg {np.mean(sizes[kind]) / 1024:8.1f} KiB  "
+                  f"loop pause (capture) avg {np.mean(captures[kind]):6.2f} ms max {np.max(captures[kind]):6.2f} ms  "
+                  f"write (executor) avg {np.mean(writes[kind]):6.1f} ms")
+    on_disk = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+    print(f"  on disk: {on_disk / 1024:.1f} KiB in {sorted(os.listdir(directory))}")
+
+    # Warm start: memory-mapped snapshot into fresh structures
+    started = time.perf_counter()
+    loader = SnapshotStore(directory)
+    restored = loader.load()
+    warm_addresses = InternTable()
+    warm_addresses.extend(restored['labels'])
+    warm_graph = TransferGraph(warm_addresses)
+    warm_graph.restore(restored['src'], restored['dst'], restored['times'], restored['flagged'])
+    warm_time = time.perf_counter() - started
+
+    # Cold start: every transfer of the window re-added one by one
+    started = time.perf_counter()
+    cold_addresses = InternTable()
+    cold_graph = TransferGraph(cold_addresses)
+    for from_address, to_address, ts in transfers:
+        cold_graph.add_transfer(from_address, to_address, ts)
+    cold_graph.compact()
+    cold_time = time.perf_counter() - started
+
+    # Only the edges after the last snapshot are missing from the warm state
+    covered = restored['watermark'] if restored['watermark'] is not None else float('-inf')
+    missing = sum(1 for _, _, ts in transfers if ts > covered)
+    sample = np.random.default_rng(0).integers(1, len(addresses) + 1, 2000)
+    same_ids = warm_addresses.labels() == addresses.labels()[:len(warm_addresses)]
+    same_features = all(
+        warm_graph.node_features(int(node)) == graph.node_features(int(node))
+        for node in sample if node <= len(warm_addresses)
+    ) if missing == 0 else None
+    print(f"  warm restore {warm_time * 1e3:8.1f} ms (snapshot load {loader.stats['restore_ms']:.1f} ms)  "
+          f"cold rebuild {cold_time * 1e3:8.1f} ms  ({cold_time / max(warm_time, 1e-9):.1f}x)")
+    print(f"  same address ids: {same_ids}  edges {warm_graph.num_edges}/{graph.num_edges} "
+          f"(+{missing} after the last snapshot)  counters {restored['counters']}  "
+          f"same graph features: {same_features}")
+
+    if not args.dir:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
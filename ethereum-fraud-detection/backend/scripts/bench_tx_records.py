@@ -0,0 +1,109 @@
+"""
+Memory / allocation benchmark: legacy dict transactions vs interned compact
+records, built and converted the way handle_transactions does (one feature
+matrix per batch, records_to_array, batch_to_dicts for broadcast).
+
+    python scripts/bench_tx_records.py --count 100000 --addresses 5000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+import datetime
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+import numpy as np
+from app.feature_extraction import REQUIRED_FEATURES
+from app.tx_records import InternTable, TxRecord, records_to_array, batch_to_dicts, features_to_matrix
+
+
+def synthetic_txs(count, n_addresses, seed):
+    rng = random.Random(seed)
+    addresses = ['0x' + rng.randbytes(20).hex() for _ in range(n_addresses)]
+    for nonce in range(count):
+        yield {
+            'hash': rng.randbytes(32),
+            'from': rng.choice(addresses),
+            'to': rng.choice(addresses),
+            'value': rng.randint(0, 10 ** 20),
+            'gasPrice': rng.randint(10 ** 9, 10 ** 11),
+            'nonce': nonce
+        }
+
+
+def synthetic_features(rng):
+    return {name: rng.random() * 100 for name in REQUIRED_FEATURES}
+
+
+def build_legacy(txs, rng):
+    rows = []
+    for tx in txs:
+        rows.append({
+            'hash': tx['hash'].hex(),
+            'from': tx['from'],
+            'to': tx['to'],
+            'value_eth': float(tx['value']) / 1e18,
+            'gas_price': float(tx['gasPrice']),
+            'classification': 'LEGITIMATE',
+            'timestamp': datetime.datetime.now().isoformat(),
+            'features': synthetic_features(rng)
+        })
+    return rows
+
+
+def build_compact(txs, rng):
+    addresses, hashes = InternTable(), InternTable()
+    records = [TxRecord.from_web3(tx, addresses, hashes) for tx in txs]
+    features = features_to_matrix([synthetic_features(rng) for _ in records])
+    return addresses, hashes, records_to_array(records), features
+
+
+def measure(label, build, count, n_addresses, seed):
+    txs = list(synthetic_txs(count, n_addresses, seed))
+    rng = random.Random(seed)
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(txs, rng)
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    print(f"{label:<8} retained={current / 1e6:8.2f} MB  peak={peak / 1e6:8.2f} MB  "
+          f"blocks={blocks:>9}  per_tx={current / count:7.1f} B  build={elapsed * 1e3:8.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=100_000)
+    parser.add_argument('--addresses', type=int, default=5_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    measure('legacy', build_legacy, args.count, args.addresses, args.seed)
+    addresses, hashes, arr, matrix = measure('compact', build_compact, args.count, args.addresses, args.seed)
+
+    # Batched vector ops on the compact layout
+    started = time.perf_counter()
+    total_value = arr['value_eth'].sum()
+    fan_out = np.bincount(arr['from_id'])
+    elapsed = time.perf_counter() - started
+    print(f"vector ops over {len(arr)} records: {elapsed * 1e3:.1f} ms "
+          f"(matrix {matrix.nbytes / 1e6:.2f} MB, total value {total_value:.1f} ETH, max fan-out {fan_out.max()})")
+
+    # tx_data dicts for persistence and broadcast, converted once per batch
+    started = time.perf_counter()
+    rows = batch_to_dicts(arr, matrix, addresses, hashes, ['LEGITIMATE'] * len(arr))
+    elapsed = time.perf_counter() - started
+    print(f"batch_to_dicts over {len(rows)} records: {elapsed * 1e3:.1f} ms ({elapsed / len(rows) * 1e6:.2f} us/tx)")
+
+
+if __name__ == '__main__':
+    main()
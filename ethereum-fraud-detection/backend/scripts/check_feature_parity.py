@@ -0,0 +1,164 @@
+"""
+Parity check and benchmark of the shared feature definitions.
+
+1. Single-row vs batch path on random window aggregates (with bin edges,
+   anomaly thresholds, zeros and NaN): outputs must be identical.
+2. Batch path vs the notebook's original pandas feature code (what the
+   shipped model was trained on).
+3. Per-wallet vs batched window queries on a temporary SQLite database filled
+   from the synthetic chain (raw and rollup windows).
+4. Timings of both paths.
+
+    python scripts/check_feature_parity.py --rows 100000 --wallets 256
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import datetime
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+# Scratch database, set before app.models creates its engine
+if not os.getenv('DATABASE_URL'):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'parity.db')
+
+import numpy as np
+import pandas as pd
+from app.feature_definitions import (
+    REQUIRED_FEATURES, VALUE_BINS, ANOMALY_THRESHOLDS,
+    derive_features, derive_features_batch
+)
+
+
+def random_aggregates(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    edges = np.array([0.0, *VALUE_BINS, ANOMALY_THRESHOLDS['mean_value_received'], np.nan])
+    mean = rng.lognormal(-1.0, 2.5, rows)
+    pick = rng.random(rows) < 0.2
+    mean[pick] = rng.choice(edges, pick.sum())
+    sent = rng.integers(0, 2000, rows).astype(np.float64)
+    sent[rng.random(rows) < 0.05] = ANOMALY_THRESHOLDS['total_tx_sent']
+    return pd.DataFrame({
+        'Month': rng.integers(1, 13, rows),
+        'Day': rng.integers(1, 32, rows),
+        'Hour': rng.integers(0, 24, rows),
+        'time_diff_first_last_received': rng.exponential(300.0, rows) * (rng.random(rows) < 0.6),
+        'total_tx_sent': sent,
+        'total_tx_sent_unique': np.minimum(sent, rng.integers(0, 300, rows)),
+        'mean_value_received': mean,
+        'variance_value_received': rng.exponential(50.0, rows),
+        'total_received': rng.exponential(4000.0, rows)
+    })
+
+
+def notebook_features(df: pd.DataFrame, thresholds: dict) -> pd.DataFrame:
+    """The training notebook's original feature code (before the shared module)"""
+    df = df.copy()
+    df['value_volatility'] = df['variance_value_received'] / (df['mean_value_received'] + 1e-8)
+    df['tx_volatility'] = df['total_tx_sent'] / (df['time_diff_first_last_received'] + 1)
+    df['send_receive_imbalance'] = (df['total_tx_sent'] - df['total_received']) / (df['total_tx_sent'] + df['total_received'] + 1)
+    df['unique_behavior_ratio'] = df['total_tx_sent_unique'] / (df['total_tx_sent'] + 1)
+    df['is_weekend'] = ((df['Day'] % 7) >= 5).astype(int)
+    df['is_night'] = ((df['Hour'] >= 22) | (df['Hour'] <= 6)).astype(int)
+    df['is_business_hours'] = ((df['Hour'] >= 9) & (df['Hour'] <= 17)).astype(int)
+    df['value_category'] = pd.cut(df['mean_value_received'], bins=[0, 0.01, 0.1, 1, 10, np.inf], labels=[0, 1, 2, 3, 4])
+    df['value_anomaly'] = (df['mean_value_received'] > thresholds['mean_value_received']).astype(int)
+    df['frequency_anomaly'] = (df['total_tx_sent'] > thresholds['total_tx_sent']).astype(int)
+    X = df[REQUIRED_FEATURES].copy()
+    X['value_category'] = pd.to_numeric(X['value_category'], errors='coerce').fillna(-1)
+    return X.astype(np.float64)
+
+
+def report(name: str, expected: np.ndarray, actual: np.ndarray) -> bool:
+    equal = np.array_equal(expected, actual, equal_nan=True)
+    if equal:
+        print(f"  {name}: identical ({len(actual)} rows)")
+    else:
+        bad = ~((expected == actual) | (np.isnan(expected) & np.isnan(actual)))
+        columns = [REQUIRED_FEATURES[j] for j in np.flatnonzero(bad.any(axis=0))]
+        print(f"  {name}: MISMATCH in {int(bad.any(axis=1).sum())} rows, columns {columns}")
+    return equal
+
+
+def fill_database(wallets: int, seconds: int, seed: int):
+    """Synthetic transfers over the last `seconds`, with rollups"""
+    from app.models import Session, Transaction
+    from app.rollups import update_rollups
+    from app.synthetic_chain import SyntheticChain
+
+    chain = SyntheticChain(seed=seed, scenario='exchange', addresses=wallets)
+    start = datetime.datetime.utcnow() - datetime.timedelta(seconds=seconds)
+    session = Session()
+    stored = set()
+    try:
+        for second in range(seconds):
+            ts = start + datetime.timedelta(seconds=second)
+            for tx in chain.step():
+                if tx['hash'] in stored:
+                    continue  # re-announced hash
+                stored.add(tx['hash'])
+                row = Transaction(
+                    hash=tx['hash'], from_address=tx['from'], to_address=tx['to'],
+                    value_eth=int(tx['value'], 16) / 1e18, gas_price=int(tx['gasPrice'], 16) / 1e9, timestamp=ts
+                )
+                session.add(row)
+                update_rollups(session, row)
+            if second % 600 == 0:
+                session.commit()
+        session.commit()
+    finally:
+        session.close()
+    return chain, len(stored)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--wallets', type=int, default=256, help='wallets per batched query')
+    parser.add_argument('--db-seconds', type=int, default=1800, help='simulated seconds of transfers in the scratch DB')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    ok = True
+
+    print("Aggregates -> features")
+    df = random_aggregates(args.rows, args.seed)
+    started = time.perf_counter()
+    single = np.array([[row[name] for name in REQUIRED_FEATURES]
+                       for row in map(derive_features, df.to_dict('records'))])
+    single_time = time.perf_counter() - started
+    started = time.perf_counter()
+    batch = derive_features_batch(df)
+    batch_time = time.perf_counter() - started
+    ok &= report('single-row vs batch', single, batch)
+    ok &= report('batch vs training notebook', notebook_features(df, ANOMALY_THRESHOLDS).to_numpy(), batch)
+    print(f"  single-row {single_time / args.rows * 1e6:.2f} us/row, batch {batch_time / args.rows * 1e6:.3f} us/row "
+          f"({single_time / max(batch_time, 1e-9):.0f}x)")
+
+    print("Window queries -> features")
+    from app.feature_extraction import compute_wallet_features, compute_wallet_feature_matrix
+    chain, count = fill_database(args.wallets * 4, args.db_seconds, args.seed)
+    wallets = chain.addresses[:args.wallets] + [None, '']
+    print(f"  {count} transactions in {os.environ['DATABASE_URL']}")
+    for hours in (24, 72):
+        started = time.perf_counter()
+        single = np.array([[compute_wallet_features(wallet, hours)[name] for name in REQUIRED_FEATURES]
+                           for wallet in wallets])
+        single_time = time.perf_counter() - started
+        started = time.perf_counter()
+        batch = compute_wallet_feature_matrix(wallets, hours)
+        batch_time = time.perf_counter() - started
+        ok &= report(f'{hours}h per-wallet vs batched query', single, batch)
+        print(f"  {hours}h: per-wallet {single_time * 1e3:.1f} ms, batched {batch_time * 1e3:.1f} ms "
+              f"for {len(wallets)} wallets")
+
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
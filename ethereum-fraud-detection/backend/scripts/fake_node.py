@@ -0,0 +1,176 @@
+"""
+Local stand-in for the Ethereum websocket RPC, fed by the seeded synthetic chain.
+
+Serves the JSON-RPC calls the monitor makes (pending filter, filter changes,
+transaction and block lookups, block number) over a websocket. The simulated
+clock runs `--speed` times faster than mainnet, so the same seed and scenario
+give the same transaction stream at 1x, 10x or 100x.
+
+    python scripts/fake_node.py --scenario attack --seed 42 --speed 10
+    ALCHEMY_WS=ws://localhost:8546 python -m app.websocket_server
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import logging
+import argparse
+import itertools
+from collections import OrderedDict
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+import websockets
+from app.synthetic_chain import SyntheticChain, SCENARIOS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('fake_node')
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class FakeNode:
+    """JSON-RPC state over a SyntheticChain: filters and a bounded tx store"""
+
+    def __init__(self, chain: SyntheticChain, speed: float = 1.0, max_txs: int = 1_000_000,
+                 max_filter_backlog: int = 100_000):
+        self.chain = chain
+        self.speed = speed
+        self.max_txs = max_txs
+        self.max_filter_backlog = max_filter_backlog
+        self.txs = OrderedDict()
+        self.filters = {}
+        self._filter_ids = itertools.count(1)
+        self.generated = 0
+        self.requests = 0
+        self._started = None
+
+    async def run_clock(self):
+        """Advance the simulated chain to keep pace with wall time x speed"""
+        self._started = time.monotonic()
+        while True:
+            target = int((time.monotonic() - self._started) * self.speed)
+            while self.chain.second < target:
+                for tx in self.chain.step():
+                    self.txs[tx['hash']] = tx
+                    for backlog in self.filters.values():
+                        if len(backlog) < self.max_filter_backlog:
+                            backlog.append(tx['hash'])
+                    self.generated += 1
+                while len(self.txs) > self.max_txs:
+                    self.txs.popitem(last=False)
+            await asyncio.sleep(min(0.05, 1.0 / self.speed))
+
+    def call(self, method: str, params: list):
+        self.requests += 1
+        if method == 'eth_newPendingTransactionFilter':
+            filter_id = hex(next(self._filter_ids))
+            self.filters[filter_id] = []
+            return filter_id
+        if method == 'eth_getFilterChanges':
+            if params[0] not in self.filters:
+                raise RpcError(-32000, 'filter not found')
+            changes, self.filters[params[0]] = self.filters[params[0]], []
+            return changes
+        if method == 'eth_uninstallFilter':
+            return self.filters.pop(params[0], None) is not None
+        if method == 'eth_getTransactionByHash':
+            return self.txs.get(params[0].lower())
+        if method == 'eth_getBlockByNumber':
+            return self._block(params[0], params[1] if len(params) > 1 else False)
+        if method == 'eth_blockNumber':
+            return hex(self.chain.head)
+        if method == 'eth_chainId':
+            return hex(self.chain.chain_id)
+        if method == 'net_version':
+            return str(self.chain.chain_id)
+        if method == 'web3_clientVersion':
+            return f'fake-node/{self.chain.scenario}'
+        raise RpcError(-32601, f'method {method} not supported')
+
+    def _block(self, tag, full: bool):
+        number = self.chain.head if tag in ('latest', 'pending', 'safe', 'finalized') else int(tag, 16)
+        block = self.chain.blocks.get(number)
+        if block is None:
+            return None
+        if full:
+            return block
+        return dict(block, transactions=[tx['hash'] for tx in block['transactions']])
+
+    def handle(self, request: dict) -> dict:
+        try:
+            result = self.call(request['method'], request.get('params') or [])
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+        except RpcError as e:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': e.code, 'message': e.message}}
+        except Exception as e:
+            return {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {'code': -32602, 'message': str(e)}}
+
+    async def serve_client(self, websocket):
+        async for message in websocket:
+            request = json.loads(message)
+            if isinstance(request, list):
+                response = [self.handle(item) for item in request]
+            else:
+                response = self.handle(request)
+            await websocket.send(json.dumps(response))
+
+    async def report(self, interval: float = 10.0):
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(f"⛓️ sim t={self.chain.second}s block={self.chain.head} txs={self.generated} "
+                        f"({self.generated / max(time.monotonic() - self._started, 1e-9):.0f}/s) "
+                        f"bursts={len(self.chain.fraud_addresses)} filters={len(self.filters)} requests={self.requests}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8546)
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='mainnet')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--speed', type=float, default=1.0, help='simulated seconds per wall second (10-100 for load tests)')
+    parser.add_argument('--tps', type=float, help='override the scenario tx rate (at 1x)')
+    parser.add_argument('--addresses', type=int, help='override the scenario address pool size')
+    parser.add_argument('--bursts-per-hour', type=float, help='override the scenario fraud burst rate')
+    parser.add_argument('--labels', help='write the fraud (scam) addresses here on exit')
+    args = parser.parse_args()
+
+    overrides = {key: value for key, value in {
+        'tps': args.tps, 'addresses': args.addresses, 'bursts_per_hour': args.bursts_per_hour
+    }.items() if value is not None}
+    chain = SyntheticChain(seed=args.seed, scenario=args.scenario, **overrides)
+    node = FakeNode(chain, speed=args.speed)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with websockets.serve(node.serve_client, args.host, args.port, max_size=None):
+        logger.info(f"🧪 Fake node on ws://{args.host}:{args.port} "
+                    f"({args.scenario}, seed={args.seed}, {chain.params['tps'] * args.speed:.0f} tx/s)")
+        tasks = [asyncio.create_task(node.run_clock()), asyncio.create_task(node.report())]
+        await stop.wait()
+        for task in tasks:
+            task.cancel()
+
+    # Ground truth, in blocklist format (usable as BLOCKLIST_PATH)
+    if args.labels:
+        with open(args.labels, 'w') as f:
+            f.write(''.join(f"{address}\n" for address in sorted(chain.fraud_addresses)))
+        logger.info(f"🏷️ Wrote {len(chain.fraud_addresses)} fraud addresses to {args.labels}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+"""
+Analytical queries over the Parquet export of scored transactions.
+
+Only the columns a query needs are read, and --since/--until prune whole
+date partitions, so this never touches the OLTP database.
+
+    python scripts/query_scored.py fraud-rate --since 2026-10-01
+    python scripts/query_scored.py top-flagged --limit 20
+    python scripts/query_scored.py feature-stats --columns value_eth graph_fan_out
+"""
+
+import os
+import sys
+import argparse
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from app.config import PARQUET_DIR
+
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string()), ('hour', pa.int32())]), flavor='hive')
+
+
+def open_dataset(directory):
+    return ds.dataset(directory, format='parquet', partitioning=PARTITIONING,
+                      exclude_invalid_files=False, ignore_prefixes=['.'])
+
+
+def date_filter(since, until):
+    condition = None
+    if since:
+        condition = ds.field('date') >= since
+    if until:
+        upper = ds.field('date') <= until
+        condition = upper if condition is None else condition & upper
+    return condition
+
+
+def fraud_rate(dataset, condition, args):
+    table = dataset.to_table(columns=['date', 'hour', 'classification'], filter=condition)
+    suspicious = pc.equal(pc.cast(table['classification'], pa.string()), 'SUSPICIOUS')
+    table = pa.table({'date': table['date'], 'hour': table['hour'], 'suspicious': pc.cast(suspicious, pa.int64())})
+    grouped = table.group_by(['date', 'hour']).aggregate([('suspicious', 'count'), ('suspicious', 'sum')])
+    grouped = grouped.sort_by([('date', 'ascending'), ('hour', 'ascending')])
+
+    print(f"{'date':<12}{'hour':>5}{'txs':>10}{'suspicious':>12}{'rate':>9}")
+    for row in grouped.to_pylist():
+        total, flagged = row['suspicious_count'], row['suspicious_sum']
+        print(f"{row['date']:<12}{row['hour']:>5}{total:>10}{flagged:>12}{flagged / total * 100:>8.2f}%")
+
+
+def top_flagged(dataset, condition, args):
+    flagged = ds.field('classification') == 'SUSPICIOUS'
+    condition = flagged if condition is None else condition & flagged
+    table = dataset.to_table(columns=[args.side, 'value_eth'], filter=condition)
+    grouped = table.group_by(args.side).aggregate([('value_eth', 'count'), ('value_eth', 'sum')])
+    grouped = grouped.sort_by([('value_eth_count', 'descending')]).slice(0, args.limit)
+
+    print(f"{'address':<44}{'flagged':>9}{'total ETH':>14}")
+    for row in grouped.to_pylist():
+        print(f"{row[args.side] or '-':<44}{row['value_eth_count']:>9}{row['value_eth_sum']:>14.4f}")
+
+
+def feature_stats(dataset, condition, args):
+    table = dataset.to_table(columns=args.columns, filter=condition)
+    print(f"{'column':<32}{'count':>10}{'mean':>14}{'min':>14}{'max':>14}")
+    for name in args.columns:
+        column = table[name]
+        bounds = pc.min_max(column)
+        print(f"{name:<32}{pc.count(column).as_py():>10}{pc.mean(column).as_py() or 0:>14.4f}"
+              f"{bounds['min'].as_py() or 0:>14.4f}{bounds['max'].as_py() or 0:>14.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dir', default=PARQUET_DIR)
+    parser.add_argument('--since', help='first date partition (YYYY-MM-DD)')
+    parser.add_argument('--until', help='last date partition (YYYY-MM-DD)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('fraud-rate', help='transactions and fraud rate per hour')
+    top = commands.add_parser('top-flagged', help='addresses with the most suspicious transactions')
+    top.add_argument('--limit', type=int, default=10)
+    top.add_argument('--side', choices=['from', 'to'], default='from')
+    stats = commands.add_parser('feature-stats', help='count/mean/min/max of numeric columns')
+    stats.add_argument('--columns', nargs='+', default=['value_eth', 'total_tx_sent', 'graph_dist_to_flagged'])
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dir):
+        parser.error(f"No Parquet export found in {args.dir}")
+
+    dataset = open_dataset(args.dir)
+    condition = date_filter(args.since, args.until)
+    {
+        'fraud-rate': fraud_rate,
+        'top-flagged': top_flagged,
+        'feature-stats': feature_stats
+    }[args.command](dataset, condition, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,38 @@
-import joblib
-import json
+import os
 import sys
+import json
+import joblib
+import pandas as pd
+from typing import Dict
+
+# Les features viennent du module partagé du backend (mêmes définitions qu'à l'entraînement)
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from app import feature_definitions
+from app.feature_extraction import compute_wallet_features
 
-MODEL_PATH = 'model/fraud_model.pkl'
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fraud_detection_model.pkl')
 
 try:
-    model = joblib.load(MODEL_PATH)
+    model_package = joblib.load(MODEL_PATH)
+    feature_definitions.configure(model_package)
 except Exception:
-    model = None
+    model_package = None
 
 def compute_features_for_wallet(wallet: str) -> Dict:
-    try:
-        from .etherscan import features_for_wallet
-        # Assurez-vous d'ajouter la variable d'environnement ETHERSCAN_API_KEY ou de la lire ici
-        import os
-        api_key = os.getenv("ETHERSCAN_API_KEY", "")
-        if api_key:
-            return features_for_wallet(wallet, api_key)
-    except Exception:
-        pass
+    return compute_wallet_features(wallet)
 
-    # ...existing code...
-    features = {
-        'tx_count_24h': 100,
-        'sum_value_24h': 50.0,
-        'unique_counterparties_24h': 20,
-        'avg_value_24h': 0.5,
-        'avg_gas_price': 50
-    }
-    return features
+def score_wallet(wallet: str) -> Dict:
+    features = compute_features_for_wallet(wallet)
+    if model_package is None:
+        return {'wallet': wallet, 'score': None, 'features': features}
+    X = pd.DataFrame([features]).reindex(columns=model_package['features'], fill_value=0)
+    X = model_package['preprocessor'].transform(X)
+    score = float(model_package['model'].predict_proba(X)[0, 1])
+    return {'wallet': wallet, 'score': score, 'features': features}
 
 if __name__ == '__main__':
     wallet = sys.argv[1] if len(sys.argv) > 1 else '0x000'
-    # simple stub
-    print(json.dumps({'wallet': wallet, 'score': 0.5}))
+    print(json.dumps(score_wallet(wallet), default=float))